@@ -1,11 +1,9 @@
-import json
 import os
 import sys
 from pathlib import Path
 
 import dj_database_url
 import environ
-from google.oauth2 import service_account
 
 # Environment and Base Configuration
 env = environ.Env(DEBUG=(bool, False))
@@ -42,6 +40,7 @@ INSTALLED_APPS = [
 
 # Middleware
 MIDDLEWARE = [
+    "rooms.middleware.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -52,6 +51,23 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# Request timing (rooms.middleware.ServerTimingMiddleware)
+# Requests slower than SERVER_TIMING_SLOW_MS or running at least
+# SERVER_TIMING_SLOW_QUERIES queries are logged with their SQL.
+SERVER_TIMING_HEADER = env.bool("SERVER_TIMING_HEADER", default=True)
+SERVER_TIMING_SLOW_MS = env.int("SERVER_TIMING_SLOW_MS", default=500)
+SERVER_TIMING_SLOW_QUERIES = env.int("SERVER_TIMING_SLOW_QUERIES", default=50)
+SERVER_TIMING_MAX_SQL = env.int("SERVER_TIMING_MAX_SQL", default=200)
+
+# Prometheus metrics at /metrics (rooms.metrics). Scrapers must send
+# METRICS_TOKEN as a bearer token when it is set; without it only staff
+# may read them, unless DEBUG is on. gunicorn.conf.py sets
+# PROMETHEUS_MULTIPROC_DIR so the workers' metrics are summed. The job
+# worker is not scraped; it pushes its metrics, such as email send
+# latency, to the Pushgateway at METRICS_PUSHGATEWAY when that is set.
+METRICS_TOKEN = env("METRICS_TOKEN", default=None)
+METRICS_PUSHGATEWAY = env("METRICS_PUSHGATEWAY", default=None)
+
 # URLs and WSGI Configuration
 ROOT_URLCONF = "daniels-hotell.urls"
 WSGI_APPLICATION = "daniels-hotell.wsgi.application"
@@ -64,12 +80,46 @@ DATABASES = {
     ),
 }
 
+# Cache Configuration
+# Anonymous pages are invalidated through version keys in this cache, so
+# every web worker and the job worker must share it. Set CACHE_URL to a
+# shared backend (e.g. redis:// or memcache://); otherwise the database
+# cache is used, whose table release-tasks.sh creates (createcachetable).
+CACHES = {
+    "default": env.cache("CACHE_URL", default="dbcache://django_cache"),
+}
+
+# Cache-Control directives for the room JSON endpoints, by URL name.
+# Clients revalidate with ETag/Last-Modified and get 304s while unchanged.
+ROOM_JSON_CACHE_CONTROL = {
+    "room_details": {"public": True, "no_cache": True},
+    "room_details_json": {"public": True, "max_age": 60},
+}
+
 # Testing Database Configuration
 if "test" in sys.argv:
     DATABASES["default"] = {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": ":memory:",
     }
+    CACHES["default"] = {
+        "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+    }
+
+# The anonymous page cache (rooms.cache) reads version keys and the page
+# on every request, so it is only on by default with a fast shared
+# backend: a process-local cache cannot be invalidated from other
+# processes, and the database cache spends more queries than it saves.
+PAGE_CACHE_BACKENDS = (
+    "django.core.cache.backends.redis.RedisCache",
+    "django.core.cache.backends.memcached.PyMemcacheCache",
+    "django.core.cache.backends.memcached.PyLibMCCache",
+    "django_redis.cache.RedisCache",
+)
+PAGE_CACHE_ENABLED = env.bool(
+    "PAGE_CACHE_ENABLED",
+    default=CACHES["default"]["BACKEND"] in PAGE_CACHE_BACKENDS,
+)
 
 # Default static/media settings (will be overridden for production)
 STATIC_URL = "/static/"
@@ -79,70 +129,54 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
-# Google Cloud Storage Configuration - with Debug Logging
+# Google Cloud Storage Configuration
+# Nothing here imports the Google client or parses credentials: settings
+# only record where the credentials live, and rooms.storage loads them
+# when the storage first builds its client. Diagnostics are logged once
+# the app is up (rooms.utils.log_storage_diagnostics).
 IS_DEVELOPMENT = env("DJANGO_ENV", default="development") == "development"
-print(f"DJANGO_ENV from env: {env('DJANGO_ENV', default='development')}")
-print(f"IS_DEVELOPMENT calculated value: {IS_DEVELOPMENT}")
-
 GS_BUCKET_NAME = env("GS_BUCKET_NAME", default=None)
-print(f"GS_BUCKET_NAME from env: {GS_BUCKET_NAME}")
-print(f"GS_BUCKET_NAME from os.environ: {os.environ.get('GS_BUCKET_NAME')}")
-
-# Fallback to os.environ if env() doesn't work
-if GS_BUCKET_NAME is None and "GS_BUCKET_NAME" in os.environ:
-    GS_BUCKET_NAME = os.environ.get("GS_BUCKET_NAME")
-    print(f"Using GS_BUCKET_NAME from os.environ directly: {GS_BUCKET_NAME}")
-
-print(f"DYNO in os.environ: {'DYNO' in os.environ}")
-
-# Configure GCS for both development and production
-if GS_BUCKET_NAME:
-    try:
-        # Credentials handling
-        GS_CREDENTIALS = None
-        if "GOOGLE_APPLICATION_CREDENTIALS" in os.environ:
-            print("Using GOOGLE_APPLICATION_CREDENTIALS")
-            GS_CREDENTIALS = service_account.Credentials.from_service_account_file(
-                os.environ["GOOGLE_APPLICATION_CREDENTIALS"]
-            )
-        elif "GOOGLE_CREDENTIALS" in os.environ:
-            print("Using GOOGLE_CREDENTIALS")
-            GS_CREDENTIALS = service_account.Credentials.from_service_account_info(
-                json.loads(os.environ["GOOGLE_CREDENTIALS"])
-            )
-
-        # Only set storage if credentials are found
-        if GS_CREDENTIALS:
-            print("GS_CREDENTIALS found, configuring storage backends")
-            
-            # Media files configuration
-            DEFAULT_FILE_STORAGE = "rooms.storage.GoogleCloudMediaFileStorage"
-            MEDIA_URL = f"https://storage.googleapis.com/{GS_BUCKET_NAME}/media/"
-            
-            # Static files configuration
-            STATICFILES_STORAGE = "rooms.storage.GoogleCloudStaticFileStorage"
-            STATIC_URL = f"https://storage.googleapis.com/{GS_BUCKET_NAME}/static/"
-
-            # GCS settings that work with uniform bucket-level access
-            GS_DEFAULT_ACL = None  # Compatible with uniform bucket-level access
-            GS_QUERYSTRING_AUTH = False  # Public URLs without signed auth
-            GS_FILE_OVERWRITE = False
-            
-            print(f"Storage configuration complete:")
-            print(f"DEFAULT_FILE_STORAGE: {DEFAULT_FILE_STORAGE}")
-            print(f"MEDIA_URL: {MEDIA_URL}")
-            print(f"STATICFILES_STORAGE: {STATICFILES_STORAGE}")
-            print(f"STATIC_URL: {STATIC_URL}")
-        else:
-            print("No GS_CREDENTIALS found")
-
-    except Exception as e:
-        print(f"Google Cloud Storage configuration error: {e}")
-        # Fallback to default storage if GCS setup fails
-        DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
-        STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-        print("Falling back to FileSystemStorage and WhiteNoise")
 
+# Variable holding the service account: a key file path or its JSON.
+GS_CREDENTIALS_ENV = next(
+    (
+        name
+        for name in ("GOOGLE_APPLICATION_CREDENTIALS", "GOOGLE_CREDENTIALS")
+        if name in os.environ
+    ),
+    None,
+)
+
+# Only use GCS when a bucket and credentials are configured
+if GS_BUCKET_NAME and GS_CREDENTIALS_ENV:
+    # Media files configuration
+    DEFAULT_FILE_STORAGE = "rooms.storage.GoogleCloudMediaFileStorage"
+    MEDIA_URL = f"https://storage.googleapis.com/{GS_BUCKET_NAME}/media/"
+
+    # Static files configuration
+    STATICFILES_STORAGE = "rooms.storage.GoogleCloudStaticFileStorage"
+    STATIC_URL = f"https://storage.googleapis.com/{GS_BUCKET_NAME}/static/"
+
+    # GCS settings that work with uniform bucket-level access
+    GS_DEFAULT_ACL = None  # Compatible with uniform bucket-level access
+    GS_QUERYSTRING_AUTH = False  # Public URLs without signed auth
+    GS_FILE_OVERWRITE = False
+
+
+# Media uploads are staged on local disk and pushed to the bucket by a
+# thread pool in chunks (see rooms.storage.StagedUploadMixin), with up
+# to GS_UPLOAD_ATTEMPTS tries before the file waits for the next resume.
+GS_STAGING_ROOT = env(
+    "GS_STAGING_ROOT", default=os.path.join(BASE_DIR, "media_staging")
+)
+GS_UPLOAD_WORKERS = env.int("GS_UPLOAD_WORKERS", default=4)
+GS_UPLOAD_ATTEMPTS = env.int("GS_UPLOAD_ATTEMPTS", default=3)
+GS_BLOB_CHUNK_SIZE = env.int("GS_BLOB_CHUNK_SIZE", default=8 * 1024 * 1024)
+
+# A directory standing in for the bucket, to run the GCS code offline.
+GS_LOCAL_BUCKET_ROOT = env("GS_LOCAL_BUCKET_ROOT", default=None)
+if GS_LOCAL_BUCKET_ROOT and not GS_BUCKET_NAME:
+    DEFAULT_FILE_STORAGE = "rooms.storage.LocalBucketMediaStorage"
 
 # Production Security Settings
 if not DEBUG:
@@ -169,7 +203,25 @@ CSRF_TRUSTED_ORIGINS = [
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # Email Backend
-EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+EMAIL_BACKEND = env(
+    "EMAIL_BACKEND", default="django.core.mail.backends.console.EmailBackend"
+)
+EMAIL_FILE_PATH = env("EMAIL_FILE_PATH", default=os.path.join(BASE_DIR, "sent_mail"))
+
+# Queued emails are sent in batches of MAIL_BATCH_SIZE per connection,
+# optionally capped at MAIL_RATE_LIMIT messages per second.
+MAIL_BATCH_SIZE = env.int("MAIL_BATCH_SIZE", default=50)
+MAIL_RATE_LIMIT = env.float("MAIL_RATE_LIMIT", default=None)
+
+# Background Jobs
+# Jobs are queued in the database and run by `manage.py run_jobs`.
+# JOBS_EAGER runs them in-process after commit instead (no worker).
+JOBS_EAGER = env.bool("JOBS_EAGER", default=False)
+JOBS_WORKERS = env.int("JOBS_WORKERS", default=4)
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_BACKOFF = 30  # seconds, doubled after every failed attempt
+JOBS_RETRY_BACKOFF_MAX = 60 * 60
+JOBS_LOCK_TIMEOUT = 10 * 60  # requeue jobs running longer than this
 
 # Logging configuration
 LOGGING = {
@@ -200,6 +252,10 @@ LOGGING = {
     },
 }
 
+# One timing line per request would drown the test output.
+if "test" in sys.argv:
+    LOGGING["loggers"]["rooms.middleware"] = {"level": "WARNING"}
+
 
 # Template Configuration
 TEMPLATES = [
@@ -220,6 +276,5 @@ TEMPLATES = [
 
 # Heroku-Specific Settings
 if "DYNO" in os.environ:
-    print("Running on Heroku, applying Heroku-specific settings")
     SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
     SECURE_SSL_REDIRECT = True
@@ -20,9 +20,35 @@ urlpatterns = [
         name="room_details_json",
     ),
     path("search-rooms/", rooms_views.search_rooms, name="search_rooms"),
+    path(
+        "search-rooms-json/",
+        rooms_views.search_rooms_json,
+        name="search_rooms_json",
+    ),
     path(
         "check-availability/", rooms_views.check_availability, name="check_availability"
     ),
+    path(
+        "availability-matrix/",
+        rooms_views.room_availability_matrix,
+        name="availability_matrix",
+    ),
+    path(
+        "page-cache-stats/",
+        rooms_views.page_cache_status,
+        name="page_cache_stats",
+    ),
+    path(
+        "export-bookings/",
+        rooms_views.export_bookings_view,
+        name="export_bookings",
+    ),
+    path(
+        "occupancy-report/",
+        rooms_views.occupancy_report_view,
+        name="occupancy_report",
+    ),
+    path("metrics", rooms_views.metrics, name="metrics"),
     # Booking URLs
     path("book-room/<int:room_id>/", rooms_views.book_room, name="book_room"),
     path(
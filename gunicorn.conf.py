@@ -0,0 +1,36 @@
+import os
+import shutil
+import tempfile
+
+# Workers write their Prometheus metrics to files in this directory and
+# /metrics sums them (see rooms.metrics). It is set here, in the master,
+# so every worker inherits it, and emptied so a restart starts at zero.
+multiproc_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR",
+    os.path.join(tempfile.gettempdir(), "daniels-hotell-metrics"),
+)
+shutil.rmtree(multiproc_dir, ignore_errors=True)
+os.makedirs(multiproc_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Let prometheus_client clean up after a worker that exited."""
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def post_worker_init(worker):
+    """Upload media files that a dead worker left staged."""
+    from django.core.files.storage import default_storage
+
+    if hasattr(default_storage, "resume_uploads"):
+        default_storage.resume_uploads()
+
+
+def worker_exit(server, worker):
+    """Finish this worker's media uploads before it goes away."""
+    from django.core.files.storage import default_storage
+
+    if hasattr(default_storage, "flush"):
+        default_storage.flush()
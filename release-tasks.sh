@@ -1,3 +1,4 @@
 #!/bin/bash
 python manage.py migrate rooms zero
 python manage.py migrate rooms
+python manage.py createcachetable
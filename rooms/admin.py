@@ -1,7 +1,15 @@
+import json
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path
+from django.utils import timezone
 
-from .models import Booking, CustomUser, Profile, Room, RoomImage
+from .models import Booking, CustomUser, Job, Profile, Room, RoomImage
+from .pagination import EstimatedCountPaginator
 
 
 @admin.register(CustomUser)
@@ -43,6 +51,7 @@ class ProfileAdmin(admin.ModelAdmin):
 class RoomImageInline(admin.TabularInline):
     model = RoomImage
     extra = 1
+    fields = ("image", "caption", "order")
 
 
 @admin.register(Room)
@@ -59,6 +68,34 @@ class RoomAdmin(admin.ModelAdmin):
     search_fields = ("name", "description")
     inlines = [RoomImageInline]
 
+    class Media:
+        js = ("js/admin_image_reorder.js",)
+
+    def get_urls(self):
+        return [
+            path(
+                "<path:object_id>/reorder-images/",
+                self.admin_site.admin_view(self.reorder_images_view),
+                name="rooms_room_reorder_images",
+            ),
+        ] + super().get_urls()
+
+    def reorder_images_view(self, request, object_id):
+        """Save the image order of a room after a drag in the inline."""
+        if request.method != "POST":
+            return HttpResponseNotAllowed(["POST"])
+        room = get_object_or_404(Room, pk=object_id)
+        if not self.has_change_permission(request, room):
+            raise PermissionDenied
+        try:
+            image_ids = [int(pk) for pk in json.loads(request.body)["ids"]]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse(
+                {"error": "Expected a list of image ids."}, status=400
+            )
+        images = RoomImage.reorder(room, image_ids)
+        return JsonResponse({"order": {image.pk: image.order for image in images}})
+
 
 @admin.register(RoomImage)
 class RoomImageAdmin(admin.ModelAdmin):
@@ -67,6 +104,43 @@ class RoomImageAdmin(admin.ModelAdmin):
     search_fields = ("room__name", "caption")
 
 
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """Filter a foreign key through the admin autocomplete view.
+
+    Only the selected object is loaded, instead of one link for every
+    row of the related table.
+    """
+
+    template = "admin/rooms/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.app_label = model._meta.app_label
+        self.model_name = model._meta.model_name
+        self.selected = None
+        if self.lookup_val:
+            related = field.remote_field.model
+            try:
+                self.selected = related._default_manager.get(pk=self.lookup_val)
+            except (related.DoesNotExist, ValueError, ValidationError):
+                pass
+
+    def field_choices(self, field, request, model_admin):
+        return []
+
+    def has_output(self):
+        return True
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.selected is None,
+            "query_string": changelist.get_query_string(
+                remove=[self.lookup_kwarg, self.lookup_kwarg_isnull]
+            ),
+            "display": "All",
+        }
+
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
     list_display = (
@@ -77,6 +151,46 @@ class BookingAdmin(admin.ModelAdmin):
         "total_price",
         "status",
     )
-    list_filter = ("status", "room", "check_in_date", "check_out_date")
-    search_fields = ("guest_name", "room__name", "email")
-    date_hierarchy = "check_in_date"
+    list_select_related = ("room",)
+    list_filter = (
+        "status",
+        ("room", AutocompleteFilter),
+        "check_in_date",
+        "check_out_date",
+    )
+    # Prefix searches, served by the UPPER(...) pattern_ops indexes
+    search_fields = ("^guest_name", "^email")
+    autocomplete_fields = ("room", "user")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    ordering = ("-check_in_date", "-id")
+
+    class Media:
+        css = {
+            "screen": (
+                "admin/css/vendor/select2/select2.css",
+                "admin/css/autocomplete.css",
+            )
+        }
+        js = (
+            "admin/js/vendor/jquery/jquery.js",
+            "admin/js/vendor/select2/select2.full.js",
+            "admin/js/jquery.init.js",
+            "admin/js/autocomplete.js",
+            "js/admin_autocomplete_filter.js",
+        )
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("name", "status", "attempts", "run_after", "updated_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("locked_by", "locked_at", "last_error", "created_at")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="Retry selected jobs")
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status="RUNNING").update(
+            status="PENDING", attempts=0, run_after=timezone.now()
+        )
+        self.message_user(request, f"{updated} jobs queued for retry.")
@@ -0,0 +1,155 @@
+import base64
+import logging
+
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+
+from .models import Booking, Room, RoomNight
+
+logger = logging.getLogger(__name__)
+
+
+def is_room_available(
+    room, check_in_date, check_out_date, exclude_booking_id=None
+):
+    """Check if a room is free for every night of the given stay."""
+    occupied = RoomNight.objects.filter(room=room).overlapping(
+        check_in_date, check_out_date
+    )
+    if exclude_booking_id:
+        occupied = occupied.exclude(booking_id=exclude_booking_id)
+    return not occupied.exists()
+
+
+def expected_room_nights():
+    """Yield the (room_id, night, booking_id) rows implied by bookings."""
+    bookings = (
+        Booking.objects.exclude(status="CANCELLED")
+        .only("id", "room_id", "check_in_date", "check_out_date", "status")
+        .order_by("room_id", "check_in_date")
+    )
+    for booking in bookings.iterator(chunk_size=2000):
+        for night in booking.nights:
+            yield booking.room_id, night, booking.id
+
+
+def rebuild_room_nights(batch_size=5000):
+    """Recreate the whole room-night index from the Booking table.
+
+    Returns ``(created, conflicts)``; conflicting nights (two active
+    bookings on the same room and night) keep the earlier booking.
+    """
+    created = 0
+    conflicts = []
+    seen = set()
+    batch = []
+    with transaction.atomic():
+        RoomNight.objects.all().delete()
+        for room_id, night, booking_id in expected_room_nights():
+            if (room_id, night) in seen:
+                conflicts.append((room_id, night, booking_id))
+                continue
+            seen.add((room_id, night))
+            batch.append(
+                RoomNight(room_id=room_id, night=night, booking_id=booking_id)
+            )
+            if len(batch) >= batch_size:
+                RoomNight.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        RoomNight.objects.bulk_create(batch)
+        created += len(batch)
+
+    for room_id, night, booking_id in conflicts:
+        logger.warning(
+            "Booking %s overlaps room %s on %s", booking_id, room_id, night
+        )
+    return created, conflicts
+
+
+def verify_room_nights():
+    """Compare the index with the Booking table.
+
+    Returns ``(missing, unexpected)`` as sets of
+    ``(room_id, night, booking_id)`` tuples.
+    """
+    expected = set(expected_room_nights())
+    actual = set(
+        RoomNight.objects.values_list("room_id", "night", "booking_id")
+    )
+    return expected - actual, actual - expected
+
+
+def encode_bitmap(offsets, days):
+    """Pack night offsets into a base64 bitmap, most significant bit first."""
+    bitmap = bytearray((days + 7) // 8)
+    for offset in offsets:
+        bitmap[offset // 8] |= 0x80 >> (offset % 8)
+    return base64.b64encode(bytes(bitmap)).decode("ascii")
+
+
+def encode_runs(offsets):
+    """Collapse sorted night offsets into ``[start, length]`` runs."""
+    runs = []
+    for offset in offsets:
+        if runs and runs[-1][0] + runs[-1][1] == offset:
+            runs[-1][1] += 1
+        else:
+            runs.append([offset, 1])
+    return runs
+
+
+def availability_matrix(start_date, end_date, room_type=None, encoding="bitmap"):
+    """Build the occupancy grid of every room over a date window.
+
+    Rooms and their occupied nights are read with a single LEFT JOIN on
+    the room-night index, so the cost does not grow with the number of
+    rooms requested.
+    """
+    days = (end_date - start_date).days
+    rooms = Room.objects.all()
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+    rows = (
+        rooms.annotate(
+            window=FilteredRelation(
+                "nights",
+                condition=Q(
+                    nights__night__gte=start_date,
+                    nights__night__lt=end_date,
+                ),
+            )
+        )
+        .values_list("id", "name", "room_type", "available", "window__night")
+        .order_by("id", "window__night")
+    )
+
+    grid = {}
+    for room_id, name, kind, available, night in rows:
+        entry = grid.setdefault(
+            room_id,
+            {
+                "id": room_id,
+                "name": name,
+                "room_type": kind,
+                "available": available,
+                "offsets": [],
+            },
+        )
+        if night is not None:
+            entry["offsets"].append((night - start_date).days)
+
+    for entry in grid.values():
+        offsets = entry.pop("offsets")
+        if encoding == "runs":
+            entry["occupied"] = encode_runs(offsets)
+        else:
+            entry["occupied"] = encode_bitmap(offsets, days)
+
+    return {
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "days": days,
+        "encoding": encoding,
+        "rooms": list(grid.values()),
+    }
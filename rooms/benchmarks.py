@@ -0,0 +1,250 @@
+import contextlib
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.utils import timezone
+
+from .models import Booking, Room, RoomImage, RoomNight
+from .occupancy import rebuild_occupancy
+
+BENCH_PASSWORD = "bench-pass-123"
+
+
+@contextlib.contextmanager
+def scratch_database(verbosity=0):
+    """Run the block against a freshly migrated throwaway database.
+
+    Benchmarks seed millions of rows, so they must never touch the
+    configured database. This reuses the test runner's database
+    creation and tears the copy down afterwards.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+
+
+def seed_dataset(
+    rooms=100,
+    bookings=10000,
+    users=100,
+    images=0,
+    batch_size=5000,
+    cancelled_ratio=0.1,
+    seed=42,
+):
+    """Bulk-create a synthetic hotel with non-overlapping bookings.
+
+    Stays are laid out back to back per room around today, so the
+    room-night index can be filled without conflicts. Returns the
+    number of rows created per model.
+    """
+    rng = random.Random(seed)
+    User = get_user_model()
+
+    bench_user = User(username="bench0", email="bench0@example.com")
+    bench_user.set_password(BENCH_PASSWORD)
+    User.objects.bulk_create(
+        [bench_user]
+        + [
+            User(
+                username=f"bench{i}",
+                email=f"bench{i}@example.com",
+                password="!",
+            )
+            for i in range(1, users)
+        ],
+        batch_size=batch_size,
+    )
+    user_ids = list(User.objects.values_list("id", flat=True))
+
+    room_types = [code for code, _ in Room.ROOM_TYPES]
+    Room.objects.bulk_create(
+        (
+            Room(
+                name=f"Room {i}",
+                description="Benchmark room",
+                room_type=rng.choice(room_types),
+                price=Decimal(rng.randrange(50, 500)),
+                available=rng.random() > 0.05,
+                max_occupancy=rng.randint(1, 6),
+                size=rng.randrange(150, 900),
+            )
+            for i in range(rooms)
+        ),
+        batch_size=batch_size,
+    )
+    room_rows = list(Room.objects.values_list("id", "price"))
+
+    if images:
+        RoomImage.objects.bulk_create(
+            (
+                RoomImage(
+                    room_id=room_rows[i % len(room_rows)][0],
+                    image=f"room_images/bench-{i}.jpg",
+                    order=(i // len(room_rows) + 1) * 1024,
+                )
+                for i in range(images)
+            ),
+            batch_size=batch_size,
+        )
+
+    per_room = max(1, bookings // max(1, rooms))
+    origin = timezone.now().date() - timedelta(days=per_room * 2)
+    created = 0
+    booking_batch = []
+    for room_id, price in room_rows:
+        cursor = origin
+        for _ in range(per_room):
+            if created >= bookings:
+                break
+            cursor += timedelta(days=rng.randint(0, 2))
+            nights = rng.randint(1, 5)
+            booking_batch.append(
+                Booking(
+                    room_id=room_id,
+                    user_id=rng.choice(user_ids),
+                    guest_name=f"Guest {created}",
+                    email=f"guest{created}@example.com",
+                    check_in_date=cursor,
+                    check_out_date=cursor + timedelta(days=nights),
+                    total_price=price * nights,
+                    status=(
+                        "CANCELLED"
+                        if rng.random() < cancelled_ratio
+                        else "CONFIRMED"
+                    ),
+                )
+            )
+            cursor += timedelta(days=nights)
+            created += 1
+            if len(booking_batch) >= batch_size:
+                _insert_bookings(booking_batch)
+                booking_batch = []
+    _insert_bookings(booking_batch)
+    occupancy_rows, _ = rebuild_occupancy()
+
+    return {
+        "users": users,
+        "rooms": rooms,
+        "images": images,
+        "bookings": created,
+        "room_nights": RoomNight.objects.count(),
+        "occupancy_rows": occupancy_rows,
+    }
+
+
+def _insert_bookings(batch):
+    """Insert a batch of bookings together with their room nights."""
+    Booking.objects.bulk_create(batch)
+    RoomNight.objects.bulk_create(
+        RoomNight(room_id=booking.room_id, booking=booking, night=night)
+        for booking in batch
+        if booking.occupies_room
+        for night in booking.nights
+    )
+
+
+def measure(func, repeat=20, warmup=2, setup=None):
+    """Call ``func`` repeatedly and return the durations in seconds.
+
+    ``setup``, if given, runs untimed before every timed call.
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    """Return the nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples):
+    """Summarize durations (seconds) as millisecond statistics."""
+    return {
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3),
+        "samples": len(samples),
+    }
+
+
+def profile(func, repeat=20, warmup=2):
+    """Time ``func`` and count its queries and peak Python allocations.
+
+    Latency is measured without tracemalloc, which slows allocation
+    heavy code down several times; queries and the memory peak come
+    from one extra call each.
+    """
+    latency = summarize(measure(func, repeat=repeat, warmup=warmup))
+    # Not CaptureQueriesContext: request_started resets its query log.
+    queries = []
+
+    def count(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count):
+        func()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "latency": latency,
+        "queries": len(queries),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def compare(results, baseline, tolerance=0.2):
+    """List the regressions of ``results`` against a baseline run.
+
+    Both map scenario names to ``profile`` output. p95 latency and the
+    memory peak may grow by ``tolerance`` (a fraction) before they
+    count; any extra query counts.
+    """
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        checks = (
+            ("p95", current["latency"]["p95_ms"], before["latency"]["p95_ms"]),
+            ("peak KiB", current["peak_kib"], before["peak_kib"]),
+        )
+        for label, now, then in checks:
+            if now > then * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {label} {then} -> {now} "
+                    f"(+{(now / then - 1) * 100 if then else math.inf:.0f}%)"
+                )
+        if current["queries"] > before["queries"]:
+            regressions.append(
+                f"{name}: queries {before['queries']} -> {current['queries']}"
+            )
+    return regressions
@@ -0,0 +1,157 @@
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import timezone
+
+from .metrics import PAGE_CACHE_REQUESTS, page_cache_counts
+
+# Models whose changes invalidate cached pages, by version key name.
+VERSIONED_MODELS = ("room", "roomimage", "booking")
+
+VERSION_KEY = "pagecache:version:{}"
+PAGE_KEY = "pagecache:page:{}:{}:{}"
+
+# Cached pages are immutable: a new version key makes old entries
+# unreachable, so they only need to live long enough to be reused.
+PAGE_TIMEOUT = 60 * 60 * 24
+
+
+def get_versions(model_names):
+    """Return the current cache versions for several models."""
+    keys = [VERSION_KEY.format(name) for name in model_names]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, 1, timeout=None)
+            versions[key] = cache.get(key, 1)
+    return [versions[key] for key in keys]
+
+
+def bump_version(model_name):
+    """Invalidate every cached page that depends on a model."""
+    key = VERSION_KEY.format(model_name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted or never set: any fresh value invalidates old pages.
+        cache.set(key, int(timezone.now().timestamp()), timeout=None)
+
+
+def _count(view_name, outcome):
+    PAGE_CACHE_REQUESTS.labels(view=view_name, outcome=outcome).inc()
+
+
+def page_cache_stats(view_names):
+    """Return hit and miss counts for the given cached views.
+
+    The counts come from the ``PAGE_CACHE_REQUESTS`` metric, so serving a
+    page never writes to the cache, and cover every process that shares
+    the Prometheus multiprocess directory.
+    """
+    counts = page_cache_counts()
+    stats = {}
+    for name in view_names:
+        hits = counts.get((name, "hits"), 0)
+        misses = counts.get((name, "misses"), 0)
+        total = hits + misses
+        stats[name] = {
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def normalized_query(request):
+    """Return the GET filters as a canonical string."""
+    items = sorted(
+        (key, value)
+        for key, values in request.GET.lists()
+        for value in values
+        if value != ""
+    )
+    return "&".join(f"{key}={value}" for key, value in items)
+
+
+def page_cache_key(request, view_name, depends_on):
+    """Build the cache key of a page for the current model versions.
+
+    Today's date is part of the key because pages prefill the search
+    form with today and tomorrow.
+    """
+    versions = ".".join(str(v) for v in get_versions(depends_on))
+    digest = hashlib.md5(
+        f"{request.path}?{normalized_query(request)}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return PAGE_KEY.format(
+        view_name, f"{timezone.now().date()}.{versions}", digest
+    )
+
+
+def is_cacheable_request(request):
+    """Only anonymous GETs without pending flash messages are cached.
+
+    Nothing is cached unless ``PAGE_CACHE_ENABLED``, which is off with a
+    process-local cache backend.
+    """
+    return (
+        settings.PAGE_CACHE_ENABLED
+        and request.method in ("GET", "HEAD")
+        and not request.user.is_authenticated
+        and not len(messages.get_messages(request))
+    )
+
+
+def is_cacheable_response(request, response):
+    """Skip responses carrying per-visitor state such as CSRF cookies."""
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+    )
+
+
+def cache_anonymous_page(*depends_on):
+    """Cache a view's rendered page for anonymous visitors.
+
+    ``depends_on`` names the models (see ``VERSIONED_MODELS``) whose
+    changes must invalidate the page; signals bump their versions.
+    """
+
+    def decorator(view_func):
+        view_name = view_func.__name__
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = page_cache_key(request, view_name, depends_on)
+            cached = cache.get(key)
+            if cached is not None:
+                _count(view_name, "hits")
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response["X-Page-Cache"] = "HIT"
+                return response
+
+            _count(view_name, "misses")
+            response = view_func(request, *args, **kwargs)
+            if is_cacheable_response(request, response):
+                cache.set(
+                    key,
+                    (response.content, response["Content-Type"]),
+                    PAGE_TIMEOUT,
+                )
+            response["X-Page-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,28 @@
+import os
+
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """Warn when several workers would each get a private cache.
+
+    Cache versions kept in local memory are only seen by the process
+    that wrote them, so invalidations do not reach the other gunicorn
+    workers or the job worker.
+    """
+    backend = settings.CACHES["default"]["BACKEND"]
+    workers = int(os.environ.get("WEB_CONCURRENCY") or 1)
+    if backend.endswith("locmem.LocMemCache") and workers > 1:
+        return [
+            Warning(
+                f"The default cache is local memory but WEB_CONCURRENCY "
+                f"runs {workers} workers; cached pages and ETags go "
+                "stale in the workers that miss an invalidation.",
+                hint="Set CACHE_URL to a shared backend (redis://, "
+                "pymemcache://) or leave it unset for the database cache.",
+                id="rooms.W001",
+            )
+        ]
+    return []
@@ -0,0 +1,148 @@
+"""Streaming exports of the Booking table.
+
+Rows are read with ``QuerySet.iterator``, which on PostgreSQL uses a
+server-side cursor, and serialized a few hundred at a time, so memory
+stays flat however many bookings there are.
+"""
+
+import csv
+import io
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.dateparse import parse_date
+
+from .models import Booking
+
+# Column name -> lookup, booking joined with its room and user.
+EXPORT_COLUMNS = {
+    "id": "id",
+    "room_id": "room_id",
+    "room_name": "room__name",
+    "room_type": "room__room_type",
+    "user_id": "user_id",
+    "username": "user__username",
+    "user_email": "user__email",
+    "guest_name": "guest_name",
+    "email": "email",
+    "phone_number": "phone_number",
+    "check_in_date": "check_in_date",
+    "check_out_date": "check_out_date",
+    "total_price": "total_price",
+    "status": "status",
+    "created_at": "created_at",
+    "updated_at": "updated_at",
+}
+
+EXPORT_FORMATS = ("csv", "jsonl")
+
+# Rows fetched per round trip, and serialized per yielded chunk.
+CHUNK_SIZE = 2000
+ROWS_PER_WRITE = 500
+
+STATUSES = {code for code, _ in Booking.STATUS_CHOICES}
+
+
+class ExportError(ValueError):
+    """Invalid export filters."""
+
+
+def parse_filters(params):
+    """Read ``from``, ``to`` and ``status`` export filters.
+
+    ``from``/``to`` bound the check-in date (``to`` exclusive) and
+    ``status`` is a comma-separated list.
+    """
+    filters = {}
+    bounds = (("from", "check_in_date__gte"), ("to", "check_in_date__lt"))
+    for name, lookup in bounds:
+        value = params.get(name)
+        if not value:
+            continue
+        try:
+            filters[lookup] = parse_date(value)
+        except ValueError:
+            filters[lookup] = None
+        if filters[lookup] is None:
+            raise ExportError(f"'{name}' must be a date (YYYY-MM-DD).")
+    statuses = [
+        status.strip().upper()
+        for status in (params.get("status") or "").split(",")
+        if status.strip()
+    ]
+    if set(statuses) - STATUSES:
+        raise ExportError(
+            f"'status' must be among {', '.join(sorted(STATUSES))}."
+        )
+    if statuses:
+        filters["status__in"] = statuses
+    return filters
+
+
+def export_rows(filters, chunk_size=CHUNK_SIZE):
+    """Yield booking rows as tuples in ``EXPORT_COLUMNS`` order."""
+    return (
+        Booking.objects.filter(**filters)
+        .order_by("id")
+        .values_list(*EXPORT_COLUMNS.values())
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _batches(rows, size=ROWS_PER_WRITE):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def csv_chunks(rows):
+    """Yield the rows as CSV text, header first."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+    for batch in _batches(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(batch)
+        yield buffer.getvalue()
+
+
+def jsonl_chunks(rows):
+    """Yield the rows as JSON lines."""
+    encoder = DjangoJSONEncoder()
+    columns = list(EXPORT_COLUMNS)
+    for batch in _batches(rows):
+        yield "".join(
+            encoder.encode(dict(zip(columns, row))) + "\n" for row in batch
+        )
+
+
+def encode(chunks, compress=False):
+    """Encode text chunks as UTF-8, gzipped on the fly if asked."""
+    if not compress:
+        for chunk in chunks:
+            yield chunk.encode()
+        return
+    # wbits=31 writes a gzip header and trailer around the deflate data.
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_bookings(filters, fmt="csv", compress=False, chunk_size=CHUNK_SIZE):
+    """Return an iterator of bytes of the filtered bookings."""
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(
+            f"'format' must be one of {', '.join(EXPORT_FORMATS)}."
+        )
+    serialize = csv_chunks if fmt == "csv" else jsonl_chunks
+    return encode(serialize(export_rows(filters, chunk_size)), compress)
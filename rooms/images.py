@@ -0,0 +1,112 @@
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Widths (px) of the resized copies made of every uploaded room image.
+DERIVATIVE_WIDTHS = (320, 640, 1024, 1600)
+
+# Extension -> (Pillow format, save options). WebP first: templates
+# offer it to browsers that support it and fall back to JPEG.
+DERIVATIVE_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpg": ("JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def derivative_name(name, width, ext):
+    """Return the storage name of one derivative, next to the original."""
+    root, _ = os.path.splitext(name)
+    return f"{root}-{width}w.{ext}"
+
+
+def target_widths(original_width):
+    """Return the derivative widths worth making for an image.
+
+    Every standard width below the original, plus one copy at the
+    original width capped at the largest standard one. Images are never
+    upscaled.
+    """
+    widths = [w for w in DERIVATIVE_WIDTHS if w < original_width]
+    return widths + [min(original_width, DERIVATIVE_WIDTHS[-1])]
+
+
+def _encode(image, ext):
+    image_format, options = DERIVATIVE_FORMATS[ext]
+    if image_format == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def build_derivatives(name, storage=None):
+    """Render the resized WebP and JPEG copies of a stored image.
+
+    Returns the mapping kept in ``RoomImage.derivatives``: the source
+    name and, per extension, the storage name of each width.
+    """
+    storage = storage or default_storage
+    with storage.open(name, "rb") as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        original.load()
+    if original.mode not in ("RGB", "RGBA"):
+        original = original.convert("RGBA" if "A" in original.mode else "RGB")
+
+    derivatives = {"source": name, "width": original.width}
+    for width in target_widths(original.width):
+        height = max(1, round(original.height * width / original.width))
+        resized = original.resize((width, height), Image.LANCZOS)
+        for ext in DERIVATIVE_FORMATS:
+            target = derivative_name(name, width, ext)
+            if storage.exists(target):
+                storage.delete(target)
+            stored = storage.save(target, _encode(resized, ext))
+            derivatives.setdefault(ext, {})[str(width)] = stored
+    return derivatives
+
+
+def derivative_names(derivatives):
+    """Return every storage name listed in a ``derivatives`` mapping."""
+    return {
+        name
+        for ext in DERIVATIVE_FORMATS
+        for name in derivatives.get(ext, {}).values()
+    }
+
+
+def wait_for_upload(names, storage=None):
+    """Make sure files are in the bucket before a job relies on them.
+
+    Uploads staged by this process are flushed first. A file that is
+    still staged, or that the process which saved it has not uploaded
+    yet, raises FileNotFoundError so that the calling job is retried.
+    """
+    storage = storage or default_storage
+    if not hasattr(storage, "is_staged"):
+        # Every other storage saves files before ``save`` returns.
+        return
+    names = list(names)
+    storage.flush(names)
+    for name in names:
+        if storage.is_staged(name) or not storage.exists(name):
+            raise FileNotFoundError(f"{name} is not uploaded yet")
+
+
+def delete_files(names, storage=None):
+    """Delete stored files, in batches when the storage supports it."""
+    storage = storage or default_storage
+    names = sorted(set(name for name in names if name))
+    if hasattr(storage, "delete_many"):
+        storage.delete_many(names)
+        return
+    for name in names:
+        storage.delete(name)
+
+
+def delete_derivatives(derivatives, keep=None, storage=None):
+    """Remove the stored copies of an image, except those in ``keep``."""
+    kept = derivative_names(keep or {})
+    delete_files(derivative_names(derivatives) - kept, storage)
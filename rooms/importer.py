@@ -0,0 +1,351 @@
+"""Bulk import of bookings exported from another system.
+
+The input is read twice. The first pass parses every row and keeps
+only ``(check_in, check_out, line)`` per room. Overlaps are then found
+per room in memory by sorting those intervals and sweeping them once,
+against the room's existing bookings as well. The second pass inserts
+the accepted rows with ``bulk_create``, together with their room
+nights, in chunked transactions. Nothing runs a query per row. The
+daily occupancy summary is then rebuilt for the imported dates.
+"""
+
+import csv
+import gzip
+import json
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .cache import bump_version
+from .models import Booking, Room, RoomNight
+from .occupancy import rebuild_occupancy
+
+STATUSES = {code for code, _ in Booking.STATUS_CHOICES}
+
+CONFLICT = "overlaps another booking"
+
+
+class RowError(ValueError):
+    """A row that cannot become a booking."""
+
+
+@dataclass
+class ImportReport:
+    """Outcome of an import run."""
+
+    rows: int = 0
+    processed: int = 0
+    imported: int = 0
+    room_nights: int = 0
+    invalid: int = 0
+    conflicts: int = 0
+    elapsed: float = 0.0
+    rejects: dict = field(default_factory=dict)
+
+    @property
+    def rows_per_second(self):
+        if not self.elapsed:
+            return 0.0
+        return self.processed / self.elapsed
+
+
+def open_input(path):
+    """Open a CSV or JSONL file, gzipped when it ends in ``.gz``."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_rows(path, fmt=None):
+    """Yield ``(line, row)`` pairs, with ``row`` a dict of strings.
+
+    ``fmt`` is ``csv`` or ``jsonl``; by default it follows the file
+    extension.
+    """
+    fmt = fmt or ("jsonl" if ".jsonl" in path or ".json" in path else "csv")
+    with open_input(path) as handle:
+        if fmt == "jsonl":
+            for line, text in enumerate(handle, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    row = json.loads(text)
+                except ValueError:
+                    row = {"_raw": text.rstrip("\n")}
+                if not isinstance(row, dict):
+                    row = {"_raw": text.rstrip("\n")}
+                yield line, row
+        else:
+            # Line 1 is the header.
+            for line, row in enumerate(csv.DictReader(handle), start=2):
+                yield line, row
+
+
+def _date(row, name):
+    try:
+        return date.fromisoformat(str(row.get(name) or "").strip())
+    except ValueError:
+        raise RowError(f"invalid {name}")
+
+
+class RowParser:
+    """Validate input rows into booking fields without touching the DB.
+
+    Rooms may be given by ``room_id`` or by ``room`` (name); both are
+    resolved from one query made up front.
+    """
+
+    def __init__(self):
+        rooms = Room.objects.values_list("id", "name", "price")
+        self.prices = {room_id: price for room_id, _, price in rooms}
+        self.by_name = {name: room_id for room_id, name, _ in rooms}
+
+    def room_id(self, row):
+        value = str(row.get("room_id") or "").strip()
+        if value:
+            try:
+                room_id = int(value)
+            except ValueError:
+                raise RowError("invalid room_id")
+        else:
+            room_id = self.by_name.get(str(row.get("room") or "").strip())
+        if room_id not in self.prices:
+            raise RowError("unknown room")
+        return room_id
+
+    def parse(self, row):
+        """Return the cleaned ``Booking`` field values of a row."""
+        if "_raw" in row:
+            raise RowError("unreadable row")
+        room_id = self.room_id(row)
+        check_in = _date(row, "check_in_date")
+        check_out = _date(row, "check_out_date")
+        if check_in >= check_out:
+            raise RowError("check-out not after check-in")
+        status = str(row.get("status") or "CONFIRMED").strip().upper()
+        if status not in STATUSES:
+            raise RowError("invalid status")
+        guest_name = str(row.get("guest_name") or "").strip()
+        if not guest_name or len(guest_name) > 100:
+            raise RowError("invalid guest_name")
+        email = str(row.get("email") or "").strip()
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise RowError("invalid email")
+        phone = str(row.get("phone_number") or "").strip() or None
+        if phone and len(phone) > 15:
+            raise RowError("invalid phone_number")
+        price = str(row.get("total_price") or "").strip()
+        try:
+            total_price = (
+                Decimal(price)
+                if price
+                else self.prices[room_id] * (check_out - check_in).days
+            )
+        except InvalidOperation:
+            raise RowError("invalid total_price")
+        if not total_price.is_finite() or total_price.as_tuple().exponent < -2:
+            raise RowError("invalid total_price")
+        return {
+            "room_id": room_id,
+            "guest_name": guest_name,
+            "email": email,
+            "phone_number": phone,
+            "check_in_date": check_in,
+            "check_out_date": check_out,
+            "total_price": total_price,
+            "status": status,
+        }
+
+
+def sweep(intervals, fixed=()):
+    """Return the keys of intervals that overlap an earlier one.
+
+    ``intervals`` are ``(start, end, key)`` half-open ranges of one
+    room. They are sorted by start and kept greedily; one that begins
+    before the last kept one ends is a conflict. ``fixed`` ranges (the
+    room's existing bookings) never overlap each other and always win.
+    """
+    fixed = sorted(fixed)
+    fixed_starts = [start for start, _ in fixed]
+    conflicts = set()
+    kept_end = None
+    for start, end, key in sorted(intervals):
+        if kept_end is not None and start < kept_end:
+            conflicts.add(key)
+            continue
+        # The only fixed range that can overlap is the last one that
+        # starts before this one ends.
+        i = bisect_left(fixed_starts, end)
+        if i and fixed[i - 1][1] > start:
+            conflicts.add(key)
+            continue
+        kept_end = end
+    return conflicts
+
+
+def existing_stays(room_ids):
+    """Return the active stays already booked, by room."""
+    stays = {}
+    rows = (
+        Booking.objects.filter(room_id__in=room_ids)
+        .exclude(status="CANCELLED")
+        .values_list("room_id", "check_in_date", "check_out_date")
+    )
+    for room_id, check_in, check_out in rows.iterator(chunk_size=5000):
+        stays.setdefault(room_id, []).append(
+            (check_in.toordinal(), check_out.toordinal())
+        )
+    return stays
+
+
+def plan_import(path, fmt=None, parser=None):
+    """First pass: validate every row and find the conflicting ones.
+
+    Returns ``(rows, rejects)``, ``rejects`` mapping line numbers to a
+    reason.
+    """
+    parser = parser or RowParser()
+    rejects = {}
+    intervals = {}
+    rows = 0
+    for line, row in read_rows(path, fmt):
+        rows += 1
+        try:
+            fields = parser.parse(row)
+        except RowError as exc:
+            rejects[line] = str(exc)
+            continue
+        if fields["status"] != "CANCELLED":
+            intervals.setdefault(fields["room_id"], []).append(
+                (
+                    fields["check_in_date"].toordinal(),
+                    fields["check_out_date"].toordinal(),
+                    line,
+                )
+            )
+
+    fixed = existing_stays(list(intervals))
+    for room_id, stays in intervals.items():
+        for line in sweep(stays, fixed.get(room_id, ())):
+            rejects[line] = CONFLICT
+    return rows, rejects
+
+
+def _room_nights(bookings):
+    return [
+        RoomNight(room_id=booking.room_id, booking_id=booking.pk, night=night)
+        for booking in bookings
+        if booking.occupies_room
+        for night in booking.nights
+    ]
+
+
+def _insert(bookings, batch_size):
+    """Insert bookings and their nights; return the nights created."""
+    Booking.objects.bulk_create(bookings, batch_size=batch_size)
+    nights = _room_nights(bookings)
+    RoomNight.objects.bulk_create(nights, batch_size=batch_size)
+    return len(nights)
+
+
+def import_bookings(
+    path,
+    fmt=None,
+    batch_size=2000,
+    chunk_size=20000,
+    dry_run=False,
+    progress=None,
+):
+    """Import bookings from ``path``; return an ``ImportReport``.
+
+    ``batch_size`` rows go into each INSERT and ``chunk_size`` rows are
+    committed per transaction; chunks committed before a crash stay.
+    ``progress(report)`` is called after every chunk. A chunk that
+    still hits the database overlap guard, because of a booking made
+    meanwhile, is retried row by row and the losers rejected.
+    """
+    start = time.perf_counter()
+    report = ImportReport()
+    parser = RowParser()
+    report.rows, report.rejects = plan_import(path, fmt, parser)
+
+    chunk = []
+    # Nights covered by the imported rows.
+    first = last = None
+
+    def flush():
+        if dry_run:
+            report.imported += len(chunk)
+        elif chunk:
+            report.room_nights += _write_chunk(chunk, batch_size, report)
+        chunk.clear()
+        report.elapsed = time.perf_counter() - start
+        if progress:
+            progress(report)
+
+    for line, row in read_rows(path, fmt):
+        report.processed += 1
+        if line in report.rejects:
+            continue
+        # Rows were validated by the first pass.
+        booking = Booking(**parser.parse(row))
+        chunk.append((line, booking))
+        first = min(first or booking.check_in_date, booking.check_in_date)
+        last = max(last or booking.check_out_date, booking.check_out_date)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+    for reason in report.rejects.values():
+        if reason == CONFLICT:
+            report.conflicts += 1
+        else:
+            report.invalid += 1
+    if report.imported and not dry_run:
+        rebuild_occupancy(first, last)
+        bump_version("booking")
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def _write_chunk(chunk, batch_size, report):
+    bookings = [booking for _, booking in chunk]
+    try:
+        with transaction.atomic():
+            nights = _insert(bookings, batch_size)
+    except IntegrityError:
+        nights = 0
+        for line, booking in chunk:
+            booking.pk = None
+            booking._state.adding = True
+            try:
+                with transaction.atomic():
+                    nights += _insert([booking], batch_size)
+            except IntegrityError:
+                report.rejects[line] = CONFLICT
+            else:
+                report.imported += 1
+        return nights
+    report.imported += len(bookings)
+    return nights
+
+
+def write_rejects(path, rejects, source, fmt=None):
+    """Write rejected rows to ``path`` as JSONL with line and reason."""
+    with open(path, "w", encoding="utf-8") as out:
+        for line, row in read_rows(source, fmt):
+            if line in rejects:
+                out.write(
+                    json.dumps(
+                        {"line": line, "reason": rejects[line], "row": row}
+                    )
+                    + "\n"
+                )
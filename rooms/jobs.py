@@ -0,0 +1,196 @@
+import logging
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def register(name, batch=False):
+    """Register a function as the handler of the named job.
+
+    A batch handler receives the payloads of every claimed job of that
+    name at once and returns, in order, ``None`` or the exception each
+    item failed with.
+    """
+
+    def decorator(func):
+        _handlers[name] = (func, batch)
+        return func
+
+    return decorator
+
+
+def enqueue(name, max_attempts=None, **payload):
+    """Queue a job in the caller's transaction.
+
+    The row commits or rolls back together with the change that caused
+    it. With ``JOBS_EAGER`` the job also runs in-process right after
+    the commit, which is handy without a worker in development.
+    """
+    if name not in _handlers:
+        raise ValueError(f"No handler registered for job {name!r}")
+    job = Job.objects.create(
+        name=name,
+        payload=payload,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+    if settings.JOBS_EAGER:
+        transaction.on_commit(lambda: run_jobs([job.pk]))
+    return job
+
+
+def backoff(attempts):
+    """Return the delay before retrying a job that failed ``attempts`` times."""
+    delay = settings.JOBS_RETRY_BACKOFF * 2 ** (attempts - 1)
+    return timedelta(seconds=min(delay, settings.JOBS_RETRY_BACKOFF_MAX))
+
+
+def release_stale_jobs():
+    """Requeue jobs whose worker died while running them."""
+    cutoff = timezone.now() - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    return Job.objects.filter(status="RUNNING", locked_at__lt=cutoff).update(
+        status="PENDING", locked_by=""
+    )
+
+
+def claim_jobs(limit, job_ids=None, name=None):
+    """Atomically mark up to ``limit`` ready jobs as running.
+
+    The conditional UPDATE only matches rows that are still pending, so
+    concurrent workers never claim the same job on any backend.
+    """
+    now = timezone.now()
+    ready = Job.objects.filter(status="PENDING", run_after__lte=now)
+    if job_ids is not None:
+        ready = ready.filter(id__in=job_ids)
+    if name is not None:
+        ready = ready.filter(name=name)
+    ids = list(
+        ready.order_by("run_after", "id").values_list("id", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    Job.objects.filter(id__in=ids, status="PENDING").update(
+        status="RUNNING",
+        locked_by=token,
+        locked_at=now,
+        attempts=F("attempts") + 1,
+    )
+    return list(
+        Job.objects.filter(locked_by=token, status="RUNNING")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def record_outcome(job, error=None):
+    """Mark a job done, schedule a retry, or dead-letter it.
+
+    Failures are retried with exponential backoff until the job runs
+    out of attempts.
+    """
+    now = timezone.now()
+    if error is None:
+        Job.objects.filter(pk=job.pk).update(
+            status="DONE", last_error="", updated_at=now
+        )
+        return "DONE"
+
+    if isinstance(error, BaseException):
+        error = "".join(traceback.format_exception(error))
+    if job.attempts >= job.max_attempts:
+        logger.error("Job %s is dead: %s", job, error)
+        Job.objects.filter(pk=job.pk).update(
+            status="DEAD", last_error=error, updated_at=now
+        )
+        return "DEAD"
+
+    logger.warning("Job %s failed, retrying: %s", job, error)
+    Job.objects.filter(pk=job.pk).update(
+        status="PENDING",
+        locked_by="",
+        run_after=now + backoff(job.attempts),
+        last_error=error,
+        updated_at=now,
+    )
+    return "RETRY"
+
+
+def execute_jobs(job_ids):
+    """Run claimed jobs of one name and return their outcomes.
+
+    Batch handlers get all payloads in a single call; other handlers
+    run once per job.
+    """
+    jobs = list(Job.objects.filter(id__in=job_ids).order_by("id"))
+    if not jobs:
+        return []
+    func, batch = _handlers[jobs[0].name]
+
+    if batch:
+        try:
+            errors = func([job.payload for job in jobs])
+        except Exception as exc:
+            errors = [exc] * len(jobs)
+        return [record_outcome(job, err) for job, err in zip(jobs, errors)]
+
+    outcomes = []
+    for job in jobs:
+        try:
+            func(**job.payload)
+        except Exception as exc:
+            outcomes.append(record_outcome(job, exc))
+        else:
+            outcomes.append(record_outcome(job))
+    return outcomes
+
+
+def group_jobs(job_ids):
+    """Split claimed jobs into units of work for a pool.
+
+    Jobs with a batch handler are grouped per name; every other job is
+    a unit of its own.
+    """
+    units = {}
+    singles = []
+    for job_id, name in Job.objects.filter(id__in=job_ids).values_list(
+        "id", "name"
+    ):
+        if _handlers[name][1]:
+            units.setdefault(name, []).append(job_id)
+        else:
+            singles.append([job_id])
+    return list(units.values()) + singles
+
+
+def run_jobs(job_ids=None, limit=100):
+    """Claim and run ready jobs in the current thread.
+
+    ``job_ids`` restricts the run to specific jobs. Returns a mapping of
+    outcome to count.
+    """
+    outcomes = {}
+    for unit in group_jobs(claim_jobs(limit, job_ids)):
+        for outcome in execute_jobs(unit):
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    return outcomes
+
+
+def run_claimed_jobs(job_ids):
+    """Pool entry point: run a unit of jobs with connection housekeeping."""
+    close_old_connections()
+    try:
+        return execute_jobs(job_ids)
+    finally:
+        close_old_connections()
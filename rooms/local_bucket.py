@@ -0,0 +1,165 @@
+"""A directory that behaves like a GCS bucket, for offline use and tests.
+
+Only the slice of the google-cloud-storage client API used by
+``storages`` and ``rooms.storage`` is implemented.
+"""
+
+import contextlib
+import os
+import shutil
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from google.cloud.exceptions import NotFound
+
+
+class LocalBlob:
+    """A bucket object stored as a file under the bucket root."""
+
+    def __init__(self, name, bucket, chunk_size=None):
+        self.name = name
+        self.bucket = bucket
+        self.chunk_size = chunk_size
+        self.content_type = None
+        self.content_encoding = None
+        self.cache_control = None
+
+    @property
+    def path(self):
+        return os.path.join(self.bucket.root, *self.name.split("/"))
+
+    @property
+    def public_url(self):
+        return f"{self.bucket.public_base_url}/{quote(self.name, safe='/~')}"
+
+    @property
+    def size(self):
+        return os.path.getsize(self.path)
+
+    @property
+    def updated(self):
+        return datetime.fromtimestamp(os.path.getmtime(self.path), timezone.utc)
+
+    time_created = updated
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def upload_from_file(self, file_obj, rewind=False, content_type=None, **kwargs):
+        if rewind:
+            file_obj.seek(0)
+        self.content_type = content_type
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        partial = f"{self.path}.upload"
+        # Like a resumable session: chunks land in a partial object that
+        # only becomes visible once the last one is written.
+        with open(partial, "wb") as target:
+            while True:
+                chunk = file_obj.read(self.chunk_size or 1024 * 1024)
+                if not chunk:
+                    break
+                target.write(chunk)
+                self.bucket.chunks_uploaded += 1
+        os.replace(partial, self.path)
+
+    def upload_from_filename(self, filename, content_type=None, **kwargs):
+        with open(filename, "rb") as source:
+            self.upload_from_file(source, content_type=content_type, **kwargs)
+
+    def download_to_file(self, file_obj, **kwargs):
+        if not self.exists():
+            raise NotFound(f"File does not exist: {self.name}")
+        with open(self.path, "rb") as source:
+            shutil.copyfileobj(source, file_obj)
+
+    def delete(self, **kwargs):
+        self.bucket.delete_blob(self.name)
+
+
+class LocalBucket:
+    """A bucket whose objects live under ``root``."""
+
+    def __init__(self, client, name, root):
+        self.client = client
+        self.name = name
+        self.root = root
+        self.chunks_uploaded = 0
+        self.public_base_url = f"https://storage.googleapis.com/{name}"
+
+    def blob(self, name, chunk_size=None, **kwargs):
+        return LocalBlob(name, self, chunk_size=chunk_size)
+
+    def get_blob(self, name, chunk_size=None, **kwargs):
+        blob = self.blob(name, chunk_size=chunk_size)
+        return blob if blob.exists() else None
+
+    def delete_blob(self, name, **kwargs):
+        blob = self.blob(name)
+        if not blob.exists():
+            error = NotFound(f"File does not exist: {name}")
+            if self.client.current_batch is None:
+                raise error
+            self.client.current_batch.append(error)
+            return
+        os.remove(blob.path)
+        if self.client.current_batch is not None:
+            self.client.current_batch.append(None)
+
+    def list_blobs(self, prefix="", delimiter=None, **kwargs):
+        return LocalBlobList(self, prefix, delimiter)
+
+
+class LocalBlobList(list):
+    """Listing result exposing ``prefixes`` like the client's iterator."""
+
+    def __init__(self, bucket, prefix, delimiter):
+        super().__init__()
+        self.prefixes = set()
+        base = os.path.join(bucket.root, *prefix.split("/"))
+        for dirpath, dirnames, filenames in os.walk(base):
+            relative = os.path.relpath(dirpath, bucket.root).replace(os.sep, "/")
+            relative = "" if relative == "." else f"{relative}/"
+            if delimiter and dirpath != base.rstrip(os.sep):
+                continue
+            self.extend(
+                bucket.blob(relative + filename)
+                for filename in filenames
+                if not filename.endswith(".upload")
+            )
+            if delimiter:
+                self.prefixes.update(f"{relative}{d}/" for d in dirnames)
+
+
+class LocalClient:
+    """Stand-in for ``google.cloud.storage.Client``."""
+
+    def __init__(self, root):
+        self.root = root
+        self.batches = 0
+        self.current_batch = None
+        self._buckets = {}
+
+    def bucket(self, name):
+        if name not in self._buckets:
+            self._buckets[name] = LocalBucket(
+                self, name, os.path.join(self.root, name)
+            )
+        return self._buckets[name]
+
+    def get_bucket(self, bucket):
+        name = getattr(bucket, "name", bucket)
+        if not os.path.isdir(os.path.join(self.root, name)):
+            raise NotFound(f"Bucket does not exist: {name}")
+        return self.bucket(name)
+
+    @contextlib.contextmanager
+    def batch(self, raise_exception=True):
+        self.batches += 1
+        self.current_batch = responses = []
+        try:
+            yield responses
+        finally:
+            self.current_batch = None
+        errors = [r for r in responses if isinstance(r, Exception)]
+        if errors and raise_exception:
+            raise errors[-1]
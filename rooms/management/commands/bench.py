@@ -0,0 +1,183 @@
+import itertools
+import json
+import logging
+import platform
+import resource
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rooms.benchmarks import compare, profile, scratch_database, seed_dataset
+from rooms.models import Room
+
+DUMMY_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+
+
+def scenarios():
+    """Return ``name -> (client kind, request function)`` for the views.
+
+    Anonymous pages use one client and the logged-in pages another.
+    Every booking POST takes new dates far past the seeded stays, so
+    each one succeeds.
+    """
+    today = timezone.now().date()
+    stay = {
+        "check_in": (today + timedelta(days=7)).isoformat(),
+        "check_out": (today + timedelta(days=10)).isoformat(),
+    }
+    rooms = Room.objects.filter(available=True).order_by("id")
+    room = rooms[rooms.count() // 2]
+    booked_room = rooms.last()
+    free_nights = itertools.count(start=3650, step=3)
+
+    def book(client):
+        start = today + timedelta(days=next(free_nights))
+        return client.post(
+            reverse("book_room", args=[booked_room.pk]),
+            {
+                "guest_name": "Bench Guest",
+                "email": "bench@example.com",
+                "phone_number": "+46701234567",
+                "check_in_date": start.isoformat(),
+                "check_out_date": (start + timedelta(days=2)).isoformat(),
+            },
+        )
+
+    return {
+        "home": ("anonymous", lambda c: c.get(reverse("home"))),
+        "room_list": ("anonymous", lambda c: c.get(reverse("room_list"))),
+        "search_rooms": (
+            "anonymous",
+            lambda c: c.get(
+                reverse("search_rooms"),
+                {"room_type": room.room_type, "max_price": 300, **stay},
+            ),
+        ),
+        "check_availability": (
+            "anonymous",
+            lambda c: c.get(reverse("check_availability"), stay),
+        ),
+        "room_details": (
+            "anonymous",
+            lambda c: c.get(reverse("room_details", args=[room.pk])),
+        ),
+        "book_room": ("user", book),
+        "user_bookings": ("user", lambda c: c.get(reverse("user_bookings"))),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and measure latency, queries and memory "
+        "of the main views; optionally compare against a baseline run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=200)
+        parser.add_argument("--bookings", type=int, default=100000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--images", type=int, default=600)
+        parser.add_argument("--repeat", type=int, default=30)
+        parser.add_argument(
+            "--only", nargs="+", help="Run only these scenarios."
+        )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="Keep the configured cache; by default pages are not cached.",
+        )
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+        parser.add_argument(
+            "--baseline", help="Compare against results from this JSON file."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed growth of p95 and peak memory, as a fraction.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as handle:
+                baseline = json.load(handle)
+
+        # Per-request timing lines would swamp the report.
+        logging.getLogger("rooms.middleware").setLevel(logging.ERROR)
+        caching = override_settings() if options["cache"] else override_settings(
+            CACHES=DUMMY_CACHES
+        )
+        with scratch_database(), caching:
+            self.stdout.write("Seeding dataset...")
+            counts = seed_dataset(
+                rooms=options["rooms"],
+                bookings=options["bookings"],
+                users=options["users"],
+                images=options["images"],
+            )
+            self.stdout.write(json.dumps(counts))
+
+            clients = {
+                "anonymous": Client(HTTP_HOST="localhost"),
+                "user": Client(HTTP_HOST="localhost"),
+            }
+            clients["user"].force_login(
+                get_user_model().objects.get(username="bench0")
+            )
+            results = {}
+            for name, (kind, send) in scenarios().items():
+                if options["only"] and name not in options["only"]:
+                    continue
+                client = clients[kind]
+                response = send(client)
+                if response.status_code >= 400:
+                    raise CommandError(
+                        f"{name} answered {response.status_code}"
+                    )
+                results[name] = profile(
+                    lambda: send(client), repeat=options["repeat"]
+                )
+                latency = results[name]["latency"]
+                self.stdout.write(
+                    f"{name:<20} p50 {latency['p50_ms']:>8.2f} ms  "
+                    f"p95 {latency['p95_ms']:>8.2f} ms  "
+                    f"p99 {latency['p99_ms']:>8.2f} ms  "
+                    f"{results[name]['queries']:>3} queries  "
+                    f"{results[name]['peak_kib']:>8.1f} KiB peak"
+                )
+
+        report = {
+            "dataset": counts,
+            "options": {
+                key: options[key] for key in ("repeat", "cache", "only")
+            },
+            "python": platform.python_version(),
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "scenarios": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if baseline is not None:
+            regressions = compare(
+                results, baseline["scenarios"], options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Regressions against the baseline:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(
+                self.style.SUCCESS("No regressions against the baseline.")
+            )
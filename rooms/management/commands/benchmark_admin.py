@@ -0,0 +1,124 @@
+import contextlib
+import json
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.core.paginator import Paginator
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from rooms.benchmarks import measure, scratch_database, seed_dataset, summarize
+from rooms.models import Booking, Room
+
+# The BookingAdmin options before the changelist was made to scale.
+LEGACY_OPTIONS = {
+    "list_select_related": False,
+    "list_filter": ("status", "room", "check_in_date", "check_out_date"),
+    "search_fields": ("guest_name", "room__name", "email"),
+    "date_hierarchy": "check_in_date",
+    "paginator": Paginator,
+    "show_full_result_count": True,
+}
+
+
+@contextlib.contextmanager
+def admin_options(model_admin, options):
+    """Temporarily override attributes of a registered ModelAdmin."""
+    saved = {name: getattr(model_admin, name) for name in options}
+    for name, value in options.items():
+        setattr(model_admin, name, value)
+    try:
+        yield model_admin
+    finally:
+        for name, value in saved.items():
+            setattr(model_admin, name, value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and time the Booking admin changelist "
+        "with the legacy and the scalable admin options."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=500)
+        parser.add_argument("--bookings", type=int, default=1000000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write("Seeding dataset...")
+            counts = seed_dataset(
+                rooms=options["rooms"],
+                bookings=options["bookings"],
+                users=options["users"],
+            )
+            self.stdout.write(json.dumps(counts))
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+
+            superuser = get_user_model().objects.create_superuser(
+                "bench-admin", "bench-admin@example.com", "bench-admin"
+            )
+            room = Room.objects.order_by("id")[counts["rooms"] // 2]
+            cases = {
+                "unfiltered": {},
+                "search": {"q": "Guest 4242"},
+                "room_filter": {"room__id__exact": room.pk},
+            }
+            model_admin = admin.site._registry[Booking]
+            with admin_options(model_admin, LEGACY_OPTIONS):
+                legacy = self.run_cases(
+                    model_admin, superuser, cases, options["repeat"]
+                )
+            scalable = self.run_cases(
+                model_admin, superuser, cases, options["repeat"]
+            )
+
+        results = {
+            "vendor": connection.vendor,
+            "dataset": counts,
+            "legacy": legacy,
+            "scalable": scalable,
+        }
+        for name in cases:
+            before, after = legacy[name], scalable[name]
+            self.stdout.write(
+                f"{name:<12} p50 {before['latency']['p50_ms']:>10.3f} ms "
+                f"({before['queries']} queries) -> "
+                f"{after['latency']['p50_ms']:>10.3f} ms "
+                f"({after['queries']} queries)"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_cases(self, model_admin, user, cases, repeat):
+        """Render the changelist for each case; time it and count queries."""
+        factory = RequestFactory()
+        results = {}
+        for name, params in cases.items():
+
+            def render():
+                request = factory.get("/admin/rooms/booking/", params)
+                request.user = user
+                response = model_admin.changelist_view(request)
+                response.render()
+                return response
+
+            with CaptureQueriesContext(connection) as queries:
+                render()
+            results[name] = {
+                "queries": len(queries),
+                "latency": summarize(measure(render, repeat=repeat)),
+            }
+        return results
@@ -0,0 +1,114 @@
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils import timezone
+
+from rooms.benchmarks import measure, scratch_database, seed_dataset, summarize
+from rooms.models import Booking, Room, RoomNight
+
+
+def hot_queries():
+    """Return the hot queries as ``name -> queryset factory``."""
+    today = timezone.now().date()
+    next_week = today + timedelta(days=7)
+    room = Room.objects.order_by("id")[Room.objects.count() // 2]
+    user_id = Booking.objects.values_list("user_id", flat=True).first()
+
+    return {
+        "booking_overlap": lambda: Booking.objects.filter(
+            room=room,
+            check_in_date__lt=next_week,
+            check_out_date__gt=today,
+        ).exclude(status="CANCELLED")[:1],
+        "user_upcoming_bookings": lambda: Booking.objects.filter(
+            user_id=user_id, check_in_date__gte=today
+        ).order_by("check_in_date")[:50],
+        "room_listing": lambda: Room.objects.filter(
+            available=True, room_type="DLX", price__lte=200
+        ),
+        "rooms_by_price": lambda: Room.objects.filter(
+            available=True
+        ).order_by("price", "id")[:24],
+        "available_between": lambda: Room.objects.filter(
+            available=True
+        ).available_between(today, next_week),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and compare hot query plans and latency "
+        "with and without the Booking/Room/RoomNight indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rooms", type=int, default=500)
+        parser.add_argument("--bookings", type=int, default=1000000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+
+    def handle(self, *args, **options):
+        with scratch_database():
+            self.stdout.write("Seeding dataset...")
+            counts = seed_dataset(
+                rooms=options["rooms"],
+                bookings=options["bookings"],
+                users=options["users"],
+            )
+            self.stdout.write(json.dumps(counts))
+
+            queries = hot_queries()
+            indexes = [
+                (model, index)
+                for model in (Booking, Room, RoomNight)
+                for index in model._meta.indexes
+            ]
+
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.remove_index(model, index)
+            without = self.run_queries(queries, options["repeat"])
+
+            with connection.schema_editor() as editor:
+                for model, index in indexes:
+                    editor.add_index(model, index)
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE")
+            with_indexes = self.run_queries(queries, options["repeat"])
+
+        results = {
+            "vendor": connection.vendor,
+            "dataset": counts,
+            "without_indexes": without,
+            "with_indexes": with_indexes,
+        }
+        for name in queries:
+            before = without[name]["latency"]["p50_ms"]
+            after = with_indexes[name]["latency"]["p50_ms"]
+            self.stdout.write(
+                f"{name:<24} p50 {before:>10.3f} ms -> {after:>10.3f} ms"
+            )
+            self.stdout.write(f"  plan before: {without[name]['plan']}")
+            self.stdout.write(f"  plan after:  {with_indexes[name]['plan']}")
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def run_queries(self, queries, repeat):
+        """Explain and time each query."""
+        results = {}
+        for name, factory in queries.items():
+            results[name] = {
+                "plan": " | ".join(factory().explain().splitlines()),
+                "latency": summarize(
+                    measure(lambda: list(factory()), repeat=repeat)
+                ),
+            }
+        return results
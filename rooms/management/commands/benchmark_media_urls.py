@@ -0,0 +1,99 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from google.auth.credentials import AnonymousCredentials
+from storages.backends.gcloud import GoogleCloudStorage
+
+from rooms.benchmarks import measure, summarize
+from rooms.storage import GoogleCloudMediaFileStorage, load_credentials
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare media URL generation of the stock GCS backend with the "
+        "local URL builder in rooms.storage."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", type=int, default=1000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument(
+            "--bucket",
+            default=getattr(settings, "GS_BUCKET_NAME", None) or "bench-bucket",
+        )
+        parser.add_argument(
+            "--signed",
+            action="store_true",
+            help="Benchmark signed URLs; needs service account credentials.",
+        )
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+
+    def handle(self, *args, **options):
+        credentials = load_credentials()
+        if options["signed"] and credentials is None:
+            raise CommandError(
+                "Signed URLs need GOOGLE_APPLICATION_CREDENTIALS or "
+                "GOOGLE_CREDENTIALS to sign with."
+            )
+        storage_kwargs = {
+            "bucket_name": options["bucket"],
+            "credentials": credentials or AnonymousCredentials(),
+            "project_id": getattr(settings, "GS_PROJECT_ID", None) or "bench",
+            "querystring_auth": options["signed"],
+        }
+        backends = {
+            "stock": GoogleCloudStorage(location="media", **storage_kwargs),
+            "local": GoogleCloudMediaFileStorage(**storage_kwargs),
+        }
+        names = [
+            f"room_images/bench room {i}.jpg" for i in range(options["images"])
+        ]
+
+        if not options["signed"]:
+            stock = [backends["stock"].url(name) for name in names]
+            local = [backends["local"].url(name) for name in names]
+            if stock != local:
+                raise CommandError("Local URLs differ from the stock backend.")
+
+        # Cold runs start from empty URL caches, so they time building
+        # every URL; warm runs repeat the same names, as pages do.
+        results = {"images": len(names), "signed": options["signed"]}
+        for label, storage in backends.items():
+            clear = getattr(storage, "clear_url_cache", None)
+            results[label] = {
+                "cold": summarize(
+                    measure(
+                        lambda: [storage.url(name) for name in names],
+                        repeat=options["repeat"],
+                        warmup=0,
+                        setup=clear,
+                    )
+                ),
+                "warm": summarize(
+                    measure(
+                        lambda: [storage.url(name) for name in names],
+                        repeat=options["repeat"],
+                    )
+                ),
+            }
+            for run, summary in results[label].items():
+                self.stdout.write(
+                    f"{label:<6} {run:<5} {len(names)} URLs: "
+                    f"p50 {summary['p50_ms']:.3f} ms, "
+                    f"p95 {summary['p95_ms']:.3f} ms"
+                )
+        for run in ("cold", "warm"):
+            speedup = results["stock"][run]["p50_ms"] / max(
+                results["local"][run]["p50_ms"], 0.001
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Speedup at p50 ({run}): {speedup:.1f}x")
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(results, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
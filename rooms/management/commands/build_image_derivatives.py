@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from rooms.jobs import enqueue
+from rooms.models import RoomImage
+
+
+class Command(BaseCommand):
+    help = "Queue resized copies for room images that have none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every image, e.g. after changing the sizes.",
+        )
+
+    def handle(self, *args, **options):
+        rebuild = options["all"]
+        queued = 0
+        with transaction.atomic():
+            for image in RoomImage.objects.exclude(image="").iterator():
+                if rebuild or image.needs_derivatives:
+                    enqueue(
+                        "build_image_derivatives",
+                        image_id=image.pk,
+                        image_name=image.image.name,
+                        force=rebuild,
+                    )
+                    queued += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Queued derivatives for {queued} images.")
+        )
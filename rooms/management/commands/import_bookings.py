@@ -0,0 +1,81 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.importer import import_bookings, write_rejects
+
+
+class Command(BaseCommand):
+    help = (
+        "Import bookings from a CSV or JSONL file (optionally gzipped), "
+        "rejecting rows that are invalid or overlap another booking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format; by default taken from the file name.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Rows per bulk insert.",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=20000,
+            help="Rows committed per transaction.",
+        )
+        parser.add_argument(
+            "--rejects",
+            help="Write rejected rows with their reason to this JSONL file.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and check overlaps without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            report = import_bookings(
+                options["path"],
+                fmt=options["format"],
+                batch_size=options["batch_size"],
+                chunk_size=options["chunk_size"],
+                dry_run=options["dry_run"],
+                progress=self.progress,
+            )
+        except OSError as exc:
+            raise CommandError(f"Cannot read {options['path']}: {exc}")
+
+        if options["rejects"] and report.rejects:
+            write_rejects(
+                options["rejects"],
+                report.rejects,
+                options["path"],
+                options["format"],
+            )
+            self.stdout.write(
+                f"{len(report.rejects)} rejected rows written to "
+                f"{options['rejects']}"
+            )
+        verb = "Would import" if options["dry_run"] else "Imported"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {report.imported} of {report.rows} bookings "
+                f"({report.room_nights} room nights) in "
+                f"{report.elapsed:.1f}s: {report.rows_per_second:.0f} rows/s. "
+                f"Rejected {report.conflicts} overlapping and "
+                f"{report.invalid} invalid rows."
+            )
+        )
+
+    def progress(self, report):
+        self.stdout.write(
+            f"{report.processed}/{report.rows} rows, "
+            f"{report.imported} imported, "
+            f"{report.rows_per_second:.0f} rows/s"
+        )
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from rooms.availability import rebuild_room_nights, verify_room_nights
+
+
+class Command(BaseCommand):
+    help = "Rebuild or verify the room-night occupancy index from bookings."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify",
+            action="store_true",
+            help="Only compare the index with bookings, do not rewrite it.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Rows per bulk insert when rebuilding.",
+        )
+
+    def handle(self, *args, **options):
+        if options["verify"]:
+            missing, unexpected = verify_room_nights()
+            for room_id, night, booking_id in sorted(missing):
+                self.stdout.write(
+                    f"missing: room {room_id} {night} booking {booking_id}"
+                )
+            for room_id, night, booking_id in sorted(unexpected):
+                self.stdout.write(
+                    f"unexpected: room {room_id} {night} booking {booking_id}"
+                )
+            if missing or unexpected:
+                raise CommandError(
+                    f"Index out of sync: {len(missing)} missing, "
+                    f"{len(unexpected)} unexpected rows."
+                )
+            self.stdout.write(self.style.SUCCESS("Room-night index is in sync."))
+            return
+
+        created, conflicts = rebuild_room_nights(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt room-night index: {created} nights.")
+        )
+        if conflicts:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"{len(conflicts)} nights are double-booked; "
+                    "see the log for details."
+                )
+            )
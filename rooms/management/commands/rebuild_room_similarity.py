@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from rooms.similarity import TOP_K, rebuild_similarities
+
+
+class Command(BaseCommand):
+    help = "Recompute the precomputed similar rooms of every room."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--k",
+            type=int,
+            default=TOP_K,
+            help="Neighbours to keep per room.",
+        )
+
+    def handle(self, *args, **options):
+        stored = rebuild_similarities(options["k"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Stored {stored} similar-room rows.")
+        )
@@ -0,0 +1,29 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "Upload media files left staged by an interrupted process."
+
+    def handle(self, *args, **options):
+        if not hasattr(default_storage, "resume_uploads"):
+            raise CommandError("The media storage does not stage uploads.")
+        names = default_storage.resume_uploads()
+        default_storage.flush()
+        failed = [
+            name
+            for name in names
+            if os.path.isfile(default_storage.staged_path(name))
+        ]
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Uploaded {len(names) - len(failed)} staged files."
+            )
+        )
+        if failed:
+            raise CommandError(
+                f"{len(failed)} uploads failed and stay staged: "
+                + ", ".join(failed)
+            )
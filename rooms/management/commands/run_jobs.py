@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from rooms.jobs import (
+    claim_jobs,
+    group_jobs,
+    release_stale_jobs,
+    run_claimed_jobs,
+)
+from rooms.metrics import push_metrics
+
+
+class InlineExecutor:
+    """Executor stand-in that runs jobs one by one in this thread."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def map(self, func, iterable):
+        return map(func, iterable)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs with a thread or process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.JOBS_WORKERS,
+            help="Number of jobs run concurrently; 1 runs them inline.",
+        )
+        parser.add_argument(
+            "--pool",
+            choices=["thread", "process"],
+            default="thread",
+            help="Run jobs in threads (I/O-bound work) or processes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Jobs claimed from the queue at a time.",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once no job is ready instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        # Jobs save media, such as image derivatives, through staged
+        # uploads: pick up what a previous run left and finish on exit.
+        staged = hasattr(default_storage, "resume_uploads")
+        if staged:
+            default_storage.resume_uploads()
+
+        if options["workers"] <= 1:
+            # A single worker runs jobs inline in this thread.
+            executor = InlineExecutor()
+        elif options["pool"] == "process":
+            # Spawned children set Django up themselves and open their
+            # own database connections instead of sharing ours.
+            connections.close_all()
+            if settings.METRICS_PUSHGATEWAY:
+                # Children record metrics, such as email send latency,
+                # to files that the pushed registry adds up.
+                os.environ.setdefault(
+                    "PROMETHEUS_MULTIPROC_DIR",
+                    tempfile.mkdtemp(prefix="daniels-hotell-metrics-"),
+                )
+            executor = ProcessPoolExecutor(
+                max_workers=options["workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=django.setup,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=options["workers"])
+
+        totals = {}
+        with executor:
+            while not self.stopping:
+                release_stale_jobs()
+                job_ids = claim_jobs(options["batch_size"])
+                if not job_ids:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll_interval"])
+                    continue
+                units = group_jobs(job_ids)
+                for outcomes in executor.map(run_claimed_jobs, units):
+                    for outcome in outcomes:
+                        totals[outcome] = totals.get(outcome, 0) + 1
+                self.stdout.write(
+                    f"Ran {len(job_ids)} jobs: "
+                    + ", ".join(f"{k.lower()} {v}" for k, v in totals.items())
+                )
+                self.push_metrics()
+
+        if staged:
+            default_storage.flush()
+        self.push_metrics()
+        self.stdout.write(self.style.SUCCESS("Job worker stopped."))
+
+    def push_metrics(self):
+        """Send the metrics jobs recorded to the Pushgateway, if any."""
+        if not settings.METRICS_PUSHGATEWAY:
+            return
+        try:
+            push_metrics(settings.METRICS_PUSHGATEWAY)
+        except OSError as exc:
+            # Metrics are not worth stopping the worker for.
+            self.stderr.write(f"Could not push metrics: {exc}")
+
+    def stop(self, signum, frame):
+        """Finish the current batch, then exit."""
+        self.stopping = True
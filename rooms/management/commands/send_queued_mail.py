@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand
+
+from rooms.jobs import claim_jobs, record_outcome
+from rooms.mail import BACKEND_ALIASES, MailDispatcher, build_message
+from rooms.models import Job
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain queued emails in batches over reused connections and "
+        "report throughput in messages per second."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--backend",
+            help=(
+                "Email backend: a dotted path or one of "
+                f"{', '.join(BACKEND_ALIASES)} (default: EMAIL_BACKEND)."
+            ),
+        )
+        parser.add_argument(
+            "--file-path",
+            help="Directory for the file backend.",
+        )
+        parser.add_argument("--batch-size", type=int)
+        parser.add_argument(
+            "--rate-limit",
+            type=float,
+            help="Maximum messages per second.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=1000,
+            help="Emails claimed from the queue per round.",
+        )
+
+    def handle(self, *args, **options):
+        backend_kwargs = {}
+        if options["file_path"]:
+            backend_kwargs["file_path"] = options["file_path"]
+        dispatcher = MailDispatcher(
+            backend=options["backend"],
+            batch_size=options["batch_size"],
+            rate_limit=options["rate_limit"],
+            **backend_kwargs,
+        )
+
+        sent = failed = 0
+        elapsed = 0.0
+        while True:
+            job_ids = claim_jobs(options["limit"], name="send_email")
+            if not job_ids:
+                break
+            jobs = list(Job.objects.filter(id__in=job_ids).order_by("id"))
+            report = dispatcher.send([build_message(job.payload) for job in jobs])
+            for job, error in zip(jobs, report.errors):
+                record_outcome(job, error)
+            sent += report.sent
+            failed += report.failed
+            elapsed += report.elapsed
+
+        rate = (sent + failed) / elapsed if elapsed else 0.0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Sent {sent} emails, {failed} failed, "
+                f"in {elapsed:.2f}s ({rate:.1f} msg/s)."
+            )
+        )
@@ -0,0 +1,142 @@
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a fresh process imports for each target.
+TARGETS = {
+    "settings": "import django; django.setup()",
+    "wsgi": "import importlib; importlib.import_module({module!r})",
+}
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(output):
+    """Parse ``-X importtime`` output into per-module rows.
+
+    Each row holds the self and cumulative import time in microseconds
+    and the nesting depth of the import.
+    """
+    rows = []
+    for line in output.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            own, cumulative, indent, module = match.groups()
+            rows.append(
+                {
+                    "module": module,
+                    "self_us": int(own),
+                    "cumulative_us": int(cumulative),
+                    "depth": (len(indent) - 1) // 2,
+                }
+            )
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import the project in a fresh interpreter with -X importtime and "
+        "report the slowest modules, to track cold-start time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--target",
+            choices=sorted(TARGETS),
+            default="wsgi",
+            help="Import the WSGI app (what gunicorn does) or only setup().",
+        )
+        parser.add_argument("--top", type=int, default=25)
+        parser.add_argument(
+            "--sort", choices=["cumulative", "self"], default="cumulative"
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs to take the per-module median over.",
+        )
+        parser.add_argument(
+            "--output", help="Write the results to this JSON file."
+        )
+
+    def handle(self, *args, **options):
+        module = settings.WSGI_APPLICATION.rsplit(".", 1)[0]
+        code = TARGETS[options["target"]].format(module=module)
+        env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+        env.setdefault("DJANGO_SETTINGS_MODULE", settings.SETTINGS_MODULE)
+
+        runs = []
+        for _ in range(max(1, options["repeat"])):
+            result = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", code],
+                capture_output=True,
+                text=True,
+                env=env,
+                cwd=settings.BASE_DIR,
+            )
+            if result.returncode:
+                raise CommandError(
+                    f"Importing the project failed:\n{result.stderr[-2000:]}"
+                )
+            runs.append(parse_importtime(result.stderr))
+
+        modules = {}
+        for rows in runs:
+            for row in rows:
+                entry = modules.setdefault(
+                    row["module"],
+                    {"module": row["module"], "depth": row["depth"], "runs": []},
+                )
+                entry["runs"].append(row)
+        report = []
+        for entry in modules.values():
+            report.append(
+                {
+                    "module": entry["module"],
+                    "depth": entry["depth"],
+                    "self_ms": statistics.median(
+                        r["self_us"] for r in entry["runs"]
+                    ) / 1000,
+                    "cumulative_ms": statistics.median(
+                        r["cumulative_us"] for r in entry["runs"]
+                    ) / 1000,
+                }
+            )
+        total_ms = statistics.median(
+            sum(row["cumulative_us"] for row in rows if row["depth"] == 0)
+            for rows in runs
+        ) / 1000
+        key = f"{options['sort']}_ms"
+        report.sort(key=lambda row: row[key], reverse=True)
+
+        self.stdout.write(
+            f"{options['target']}: {len(modules)} modules imported in "
+            f"{total_ms:.1f} ms (median of {len(runs)} runs)"
+        )
+        self.stdout.write(f"{'cumulative':>12} {'self':>10}  module")
+        for row in report[:options["top"]]:
+            self.stdout.write(
+                f"{row['cumulative_ms']:>9.1f} ms {row['self_ms']:>7.1f} ms  "
+                f"{row['module']}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as handle:
+                json.dump(
+                    {
+                        "target": options["target"],
+                        "python": sys.version.split()[0],
+                        "total_ms": total_ms,
+                        "modules": report,
+                    },
+                    handle,
+                    indent=2,
+                )
+            self.stdout.write(f"Results written to {options['output']}")
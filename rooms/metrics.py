@@ -0,0 +1,136 @@
+"""Prometheus metrics for capacity planning.
+
+Under gunicorn every worker is a separate process, so the metrics are
+kept in prometheus_client's multiprocess mode: with
+``PROMETHEUS_MULTIPROC_DIR`` set (see gunicorn.conf.py) each worker
+writes its values to files in that directory and ``/metrics`` adds them
+up. Without it, as under runserver or in tests, the values live in the
+process.
+
+The job worker (``run_jobs``) takes no HTTP traffic, so it pushes its
+metrics to a Pushgateway instead when ``METRICS_PUSHGATEWAY`` is set.
+"""
+
+import os
+import socket
+
+from prometheus_client import (
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    push_to_gateway,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89, 144)
+
+REQUEST_LATENCY = Histogram(
+    "hotel_request_duration_seconds",
+    "Time spent handling a request, by URL name.",
+    ["view", "method"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUEST_QUERIES = Histogram(
+    "hotel_request_queries",
+    "Database queries run by a request, by URL name.",
+    ["view"],
+    buckets=QUERY_BUCKETS,
+)
+BOOKINGS = Counter(
+    "hotel_bookings",
+    "Booking writes by operation (create, update) and outcome.",
+    ["operation", "outcome"],
+)
+EMAIL_SEND_LATENCY = Histogram(
+    "hotel_email_send_seconds",
+    "Time to hand one email to the mail backend.",
+    ["outcome"],
+    buckets=LATENCY_BUCKETS,
+)
+PAGE_CACHE_REQUESTS = Counter(
+    "hotel_page_cache_requests",
+    "Anonymous page cache lookups by view and outcome (hits, misses).",
+    ["view", "outcome"],
+)
+
+
+def observe_request(request, response, duration, queries):
+    """Record a handled request under its URL name."""
+    match = request.resolver_match
+    view = match.view_name if match else "unmatched"
+    REQUEST_LATENCY.labels(view=view, method=request.method).observe(duration)
+    REQUEST_QUERIES.labels(view=view).observe(queries)
+
+
+def _registry():
+    """Return the registry holding the values of every process."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def page_cache_counts():
+    """Return page cache lookups by ``(view, outcome)``."""
+    counts = {}
+    for metric in _registry().collect():
+        if metric.name != "hotel_page_cache_requests":
+            continue
+        for sample in metric.samples:
+            if sample.name.endswith("_total"):
+                key = (sample.labels["view"], sample.labels["outcome"])
+                counts[key] = counts.get(key, 0) + int(sample.value)
+    return counts
+
+
+class PageCacheCollector:
+    """Export hit ratios from ``rooms.cache.page_cache_stats``.
+
+    Prometheus could divide the counters itself, but a ready-made ratio
+    keeps dashboards and alerts simple.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def collect(self):
+        ratio = GaugeMetricFamily(
+            "hotel_page_cache_hit_ratio",
+            "Share of anonymous page requests served from the cache.",
+            labels=["view"],
+        )
+        for view, stats in self.stats.items():
+            if stats["hit_ratio"] is not None:
+                ratio.add_metric([view], stats["hit_ratio"])
+        yield ratio
+
+
+def render_metrics(page_cache=None):
+    """Return every metric in the Prometheus text format.
+
+    ``page_cache`` holds page cache stats by view, as returned by
+    ``page_cache_stats``, to export hit ratios for.
+    """
+    cache_registry = CollectorRegistry()
+    cache_registry.register(PageCacheCollector(page_cache or {}))
+    return generate_latest(_registry()) + generate_latest(cache_registry)
+
+
+def push_metrics(gateway, job="daniels-hotell-worker"):
+    """Push every metric of this process group to a Pushgateway.
+
+    Each dyno or host pushes under its own ``instance`` so that several
+    workers do not overwrite each other.
+    """
+    instance = os.environ.get("DYNO") or socket.gethostname()
+    push_to_gateway(
+        gateway, job=job, registry=_registry(),
+        grouping_key={"instance": instance},
+    )
@@ -0,0 +1,198 @@
+import contextlib
+import json
+import logging
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.functional import empty
+
+from .metrics import observe_request
+
+logger = logging.getLogger(__name__)
+
+# Storage methods that may go over the network.
+STORAGE_METHODS = (
+    "open",
+    "save",
+    "delete",
+    "exists",
+    "listdir",
+    "size",
+    "url",
+    "get_modified_time",
+)
+
+_current = ContextVar("server_timing", default=None)
+
+
+class RequestTimings:
+    """Durations collected while one request is handled."""
+
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+        self.queries = []
+        self.query_count = 0
+        self.db = 0.0
+        self.totals = {"template": 0.0, "storage": 0.0}
+        self.calls = {"template": 0, "storage": 0}
+        self._depth = {"template": 0, "storage": 0}
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db += duration
+            self.query_count += 1
+            if len(self.queries) < self.max_queries:
+                self.queries.append((duration, sql))
+
+    @contextlib.contextmanager
+    def measure(self, kind):
+        # Only the outermost call counts, so a storage method calling
+        # another, or a template rendered inside another, is not
+        # counted twice.
+        self._depth[kind] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[kind] -= 1
+            if not self._depth[kind]:
+                self.totals[kind] += time.perf_counter() - start
+                self.calls[kind] += 1
+
+
+def _timed(func, kind):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _current.get()
+        if timings is None:
+            return func(*args, **kwargs)
+        with timings.measure(kind):
+            return func(*args, **kwargs)
+
+    wrapper.server_timing = True
+    return wrapper
+
+
+def _instrument(cls, names, kind):
+    for name in names:
+        method = getattr(cls, name, None)
+        if method is not None and not getattr(method, "server_timing", False):
+            setattr(cls, name, _timed(method, kind))
+
+
+def _instrument_storage(storage):
+    """Time the methods of the storage behind a lazy storage object.
+
+    The storage class is only known once the lazy object is set up, and
+    setting it up here would import the backend at startup.
+    """
+    if storage._wrapped is not empty:
+        _instrument(type(storage._wrapped), STORAGE_METHODS, "storage")
+        return
+    setup = storage._setup
+
+    def instrumented_setup():
+        setup()
+        _instrument(type(storage._wrapped), STORAGE_METHODS, "storage")
+
+    # LazyObject forwards attribute writes to the wrapped object.
+    object.__setattr__(storage, "_setup", instrumented_setup)
+
+
+class ServerTimingMiddleware:
+    """Report where each request spends its time.
+
+    Database time and query count come from a ``connection``
+    execute_wrapper. Template rendering and storage calls are timed
+    through wrappers on the template backend and the storage classes.
+    The numbers go out as a ``Server-Timing`` header, one JSON log line
+    and the request histograms in ``rooms.metrics``. Requests over
+    ``SERVER_TIMING_SLOW_MS`` or ``SERVER_TIMING_SLOW_QUERIES`` are
+    logged as warnings with their SQL (without parameters, which may
+    hold guest details).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, "SERVER_TIMING_SLOW_MS", 500)
+        self.slow_queries = getattr(settings, "SERVER_TIMING_SLOW_QUERIES", 50)
+        self.max_sql = getattr(settings, "SERVER_TIMING_MAX_SQL", 200)
+        self.header = getattr(settings, "SERVER_TIMING_HEADER", True)
+        _instrument(Template, ["render"], "template")
+        _instrument_storage(default_storage)
+        _instrument_storage(staticfiles_storage)
+
+    def __call__(self, request):
+        timings = RequestTimings(self.max_sql)
+        token = _current.set(timings)
+        start = time.perf_counter()
+        try:
+            with contextlib.ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.record_query)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - start
+
+        observe_request(request, response, total, timings.query_count)
+        if self.header:
+            response["Server-Timing"] = self.server_timing(timings, total)
+        self.log(request, response, timings, total)
+        return response
+
+    def server_timing(self, timings, total):
+        metrics = [
+            ("db", timings.db, f"{timings.query_count} queries"),
+            ("tpl", timings.totals["template"], "template render"),
+            (
+                "storage",
+                timings.totals["storage"],
+                f"{timings.calls['storage']} calls",
+            ),
+            ("total", total, "view"),
+        ]
+        return ", ".join(
+            f'{name};dur={duration * 1000:.1f};desc="{desc}"'
+            for name, duration, desc in metrics
+        )
+
+    def log(self, request, response, timings, total):
+        match = request.resolver_match
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": match.view_name if match else None,
+            "status": response.status_code,
+            "total_ms": round(total * 1000, 1),
+            "db_ms": round(timings.db * 1000, 1),
+            "db_queries": timings.query_count,
+            "template_ms": round(timings.totals["template"] * 1000, 1),
+            "storage_ms": round(timings.totals["storage"] * 1000, 1),
+            "storage_calls": timings.calls["storage"],
+        }
+        slow = (
+            total * 1000 >= self.slow_ms
+            or timings.query_count >= self.slow_queries
+        )
+        if not slow:
+            logger.info("%s", json.dumps(record))
+            return
+        record["slow"] = True
+        record["sql"] = [
+            {"ms": round(duration * 1000, 2), "sql": sql}
+            for duration, sql in sorted(timings.queries, reverse=True)
+        ]
+        logger.warning("%s", json.dumps(record))
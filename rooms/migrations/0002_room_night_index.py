@@ -0,0 +1,70 @@
+# Generated by Django 4.2.15 on 2026-10-18 06:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+
+
+def populate_room_nights(apps, schema_editor):
+    Booking = apps.get_model("rooms", "Booking")
+    RoomNight = apps.get_model("rooms", "RoomNight")
+    nights = []
+    for booking in Booking.objects.exclude(status="CANCELLED").iterator():
+        days = (booking.check_out_date - booking.check_in_date).days
+        nights.extend(
+            RoomNight(
+                room_id=booking.room_id,
+                booking_id=booking.id,
+                night=booking.check_in_date + timedelta(days=offset),
+            )
+            for offset in range(days)
+        )
+    RoomNight.objects.bulk_create(nights, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoomNight",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("night", models.DateField()),
+                (
+                    "booking",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="room_nights",
+                        to="rooms.booking",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="nights",
+                        to="rooms.room",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="roomnight",
+            constraint=models.UniqueConstraint(
+                fields=("room", "night"), name="unique_room_night"
+            ),
+        ),
+        migrations.RunPython(populate_room_nights, migrations.RunPython.noop),
+    ]
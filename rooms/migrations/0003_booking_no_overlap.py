@@ -0,0 +1,39 @@
+from django.db import migrations
+
+CREATE_CONSTRAINT = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE rooms_booking ADD CONSTRAINT booking_no_overlap
+    EXCLUDE USING gist (
+        room_id WITH =,
+        daterange(check_in_date, check_out_date) WITH &&
+    )
+    WHERE (status <> 'CANCELLED');
+"""
+
+DROP_CONSTRAINT = """
+ALTER TABLE rooms_booking DROP CONSTRAINT IF EXISTS booking_no_overlap;
+"""
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    # Other backends rely on the unique (room, night) index instead.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_CONSTRAINT)
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_CONSTRAINT)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0002_room_night_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            add_exclusion_constraint, remove_exclusion_constraint
+        ),
+    ]
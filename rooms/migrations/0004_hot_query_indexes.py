@@ -0,0 +1,45 @@
+# Generated by Django 4.2.15 on 2026-10-18 07:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0003_booking_no_overlap"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                condition=models.Q(("status", "CANCELLED"), _negated=True),
+                fields=["room", "check_in_date", "check_out_date"],
+                name="booking_active_stay_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "check_in_date"], name="booking_user_checkin_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                fields=["available", "room_type", "price"], name="room_listing_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="room",
+            index=models.Index(
+                condition=models.Q(("available", True)),
+                fields=["price", "id"],
+                name="room_available_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="roomnight",
+            index=models.Index(fields=["night", "room"], name="roomnight_night_idx"),
+        ),
+    ]
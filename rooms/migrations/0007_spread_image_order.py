@@ -0,0 +1,30 @@
+# Generated by Django 4.2.15 on 2026-10-18 12:10
+
+from django.db import migrations
+
+ORDER_GAP = 1024
+
+
+def spread_image_order(apps, schema_editor):
+    RoomImage = apps.get_model("rooms", "RoomImage")
+    changed = []
+    room_id = position = None
+    for image in RoomImage.objects.order_by("room_id", "order", "id").iterator():
+        if image.room_id != room_id:
+            room_id, position = image.room_id, 0
+        position += 1
+        if image.order != position * ORDER_GAP:
+            image.order = position * ORDER_GAP
+            changed.append(image)
+    RoomImage.objects.bulk_update(changed, ["order"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0006_job_queue"),
+    ]
+
+    operations = [
+        migrations.RunPython(spread_image_order, migrations.RunPython.noop),
+    ]
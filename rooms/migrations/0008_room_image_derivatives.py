@@ -0,0 +1,18 @@
+# Generated by Django 4.2.15 on 2026-10-18 07:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0007_spread_image_order"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="roomimage",
+            name="derivatives",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
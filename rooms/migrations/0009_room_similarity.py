@@ -0,0 +1,79 @@
+# Generated by Django 4.2.15 on 2026-10-18 07:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_similarities(apps, schema_editor):
+    from rooms.similarity import nearest_neighbours, room_features
+
+    Room = apps.get_model("rooms", "Room")
+    RoomSimilarity = apps.get_model("rooms", "RoomSimilarity")
+    ids, features = room_features(Room.objects.all())
+    RoomSimilarity.objects.bulk_create(
+        (
+            RoomSimilarity(
+                room_id=room_id,
+                similar_room_id=similar_id,
+                rank=rank,
+                distance=distance,
+            )
+            for room_id, similar in nearest_neighbours(
+                ids, features, range(len(ids))
+            )
+            for rank, (similar_id, distance) in enumerate(similar)
+        ),
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0008_room_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RoomSimilarity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField()),
+                ("distance", models.FloatField()),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similarities",
+                        to="rooms.room",
+                    ),
+                ),
+                (
+                    "similar_room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="similar_to",
+                        to="rooms.room",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["room", "rank"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="roomsimilarity",
+            constraint=models.UniqueConstraint(
+                fields=("room", "rank"), name="unique_room_similarity_rank"
+            ),
+        ),
+        migrations.RunPython(populate_similarities, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.15 on 2026-10-18 07:25
+
+from django.db import migrations, models
+
+# The admin searches guests with istartswith, which Postgres runs as
+# UPPER(col::text) LIKE UPPER('term%'). Only a pattern_ops index on that
+# exact expression serves it under a non-C collation.
+CREATE_INDEXES = """
+CREATE INDEX IF NOT EXISTS booking_guest_name_prefix_idx
+    ON rooms_booking (UPPER(guest_name::text) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS booking_email_prefix_idx
+    ON rooms_booking (UPPER(email::text) text_pattern_ops);
+"""
+
+DROP_INDEXES = """
+DROP INDEX IF EXISTS booking_guest_name_prefix_idx;
+DROP INDEX IF EXISTS booking_email_prefix_idx;
+"""
+
+
+def add_search_indexes(apps, schema_editor):
+    # SQLite's LIKE cannot use expression indexes, so it gets none.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_INDEXES)
+
+
+def remove_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_INDEXES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0009_room_similarity"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["check_in_date", "id"], name="booking_checkin_idx"
+            ),
+        ),
+        migrations.RunPython(add_search_indexes, remove_search_indexes),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.15 on 2026-10-18 07:49
+
+from django.db import migrations, models
+
+
+def populate_daily_occupancy(apps, schema_editor):
+    from rooms.occupancy import summarize_bookings
+
+    Booking = apps.get_model("rooms", "Booking")
+    DailyOccupancy = apps.get_model("rooms", "DailyOccupancy")
+    summarize_bookings(
+        Booking.objects.exclude(status="CANCELLED"), DailyOccupancy
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("rooms", "0010_booking_search_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "room_type",
+                    models.CharField(
+                        choices=[
+                            ("STD", "Standard"),
+                            ("DLX", "Deluxe"),
+                            ("SUI", "Suite"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("nights_sold", models.IntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "daily occupancy",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyoccupancy",
+            constraint=models.UniqueConstraint(
+                fields=("date", "room_type"), name="unique_daily_occupancy"
+            ),
+        ),
+        migrations.RunPython(
+            populate_daily_occupancy, migrations.RunPython.noop
+        ),
+    ]
@@ -1,9 +1,10 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
+from datetime import timedelta
 from django.utils import timezone
-from django.core.files.storage import default_storage
+from django.utils.functional import cached_property
 
 
 class CustomUser(AbstractUser):
@@ -31,6 +32,21 @@ class Profile(models.Model):
         return f"{self.user.username}'s profile"
 
 
+class RoomQuerySet(models.QuerySet):
+    """Query helpers shared by the room listing views."""
+
+    def available_between(self, check_in_date, check_out_date):
+        """Exclude rooms with an occupied night in the given stay."""
+        occupied = RoomNight.objects.overlapping(
+            check_in_date, check_out_date
+        ).values("room_id")
+        return self.exclude(id__in=occupied)
+
+    def with_images(self):
+        """Prefetch room images so ``primary_image`` needs no query."""
+        return self.prefetch_related("images")
+
+
 class Room(models.Model):
     """Model representing a hotel room."""
 
@@ -47,6 +63,24 @@ class Room(models.Model):
     available = models.BooleanField(default=True)
     max_occupancy = models.IntegerField(default=2)
     size = models.IntegerField(help_text="Size in square feet", default=0)
+    # Bumped whenever the room or one of its images changes; it versions
+    # the room JSON for conditional GET requests.
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = RoomQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["available", "room_type", "price"],
+                name="room_listing_idx",
+            ),
+            models.Index(
+                fields=["price", "id"],
+                condition=models.Q(available=True),
+                name="room_available_price_idx",
+            ),
+        ]
 
     def clean(self):
         """Validate room attributes."""
@@ -60,12 +94,20 @@ class Room(models.Model):
     def __str__(self):
         return self.name
 
-    @property
+    @cached_property
     def primary_image(self):
-        """Get the first image associated with the room."""
+        """Get the first image, from prefetched images when available."""
+        if "images" in getattr(self, "_prefetched_objects_cache", {}):
+            images = self.images.all()
+            return images[0] if images else None
         return self.images.first()
 
 
+# Space between consecutive image positions, so an image can be moved
+# by rewriting only its own row.
+ORDER_GAP = 1024
+
+
 class RoomImage(models.Model):
     """Model for room images."""
 
@@ -75,6 +117,8 @@ class RoomImage(models.Model):
     image = models.ImageField(upload_to="room_images/")
     caption = models.CharField(max_length=100, blank=True)
     order = models.PositiveIntegerField(default=0)
+    # Resized copies made off the request path, see rooms.images.
+    derivatives = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ["order", "id"]
@@ -90,27 +134,92 @@ class RoomImage(models.Model):
         except Exception:
             return None
 
-    def delete(self, *args, **kwargs):
-        """Override delete method to handle GCS deletion."""
-        super().delete(*args, **kwargs)
-        default_storage.delete(self.image.path)
+    @property
+    def needs_derivatives(self):
+        """Whether the resized copies are missing or made from an old file."""
+        return bool(self.image.name) and (
+            self.derivatives.get("source") != self.image.name
+        )
 
     def save(self, *args, **kwargs):
-        """Override save method to handle GCS storage."""
+        """Append new images after their siblings without renumbering them."""
+        if self._state.adding and not self.order:
+            last = RoomImage.objects.filter(room_id=self.room_id).aggregate(
+                last=models.Max("order")
+            )["last"]
+            self.order = (last or 0) + ORDER_GAP
         super().save(*args, **kwargs)
 
-        # Update order if necessary
-        RoomImage.objects.filter(room=self.room).order_by("order").update(
-            order=models.F("id")
-        )
-
     def set_as_primary(self):
-        """Set this image as primary for its room."""
-        RoomImage.objects.filter(room=self.room, order=0).update(
-            order=models.F("id") + 1
+        """Set this image as primary for its room.
+
+        Only this row moves, to halfway below the current first image;
+        the room is renumbered only once that gap is used up.
+        """
+        first = (
+            RoomImage.objects.filter(room_id=self.room_id)
+            .exclude(pk=self.pk)
+            .order_by("order", "id")
+            .values_list("order", flat=True)
+            .first()
         )
-        self.order = 0
-        self.save()
+        if first is None or self.order < first:
+            return
+        if first > 0:
+            self.order = first // 2
+            self.save(update_fields=["order"])
+            return
+        others = (
+            RoomImage.objects.filter(room_id=self.room_id)
+            .exclude(pk=self.pk)
+            .values_list("id", flat=True)
+        )
+        RoomImage.reorder(self.room_id, [self.pk, *others])
+        self.refresh_from_db(fields=["order"])
+
+    @classmethod
+    def reorder(cls, room, image_ids):
+        """Put a room's images in the order of ``image_ids``.
+
+        Images left out keep their relative order after the listed ones.
+        Every changed row is written by a single ``bulk_update``.
+        """
+        from .cache import bump_version
+
+        room_id = getattr(room, "pk", room)
+        images = {image.pk: image for image in cls.objects.filter(room_id=room_id)}
+        ordered = [images.pop(pk) for pk in image_ids if pk in images]
+        ordered.extend(images.values())
+
+        changed = []
+        for position, image in enumerate(ordered, start=1):
+            if image.order != position * ORDER_GAP:
+                image.order = position * ORDER_GAP
+                changed.append(image)
+        if changed:
+            cls.objects.bulk_update(changed, ["order"])
+            # bulk_update sends no signals, so invalidate by hand.
+            Room.objects.filter(pk=room_id).update(updated_at=timezone.now())
+            transaction.on_commit(lambda: bump_version("roomimage"))
+        return ordered
+
+
+# Database constraints that reject a double booking.
+OVERLAP_CONSTRAINTS = ("unique_room_night", "booking_no_overlap")
+
+
+def is_overlap_error(exc):
+    """Whether an IntegrityError comes from a double booking."""
+    diag = getattr(exc.__cause__, "diag", None)
+    constraint = getattr(diag, "constraint_name", None)
+    if constraint:
+        return constraint in OVERLAP_CONSTRAINTS
+    # SQLite names the columns of a failed unique constraint instead.
+    message = str(exc)
+    return (
+        any(name in message for name in OVERLAP_CONSTRAINTS)
+        or "rooms_roomnight.room_id, rooms_roomnight.night" in message
+    )
 
 
 class Booking(models.Model):
@@ -141,37 +250,227 @@ class Booking(models.Model):
         max_length=10, choices=STATUS_CHOICES, default="PENDING"
     )
 
+    class Meta:
+        indexes = [
+            # Active stays of a room, as read by the importer's overlap
+            # sweep. Availability checks use RoomNight instead.
+            models.Index(
+                fields=["room", "check_in_date", "check_out_date"],
+                condition=~models.Q(status="CANCELLED"),
+                name="booking_active_stay_idx",
+            ),
+            models.Index(
+                fields=["user", "check_in_date"],
+                name="booking_user_checkin_idx",
+            ),
+            # Serves the admin changelist, newest check-ins first.
+            models.Index(
+                fields=["check_in_date", "id"],
+                name="booking_checkin_idx",
+            ),
+        ]
+
     def clean(self):
         """Validate booking dates and availability."""
+        from .services import validate_booking
+
         super().clean()
+        validate_booking(self)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember the stay as loaded, to adjust the daily summary."""
+        from .occupancy import remember_stay
+
+        booking = super().from_db(db, field_names, values)
+        remember_stay(booking, field_names)
+        return booking
+
+    def save(self, *args, validate=True, **kwargs):
+        """Override save to validate and keep the derived tables in sync.
+
+        Overlaps are ultimately rejected by the database (the unique
+        room-night index, plus an exclusion constraint on PostgreSQL), so
+        a concurrent booking that slipped past validation surfaces here
+        as a ValidationError rather than a double booking. The booking
+        service passes ``validate=False`` once its form has validated.
+        The night index and the daily occupancy summary are updated in
+        the same transaction.
+        """
+        from .occupancy import saved_stay, sync_booking_occupancy
+
+        if validate:
+            self.full_clean()
+        created = self._state.adding
+        previous = None if created else saved_stay(self)
+        try:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                RoomNight.sync_booking(self, created=created)
+                sync_booking_occupancy(self, previous)
+        except IntegrityError as exc:
+            if created:
+                self.pk = None
+                self._state.adding = True
+            if not is_overlap_error(exc):
+                raise
+            raise ValidationError(
+                "Room is already booked for these dates"
+            ) from exc
+
+    @property
+    def occupies_room(self):
+        """Whether this booking holds its nights (cancelled ones do not)."""
+        return self.status != "CANCELLED"
+
+    @property
+    def nights(self):
+        """Return the dates of every night covered by this booking."""
+        days = (self.check_out_date - self.check_in_date).days
+        return [
+            self.check_in_date + timedelta(days=offset)
+            for offset in range(days)
+        ]
+
+    def __str__(self):
+        return f"Booking for {self.room.name} by {self.guest_name}"
 
-        if not all([self.check_in_date, self.check_out_date]):
-            raise ValidationError("Check-in and out dates must be complete.")
 
-        if self.check_in_date and self.check_out_date:
-            if self.check_in_date >= self.check_out_date:
-                raise ValidationError("Check-out must be after check-in date")
+class RoomNightQuerySet(models.QuerySet):
+    """Lookups over the room-night occupancy index."""
 
-            if self.check_in_date < timezone.now().date():
-                raise ValidationError("Check-in date cannot be in the past")
+    def overlapping(self, check_in_date, check_out_date):
+        """Return occupied nights falling inside a stay."""
+        return self.filter(night__gte=check_in_date, night__lt=check_out_date)
 
-        if hasattr(self, "room") and self.room is not None:
-            overlapping_bookings = Booking.objects.filter(
-                room=self.room,
-                check_in_date__lt=self.check_out_date,
-                check_out_date__gt=self.check_in_date,
+
+class RoomNight(models.Model):
+    """One occupied night of a room, maintained from active bookings.
+
+    Availability checks become an indexed lookup on ``(room, night)``
+    instead of an interval-overlap scan over every booking.
+    """
+
+    room = models.ForeignKey(
+        Room, related_name="nights", on_delete=models.CASCADE
+    )
+    booking = models.ForeignKey(
+        Booking, related_name="room_nights", on_delete=models.CASCADE
+    )
+    night = models.DateField()
+
+    objects = RoomNightQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room", "night"], name="unique_room_night"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["night", "room"], name="roomnight_night_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.room.name} on {self.night}"
+
+    @classmethod
+    def sync_booking(cls, booking, created=False):
+        """Rewrite the index rows for a booking after it was saved."""
+        if not created:
+            cls.objects.filter(booking=booking).delete()
+        if booking.occupies_room:
+            cls.objects.bulk_create(
+                cls(room_id=booking.room_id, booking=booking, night=night)
+                for night in booking.nights
             )
 
-            if self.pk:
-                overlapping_bookings = overlapping_bookings.exclude(pk=self.pk)
 
-            if overlapping_bookings.exists():
-                raise ValidationError("Room is already booked for these dates")
+class DailyOccupancy(models.Model):
+    """Room nights sold and revenue per night and room type.
 
-    def save(self, *args, **kwargs):
-        """Override save to perform full validation."""
-        self.full_clean()
-        super().save(*args, **kwargs)
+    Kept in step with bookings by ``rooms.occupancy``, so occupancy
+    reports read a few rows per day instead of expanding every stay.
+    """
+
+    date = models.DateField()
+    room_type = models.CharField(max_length=3, choices=Room.ROOM_TYPES)
+    nights_sold = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name_plural = "daily occupancy"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "room_type"], name="unique_daily_occupancy"
+            ),
+        ]
 
     def __str__(self):
-        return f"Booking for {self.room.name} by {self.guest_name}"
+        return f"{self.room_type} on {self.date}"
+
+
+class RoomSimilarity(models.Model):
+    """A precomputed neighbour of a room, for the similar rooms list."""
+
+    room = models.ForeignKey(
+        Room, related_name="similarities", on_delete=models.CASCADE
+    )
+    similar_room = models.ForeignKey(
+        Room, related_name="similar_to", on_delete=models.CASCADE
+    )
+    rank = models.PositiveSmallIntegerField()
+    distance = models.FloatField()
+
+    class Meta:
+        ordering = ["room", "rank"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["room", "rank"], name="unique_room_similarity_rank"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.room_id} ~ {self.similar_room_id} (#{self.rank})"
+
+
+class Job(models.Model):
+    """A unit of background work stored in the database.
+
+    Jobs are written in the same transaction as the change that caused
+    them (an outbox), so they exist exactly when that change commits.
+    """
+
+    STATUS_CHOICES = [
+        ("PENDING", "Pending"),
+        ("RUNNING", "Running"),
+        ("DONE", "Done"),
+        ("DEAD", "Dead"),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default="PENDING"
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=32, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["run_after", "id"],
+                condition=models.Q(status="PENDING"),
+                name="job_ready_idx",
+            ),
+            models.Index(fields=["status", "locked_at"], name="job_status_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
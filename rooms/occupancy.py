@@ -0,0 +1,392 @@
+"""Daily occupancy and revenue summaries.
+
+``DailyOccupancy`` holds the room nights sold and the revenue earned per
+night and room type. Saving or deleting a booking adjusts it, in the
+same transaction, by the difference the change makes, so reports read
+one row per night and type instead of expanding every stay. Writes that
+skip ``Booking.save``, like the bulk importer, rebuild the dates they
+touched with ``rebuild_occupancy``, which expands stays with NumPy.
+
+A stay's revenue is spread evenly over its nights in whole cents, the
+remainder going to the first night, so its nights add up to
+``total_price``. Rows are filed under the room's type at booking time;
+rebuild the summary after changing the type of a booked room.
+"""
+
+import calendar
+from datetime import date, timedelta
+from decimal import ROUND_DOWN, Decimal
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Sum
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+
+from .models import Booking, DailyOccupancy, Room
+
+CENT = Decimal("0.01")
+
+ROOM_TYPES = [code for code, _ in Room.ROOM_TYPES]
+
+PERIODS = ("day", "month", "total")
+
+# Longest range a report covers, in nights.
+MAX_REPORT_DAYS = 3660
+
+# Fields a stay is made of, as loaded from the database.
+STAY_FIELDS = (
+    "room_id",
+    "check_in_date",
+    "check_out_date",
+    "total_price",
+    "status",
+)
+
+
+class ReportError(ValueError):
+    """Invalid report parameters."""
+
+
+def stay_of(booking):
+    """Return what a booking adds to the summary, or None if nothing.
+
+    The stay is ``(room_id, check_in, check_out, total_price)``.
+    """
+    if not booking.occupies_room:
+        return None
+    if booking.check_out_date <= booking.check_in_date:
+        return None
+    return (
+        booking.room_id,
+        booking.check_in_date,
+        booking.check_out_date,
+        booking.total_price,
+    )
+
+
+def remember_stay(booking, field_names):
+    """Keep the stay of a booking loaded with all of its stay fields."""
+    if all(name in field_names for name in STAY_FIELDS):
+        booking._saved_stay = stay_of(booking)
+
+
+def saved_stay(booking):
+    """Return the stay a booking had in the database before this save."""
+    if hasattr(booking, "_saved_stay"):
+        return booking._saved_stay
+    saved = Booking.objects.filter(pk=booking.pk).only(*STAY_FIELDS).first()
+    return stay_of(saved) if saved is not None else None
+
+
+def night_revenue(total_price, nights):
+    """Return the revenue of the first night and of each later one."""
+    rate = (total_price / nights).quantize(CENT, rounding=ROUND_DOWN)
+    return total_price - rate * (nights - 1), rate
+
+
+def _room_types(booking, room_ids):
+    types = {}
+    if Booking.room.is_cached(booking):
+        types[booking.room_id] = booking.room.room_type
+    missing = set(room_ids) - set(types)
+    if missing:
+        types.update(
+            Room.objects.filter(pk__in=missing).values_list("id", "room_type")
+        )
+    return types
+
+
+def _add_stay(changes, stay, room_type, sign):
+    _, check_in, check_out, total_price = stay
+    nights = (check_out - check_in).days
+    first, rate = night_revenue(total_price, nights)
+    for offset in range(nights):
+        key = (room_type, check_in + timedelta(days=offset))
+        sold, revenue = changes.get(key, (0, Decimal(0)))
+        changes[key] = (
+            sold + sign,
+            revenue + sign * (rate if offset else first),
+        )
+
+
+def apply_changes(changes):
+    """Add ``(nights, revenue)`` changes keyed by ``(room_type, date)``.
+
+    Missing rows are created first, then every set of nights changed by
+    the same amounts takes one UPDATE; the increments are done by the
+    database, so concurrent bookings of one type do not lose updates.
+    """
+    changes = {
+        key: change for key, change in changes.items() if any(change)
+    }
+    if not changes:
+        return
+    DailyOccupancy.objects.bulk_create(
+        [
+            DailyOccupancy(room_type=room_type, date=night)
+            for (room_type, night), (sold, _) in changes.items()
+            if sold > 0
+        ],
+        ignore_conflicts=True,
+    )
+    groups = {}
+    for (room_type, night), (sold, revenue) in sorted(changes.items()):
+        groups.setdefault((room_type, sold, revenue), []).append(night)
+    for (room_type, sold, revenue), nights in groups.items():
+        DailyOccupancy.objects.filter(
+            room_type=room_type, date__in=nights
+        ).update(
+            nights_sold=F("nights_sold") + sold,
+            revenue=F("revenue") + revenue,
+        )
+
+
+def sync_booking_occupancy(booking, previous):
+    """Move the summary from a booking's ``previous`` stay to its new one.
+
+    Called by ``Booking.save`` after the row is written.
+    """
+    current = stay_of(booking)
+    if previous != current:
+        stays = [stay for stay in (previous, current) if stay]
+        types = _room_types(booking, {stay[0] for stay in stays})
+        changes = {}
+        if previous:
+            _add_stay(changes, previous, types[previous[0]], -1)
+        if current:
+            _add_stay(changes, current, types[current[0]], 1)
+        apply_changes(changes)
+    booking._saved_stay = current
+
+
+def release_booking_occupancy(booking):
+    """Take a deleted booking's stay out of the summary."""
+    if hasattr(booking, "_saved_stay"):
+        stay = booking._saved_stay
+    else:
+        stay = stay_of(booking)
+    if stay:
+        changes = {}
+        _add_stay(
+            changes, stay, _room_types(booking, [stay[0]])[stay[0]], -1
+        )
+        apply_changes(changes)
+    booking._saved_stay = None
+
+
+def expand_stays(type_index, check_in, check_out, cents):
+    """Expand stays into one entry per night.
+
+    Takes arrays with one item per stay: room type index, check-in and
+    check-out as ordinals, and the price in cents. Returns the type,
+    ordinal and revenue in cents of every night.
+    """
+    nights = check_out - check_in
+    rate = cents // nights
+    first = cents - rate * (nights - 1)
+    # Position of each stay's first night in the output.
+    starts = np.cumsum(nights) - nights
+    offsets = np.arange(nights.sum()) - np.repeat(starts, nights)
+    days = np.repeat(check_in, nights) + offsets
+    revenue = np.repeat(rate, nights)
+    revenue[starts] = first
+    return np.repeat(type_index, nights), days, revenue
+
+
+def rebuild_occupancy(start=None, end=None, chunk_size=50000):
+    """Recompute the summary from bookings for nights in ``[start, end)``.
+
+    Without bounds the whole table is rebuilt. Returns ``(rows,
+    nights)``: summary rows written and room nights counted.
+    """
+    bookings = Booking.objects.exclude(status="CANCELLED")
+    stale = DailyOccupancy.objects.all()
+    if start is not None:
+        bookings = bookings.filter(check_out_date__gt=start)
+        stale = stale.filter(date__gte=start)
+    if end is not None:
+        bookings = bookings.filter(check_in_date__lt=end)
+        stale = stale.filter(date__lt=end)
+
+    with transaction.atomic():
+        stale.delete()
+        return summarize_bookings(
+            bookings, DailyOccupancy, start, end, chunk_size
+        )
+
+
+def summarize_bookings(bookings, model, start=None, end=None, chunk_size=50000):
+    """Insert summary rows of ``model`` for the stays in ``bookings``.
+
+    ``bookings`` holds the active bookings overlapping ``[start, end)``
+    and ``model`` is ``DailyOccupancy``, or its historical version in a
+    migration. Stays are read ``chunk_size`` at a time and expanded into
+    nights with NumPy, and the totals are accumulated in one array per
+    range. Returns ``(rows, nights)``.
+    """
+    bounds = bookings.aggregate(
+        first=Min("check_in_date"), last=Max("check_out_date")
+    )
+    if bounds["first"] is None:
+        return 0, 0
+    start = max(start or bounds["first"], bounds["first"])
+    end = min(end or bounds["last"], bounds["last"])
+    if end <= start:
+        return 0, 0
+
+    low, span = start.toordinal(), (end - start).days
+    size = len(ROOM_TYPES) * span
+    sold = np.zeros(size, dtype=np.int64)
+    cents = np.zeros(size, dtype=np.int64)
+    index = {code: i for i, code in enumerate(ROOM_TYPES)}
+    rows = bookings.values_list(
+        "room__room_type", "check_in_date", "check_out_date", "total_price"
+    ).iterator(chunk_size=chunk_size)
+    while chunk := list(islice(rows, chunk_size)):
+        stays = np.array(
+            [
+                (
+                    index.get(room_type, -1),
+                    check_in.toordinal(),
+                    check_out.toordinal(),
+                    int(price * 100),
+                )
+                for room_type, check_in, check_out, price in chunk
+            ],
+            dtype=np.int64,
+        )
+        stays = stays[(stays[:, 0] >= 0) & (stays[:, 2] > stays[:, 1])]
+        types, days, revenue = expand_stays(*stays.T)
+        inside = (days >= low) & (days < low + span)
+        cells = types[inside] * span + days[inside] - low
+        sold += np.bincount(cells, minlength=size)
+        # Float sums of whole cents are exact up to 2**53.
+        cents += np.rint(
+            np.bincount(cells, weights=revenue[inside], minlength=size)
+        ).astype(np.int64)
+
+    filled = np.flatnonzero(sold | cents)
+    model.objects.bulk_create(
+        (
+            model(
+                room_type=ROOM_TYPES[cell // span],
+                date=date.fromordinal(low + int(cell % span)),
+                nights_sold=int(sold[cell]),
+                revenue=Decimal(int(cents[cell])) / 100,
+            )
+            for cell in filled
+        ),
+        batch_size=5000,
+    )
+    return len(filled), int(sold.sum())
+
+
+def parse_report_params(params):
+    """Read report arguments from ``from``, ``to``, ``period`` and ``by``.
+
+    ``to`` is exclusive and ``by=room_type`` splits rows by room type.
+    """
+    bounds = {}
+    for name in ("from", "to"):
+        try:
+            bounds[name] = parse_date(params.get(name) or "")
+        except ValueError:
+            bounds[name] = None
+        if bounds[name] is None:
+            raise ReportError(f"'{name}' must be a date (YYYY-MM-DD).")
+    start, end = bounds["from"], bounds["to"]
+    if not 0 < (end - start).days <= MAX_REPORT_DAYS:
+        raise ReportError(
+            f"'to' must be after 'from', by at most {MAX_REPORT_DAYS} days."
+        )
+    period = params.get("period") or "day"
+    if period not in PERIODS:
+        raise ReportError(f"'period' must be one of {', '.join(PERIODS)}.")
+    by = params.get("by") or ""
+    if by not in ("", "room_type"):
+        raise ReportError("'by' must be room_type.")
+    return {
+        "start": start,
+        "end": end,
+        "period": period,
+        "by_room_type": bool(by),
+    }
+
+
+def _periods(start, end, period):
+    """Yield ``(period start, nights in range)`` for a report."""
+    if period == "total":
+        yield start, (end - start).days
+    elif period == "day":
+        for offset in range((end - start).days):
+            yield start + timedelta(days=offset), 1
+    else:
+        month = start.replace(day=1)
+        while month < end:
+            days = calendar.monthrange(month.year, month.month)[1]
+            following = month + timedelta(days=days)
+            yield month, (min(end, following) - max(start, month)).days
+            month = following
+
+
+def _ratio(amount, nights):
+    if not nights:
+        return None
+    return (Decimal(amount) / nights).quantize(CENT)
+
+
+def occupancy_report(start, end, period="day", by_room_type=False):
+    """Return occupancy, ADR and RevPAR for nights in ``[start, end)``.
+
+    Rows cover every ``period`` (day, month or the whole range), split
+    by room type if asked. Occupancy is nights sold over room nights
+    available, ADR the revenue per night sold and RevPAR the revenue
+    per night available, counting the rooms there are now.
+    """
+    rows = DailyOccupancy.objects.filter(date__gte=start, date__lt=end)
+    keys = ["room_type"] if by_room_type else []
+    if period == "day":
+        rows = rows.annotate(period=F("date"))
+        keys.append("period")
+    elif period == "month":
+        rows = rows.annotate(period=TruncMonth("date"))
+        keys.append("period")
+    sums = {"sold": Sum("nights_sold"), "earned": Sum("revenue")}
+    if keys:
+        grouped = rows.values(*keys).annotate(**sums).order_by()
+    else:
+        grouped = [rows.aggregate(**sums)]
+    totals = {
+        (row.get("room_type"), row.get("period")): (row["sold"], row["earned"])
+        for row in grouped
+    }
+    rooms = dict(
+        Room.objects.values_list("room_type").annotate(Count("id")).order_by()
+    )
+
+    report = []
+    for room_type in ROOM_TYPES if by_room_type else [None]:
+        available_rooms = (
+            rooms.get(room_type, 0) if by_room_type else sum(rooms.values())
+        )
+        for first, days in _periods(start, end, period):
+            key = (room_type, None if period == "total" else first)
+            sold, revenue = totals.get(key, (None, None))
+            sold = sold or 0
+            revenue = Decimal(revenue or 0).quantize(CENT)
+            available = available_rooms * days
+            row = {
+                "period": first,
+                "room_nights": available,
+                "nights_sold": sold,
+                "revenue": revenue,
+                "occupancy": round(sold / available, 4) if available else None,
+                "adr": _ratio(revenue, sold),
+                "revpar": _ratio(revenue, available),
+            }
+            if by_room_type:
+                row["room_type"] = room_type
+            report.append(row)
+    return report
@@ -0,0 +1,187 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+CURSOR_SALT = "rooms.pagination.cursor"
+PER_PAGE = 24
+
+
+class InvalidCursor(Exception):
+    """Raised for a cursor that was tampered with or does not fit."""
+
+
+def _dump(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+class KeysetPage:
+    """One page of rows plus opaque cursors to its neighbours."""
+
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.next_url = self.previous_url = None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def link(self, request, param, cursor):
+        if cursor is None:
+            return None
+        query = request.GET.copy()
+        query[param] = cursor
+        return f"{request.path}?{query.urlencode()}"
+
+
+class KeysetPaginator:
+    """Paginate a queryset by seeking past the last row's sort key.
+
+    ``keys`` are field names, ``-`` for descending, and must end in a
+    unique field such as ``id``. Each page is one indexed range query,
+    so a deep page costs the same as the first. Cursors are signed, so
+    clients can pass them around but not forge them.
+    """
+
+    def __init__(self, queryset, keys, per_page=PER_PAGE):
+        self.queryset = queryset
+        self.keys = [(key.lstrip("-"), key.startswith("-")) for key in keys]
+        self.per_page = per_page
+        self.salt = f"{CURSOR_SALT}:{queryset.model._meta.label}:{','.join(keys)}"
+
+    def encode(self, direction, row):
+        values = [_dump(_value(row, name)) for name, _ in self.keys]
+        return signing.dumps([direction, values], salt=self.salt, compress=True)
+
+    def decode(self, cursor):
+        try:
+            direction, values = signing.loads(cursor, salt=self.salt)
+        except (signing.BadSignature, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        if direction not in ("next", "previous") or len(values) != len(
+            self.keys
+        ):
+            raise InvalidCursor(cursor)
+        opts = self.queryset.model._meta
+        try:
+            values = [
+                opts.get_field(name).to_python(value)
+                for (name, _), value in zip(self.keys, values)
+            ]
+        except Exception:
+            raise InvalidCursor(cursor)
+        return direction, values
+
+    def _seek(self, values, backwards):
+        # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), per direction.
+        condition = Q()
+        for i, (name, descending) in enumerate(self.keys):
+            lookup = "lt" if descending != backwards else "gt"
+            term = Q(**{f"{name}__{lookup}": values[i]})
+            for (prior, _), value in zip(self.keys[:i], values):
+                term &= Q(**{prior: value})
+            condition |= term
+        return condition
+
+    def _order(self, backwards):
+        return [
+            f"-{name}" if descending != backwards else name
+            for name, descending in self.keys
+        ]
+
+    def page(self, cursor=None):
+        """Return the page the cursor points to, or the first page."""
+        direction, values = self.decode(cursor) if cursor else ("next", None)
+        backwards = direction == "previous"
+
+        rows = self.queryset.order_by(*self._order(backwards))
+        if values is not None:
+            rows = rows.filter(self._seek(values, backwards))
+        rows = list(rows[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = more if not backwards else True
+        has_previous = more if backwards else values is not None
+        return KeysetPage(
+            rows,
+            self.encode("next", rows[-1]) if rows and has_next else None,
+            self.encode("previous", rows[0]) if rows and has_previous else None,
+        )
+
+
+def paginate_request(request, queryset, keys, param="cursor", per_page=PER_PAGE):
+    """Return the page requested by ``request.GET[param]`` with its links.
+
+    A bad cursor falls back to the first page.
+    """
+    paginator = KeysetPaginator(queryset, keys, per_page)
+    try:
+        page = paginator.page(request.GET.get(param))
+    except InvalidCursor:
+        page = paginator.page()
+    page.next_url = page.link(request, param, page.next_cursor)
+    page.previous_url = page.link(request, param, page.previous_cursor)
+    return page
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids exact ``COUNT(*)`` on large tables.
+
+    An unfiltered Postgres table is sized from the planner statistics
+    (``pg_class.reltuples``); filtered querysets are counted up to
+    ``count_cap`` rows only. Small tables still get an exact count.
+    """
+
+    count_cap = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = self._estimated_rows(queryset)
+            if estimate is not None and estimate > self.count_cap:
+                return estimate
+        return queryset.order_by()[:self.count_cap].count()
+
+    @staticmethod
+    def _estimated_rows(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
@@ -0,0 +1,111 @@
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import Count, F, IntegerField
+from django.db.models.functions import Cast, Floor
+from django.utils.dateparse import parse_date
+
+from .models import Room
+
+# Bucket widths of the price (per night) and size (sq ft) facets. The
+# price width matches the step of the max price slider.
+PRICE_BUCKET = 50
+SIZE_BUCKET = 100
+
+
+def _date(value):
+    # parse_date raises on well-formed but impossible dates (2030-02-30).
+    try:
+        return parse_date(value or "")
+    except ValueError:
+        return None
+
+
+def filter_rooms(params):
+    """Filter available rooms by the search form's GET parameters.
+
+    Returns the queryset and the parsed filters. Stays are only applied
+    when both dates parse.
+    """
+    room_type = params.get("room_type") or None
+    try:
+        max_price = Decimal(params.get("max_price") or "")
+    except InvalidOperation:
+        max_price = None
+    if max_price is not None and not max_price.is_finite():
+        max_price = None
+    check_in = _date(params.get("check_in"))
+    check_out = _date(params.get("check_out"))
+
+    rooms = Room.objects.filter(available=True)
+    if room_type:
+        rooms = rooms.filter(room_type=room_type)
+    if max_price is not None:
+        rooms = rooms.filter(price__lte=max_price)
+    if check_in and check_out:
+        rooms = rooms.available_between(check_in, check_out)
+
+    filters = {
+        "room_type": room_type,
+        "max_price": max_price,
+        "check_in": check_in,
+        "check_out": check_out,
+    }
+    return rooms, filters
+
+
+def _bucket(field, width):
+    return Cast(Floor(F(field) / width), IntegerField())
+
+
+def _ranges(counts, width):
+    return [
+        {"min": bucket * width, "max": (bucket + 1) * width, "count": count}
+        for bucket, count in sorted(counts.items())
+    ]
+
+
+def room_facets(rooms):
+    """Count rooms per type, price bucket, occupancy and size bucket.
+
+    Every facet comes from one query grouped on all four dimensions at
+    once; the cells are then summed per facet in Python.
+    """
+    cells = (
+        rooms.prefetch_related(None)
+        .order_by()
+        .values(
+            "room_type",
+            "max_occupancy",
+            price_bucket=_bucket("price", PRICE_BUCKET),
+            size_bucket=_bucket("size", SIZE_BUCKET),
+        )
+        .annotate(count=Count("id"))
+    )
+
+    totals = {"room_type": {}, "price": {}, "max_occupancy": {}, "size": {}}
+    for cell in cells:
+        for facet, value in (
+            ("room_type", cell["room_type"]),
+            ("price", cell["price_bucket"]),
+            ("max_occupancy", cell["max_occupancy"]),
+            ("size", cell["size_bucket"]),
+        ):
+            totals[facet][value] = totals[facet].get(value, 0) + cell["count"]
+
+    return {
+        "total": sum(totals["room_type"].values()),
+        "room_type": [
+            {
+                "value": code,
+                "label": label,
+                "count": totals["room_type"].get(code, 0),
+            }
+            for code, label in Room.ROOM_TYPES
+        ],
+        "price": _ranges(totals["price"], PRICE_BUCKET),
+        "max_occupancy": [
+            {"value": value, "count": count}
+            for value, count in sorted(totals["max_occupancy"].items())
+        ],
+        "size": _ranges(totals["size"], SIZE_BUCKET),
+    }
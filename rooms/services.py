@@ -0,0 +1,74 @@
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import is_room_available
+from .metrics import BOOKINGS
+
+
+def validate_stay(check_in_date, check_out_date):
+    """Validate stay dates without touching the database."""
+    if not all([check_in_date, check_out_date]):
+        raise ValidationError("Check-in and out dates must be complete.")
+
+    if check_in_date >= check_out_date:
+        raise ValidationError("Check-out must be after check-in date")
+
+    if check_in_date < timezone.now().date():
+        raise ValidationError("Check-in date cannot be in the past")
+
+
+def validate_booking(booking):
+    """Validate a booking's dates and check its room is free, once."""
+    validate_stay(booking.check_in_date, booking.check_out_date)
+
+    if booking.room_id is not None and not is_room_available(
+        booking.room_id,
+        booking.check_in_date,
+        booking.check_out_date,
+        exclude_booking_id=booking.pk,
+    ):
+        raise ValidationError("Room is already booked for these dates")
+
+
+def calculate_total_price(room, check_in_date, check_out_date):
+    """Return the price of a stay at the room's nightly rate."""
+    return room.price * (check_out_date - check_in_date).days
+
+
+def create_booking(booking, room, user):
+    """Confirm and persist a new booking of ``room`` for ``user``."""
+    booking.room = room
+    booking.user = user
+    booking.status = "CONFIRMED"
+    return _persist(booking, "create")
+
+
+def update_booking(booking):
+    """Re-price and persist changes to an existing booking."""
+    return _persist(booking, "update")
+
+
+def _persist(booking, operation):
+    """Save a booking whose fields were already validated by a form.
+
+    Only the dates are re-checked; overlap is enforced by the database
+    on write, so no availability query runs here.
+    """
+    try:
+        validate_stay(booking.check_in_date, booking.check_out_date)
+    except ValidationError:
+        BOOKINGS.labels(operation=operation, outcome="invalid").inc()
+        raise
+    booking.total_price = calculate_total_price(
+        booking.room, booking.check_in_date, booking.check_out_date
+    )
+    try:
+        booking.save(validate=False)
+    except ValidationError:
+        BOOKINGS.labels(operation=operation, outcome="conflict").inc()
+        raise
+    transaction.on_commit(
+        BOOKINGS.labels(operation=operation, outcome="success").inc
+    )
+    return booking
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_version
+from .images import derivative_names
+from .jobs import enqueue
+from .models import Booking, Room, RoomImage
+from .occupancy import release_booking_occupancy
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=RoomImage)
+@receiver(post_delete, sender=RoomImage)
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def invalidate_cached_pages(sender, **kwargs):
+    """Bump the page cache version of the changed model once committed."""
+    model_name = sender._meta.model_name
+    transaction.on_commit(lambda: bump_version(model_name))
+
+
+@receiver(post_delete, sender=Booking)
+def release_occupancy(sender, instance, **kwargs):
+    """Take a deleted booking's nights out of the daily summary."""
+    release_booking_occupancy(instance)
+
+
+@receiver(post_save, sender=RoomImage)
+@receiver(post_delete, sender=RoomImage)
+def touch_room(sender, instance, **kwargs):
+    """Give the room a new version when one of its images changes."""
+    Room.objects.filter(pk=instance.room_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=RoomImage)
+def queue_image_derivatives(sender, instance, update_fields=None, **kwargs):
+    """Resize a new or replaced image in the job queue, not the request."""
+    if update_fields is not None and "image" not in update_fields:
+        return
+    if instance.needs_derivatives:
+        enqueue(
+            "build_image_derivatives",
+            image_id=instance.pk,
+            image_name=instance.image.name,
+        )
+
+
+@receiver(post_delete, sender=RoomImage)
+def queue_image_file_cleanup(sender, instance, **kwargs):
+    """Delete an image's files once the row is gone, cascades included.
+
+    The job commits with the delete, and the worker removes the files of
+    many images, e.g. a whole room, in one batched call.
+    """
+    names = [instance.image.name, *derivative_names(instance.derivatives)]
+    names = [name for name in names if name]
+    if names:
+        enqueue("delete_media", names=names)
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def queue_similarity_refresh(sender, instance, **kwargs):
+    """Recompute the similar rooms a change can affect, off the request."""
+    enqueue("refresh_room_similarity", room_id=instance.pk)
@@ -0,0 +1,154 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .cache import bump_version
+from .models import Room, RoomSimilarity
+
+# Neighbours stored per room; the detail page shows the first few that
+# are available.
+TOP_K = 6
+
+# Feature scales: each is the difference that counts as one unit of
+# distance. A different room type adds one unit as well.
+PRICE_SCALE = np.log(1.5)
+SIZE_SCALE = 200.0
+OCCUPANCY_SCALE = 2.0
+
+# Rows of the distance matrix computed at once, to bound memory.
+BLOCK_SIZE = 1024
+
+
+def room_features(rooms=None):
+    """Return room ids (sorted) and their feature matrix.
+
+    ``rooms`` defaults to every room; migrations pass a queryset of
+    their historical model.
+    """
+    rooms = Room.objects.all() if rooms is None else rooms
+    rows = list(
+        rooms.order_by("id").values_list(
+            "id", "room_type", "price", "size", "max_occupancy"
+        )
+    )
+    types = {code: i for i, (code, _) in enumerate(Room.ROOM_TYPES)}
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    features = np.zeros((len(rows), len(types) + 3))
+    if not rows:
+        return ids, features
+
+    # One-hot types scaled so that two different types are 1 apart.
+    type_index = np.array([types.get(row[1], 0) for row in rows])
+    features[np.arange(len(rows)), type_index] = np.sqrt(0.5)
+    numeric = np.array([row[2:] for row in rows], dtype=float)
+    features[:, -3] = np.log(np.maximum(numeric[:, 0], 1.0)) / PRICE_SCALE
+    features[:, -2] = numeric[:, 1] / SIZE_SCALE
+    features[:, -1] = numeric[:, 2] / OCCUPANCY_SCALE
+    return ids, features
+
+
+def nearest_neighbours(ids, features, positions, k=TOP_K):
+    """Yield ``(room_id, [(neighbour_id, distance), ...])`` per position.
+
+    Distances are computed a block of rows at a time against every
+    room, and only the ``k`` closest are sorted.
+    """
+    k = min(k, len(ids) - 1)
+    if k < 1:
+        return
+    squared = (features**2).sum(axis=1)
+    positions = np.asarray(positions, dtype=np.int64)
+    for start in range(0, len(positions), BLOCK_SIZE):
+        block = positions[start:start + BLOCK_SIZE]
+        dist = (
+            squared[block, None]
+            + squared[None, :]
+            - 2 * features[block] @ features.T
+        )
+        np.maximum(dist, 0, out=dist)
+        dist[np.arange(len(block)), block] = np.inf
+        closest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+        closest_dist = np.take_along_axis(dist, closest, axis=1)
+        order = np.lexsort((ids[closest], closest_dist), axis=1)
+        closest = np.take_along_axis(closest, order, axis=1)
+        closest_dist = np.sqrt(np.take_along_axis(closest_dist, order, axis=1))
+        for row, position in enumerate(block):
+            yield int(ids[position]), list(
+                zip(ids[closest[row]].tolist(), closest_dist[row].tolist())
+            )
+
+
+def _store(neighbours, room_ids):
+    rows = [
+        RoomSimilarity(
+            room_id=room_id,
+            similar_room_id=similar_id,
+            rank=rank,
+            distance=distance,
+        )
+        for room_id, similar in neighbours
+        for rank, (similar_id, distance) in enumerate(similar)
+    ]
+    with transaction.atomic():
+        RoomSimilarity.objects.filter(room_id__in=room_ids).delete()
+        RoomSimilarity.objects.bulk_create(rows, batch_size=5000)
+    transaction.on_commit(lambda: bump_version("room"))
+    return len(rows)
+
+
+def rebuild_similarities(k=TOP_K):
+    """Recompute the neighbours of every room."""
+    ids, features = room_features()
+    neighbours = nearest_neighbours(ids, features, range(len(ids)), k)
+    with transaction.atomic():
+        RoomSimilarity.objects.all().delete()
+        return _store(neighbours, [])
+
+
+def refresh_similarities(changed_ids, k=TOP_K):
+    """Update neighbour lists after rooms were saved or deleted.
+
+    Besides the changed rooms themselves, only rooms whose list holds a
+    changed room, is incomplete, or would now take a changed room in are
+    recomputed. Returns the number of rooms recomputed.
+    """
+    ids, features = room_features()
+    if len(ids) < 2:
+        RoomSimilarity.objects.all().delete()
+        return 0
+    position = {room_id: i for i, room_id in enumerate(ids.tolist())}
+    expected = min(k, len(ids) - 1)
+
+    lists = {
+        row["room_id"]: row
+        for row in RoomSimilarity.objects.values("room_id").annotate(
+            size=Count("id"), worst=Max("distance")
+        )
+    }
+    worst = np.full(len(ids), np.inf)
+    for room_id, row in lists.items():
+        if room_id in position and row["size"] >= expected:
+            worst[position[room_id]] = row["worst"]
+
+    affected = np.isinf(worst)
+    affected[
+        [
+            position[room_id]
+            for room_id in RoomSimilarity.objects.filter(
+                similar_room_id__in=changed_ids
+            ).values_list("room_id", flat=True)
+            if room_id in position
+        ]
+    ] = True
+    for room_id in changed_ids:
+        if room_id not in position:
+            continue
+        i = position[room_id]
+        affected[i] = True
+        dist = np.sqrt(((features - features[i]) ** 2).sum(axis=1))
+        affected |= dist <= worst + 1e-9
+
+    positions = np.flatnonzero(affected)
+    neighbours = nearest_neighbours(ids, features, positions, k)
+    _store(neighbours, ids[positions].tolist())
+    return len(positions)
@@ -1,17 +1,339 @@
+import json
+import logging
+import mimetypes
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from google.cloud.storage.retry import DEFAULT_RETRY
+from google.oauth2 import service_account
 from storages.backends.gcloud import GoogleCloudStorage
+from storages.utils import clean_name, setting
+
+from .local_bucket import LocalClient
+
+logger = logging.getLogger(__name__)
+
+PUBLIC_HOST = "https://storage.googleapis.com"
+
+# GCS accepts up to 1000 calls per batch request but recommends 100.
+DELETE_BATCH_SIZE = 100
+
+
+@lru_cache(maxsize=None)
+def load_credentials():
+    """Load the service account named by ``GS_CREDENTIALS_ENV``, once.
+
+    Returns None when no variable is set, leaving the client to its
+    default credentials lookup.
+    """
+    source = setting("GS_CREDENTIALS_ENV")
+    if not source or source not in os.environ:
+        return None
+    value = os.environ[source]
+    try:
+        if source == "GOOGLE_CREDENTIALS":
+            return service_account.Credentials.from_service_account_info(
+                json.loads(value)
+            )
+        return service_account.Credentials.from_service_account_file(value)
+    except (OSError, ValueError) as exc:
+        raise ImproperlyConfigured(
+            f"Could not load Google Cloud credentials from {source}: {exc}"
+        ) from exc
+
+
+class LazyCredentialsMixin:
+    """Load credentials when the client is first needed.
+
+    Settings no longer parse them at import time, so every process that
+    never touches the bucket skips the Google auth imports entirely.
+    """
+
+    @property
+    def client(self):
+        if self._client is None and self.credentials is None:
+            self.credentials = load_credentials()
+        return super().client
+
+
+class LocalURLMixin:
+    """Build object URLs without creating a GCS client or blob.
+
+    Public URLs are a pure function of the bucket and the object name,
+    so they are formatted locally. Signed URLs still need the client to
+    sign them and are reused for half of their lifetime. Both kinds are
+    memoized in LRU caches, since pages keep asking for the same images.
+    """
+
+    url_cache_size = 4096
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cached_public_url = lru_cache(maxsize=self.url_cache_size)(
+            self._public_url
+        )
+        self._cached_signed_url = lru_cache(maxsize=self.url_cache_size)(
+            self._signed_url
+        )
+
+    @property
+    def public_base_url(self):
+        if self.custom_endpoint:
+            return self.custom_endpoint.rstrip("/")
+        return f"{PUBLIC_HOST}/{self.bucket_name}"
+
+    def url(self, name, parameters=None):
+        if self.is_public(name):
+            return self._cached_public_url(name)
+        if parameters:
+            return super().url(name, parameters)
+        return self._cached_signed_url(name, self._signing_window())
+
+    def clear_url_cache(self):
+        """Forget every memoized URL."""
+        self._cached_public_url.cache_clear()
+        self._cached_signed_url.cache_clear()
+
+    def is_public(self, name):
+        """Whether ``name`` is served without a signature."""
+        if not self.querystring_auth:
+            return True
+        params = self.get_object_parameters(name)
+        return params.get("acl", self.default_acl) == "publicRead"
+
+    def _public_url(self, name):
+        full_name = self._normalize_name(clean_name(name))
+        return f"{self.public_base_url}/{quote(full_name, safe='/~')}"
+
+    def _signing_window(self):
+        # A URL signed anywhere in a window stays valid for at least
+        # half the expiration after the window ends.
+        half_life = max(1, int(self.expiration.total_seconds() // 2))
+        return int(time.time() // half_life)
+
+    def _signed_url(self, name, window):
+        return super().url(name)
+
+
+class StagedUploadMixin:
+    """Stage saved files on local disk and upload them in the background.
+
+    ``_save`` only writes the file under ``GS_STAGING_ROOT`` and hands it
+    to a thread pool, which pushes it to the bucket as a chunked,
+    resumable upload, trying up to ``GS_UPLOAD_ATTEMPTS`` times. Until
+    then reads in this process are served from the staged copy. A staged
+    file is removed once uploaded, so anything a failure or crash leaves
+    behind is picked up again by ``resume_uploads``, which the web and
+    job workers run when they start; both flush pending uploads before
+    they exit (see gunicorn.conf.py and ``run_jobs``).
+
+    Other processes, such as the job worker on another dyno, only see a
+    file once it is in the bucket; see ``rooms.images.wait_for_upload``.
+    """
 
-class GoogleCloudMediaFileStorage(GoogleCloudStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.staging_root = setting("GS_STAGING_ROOT")
+        self.upload_workers = setting("GS_UPLOAD_WORKERS", 4)
+        self.upload_attempts = setting("GS_UPLOAD_ATTEMPTS", 3)
+        self._executor = None
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.upload_workers,
+                    thread_name_prefix="media-upload",
+                )
+            return self._executor
+
+    def staged_path(self, name):
+        full_name = self._normalize_name(clean_name(name))
+        return os.path.join(self.staging_root, *full_name.split("/"))
+
+    def _save(self, name, content):
+        name = clean_name(name)
+        path = self.staged_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if hasattr(content, "seek"):
+            content.seek(0)
+        partial = f"{path}.part"
+        with open(partial, "wb") as staged:
+            for chunk in content.chunks():
+                staged.write(chunk)
+        os.replace(partial, path)
+        self._submit(name)
+        return name
+
+    def _submit(self, name):
+        future = self.executor.submit(self._upload, name)
+        with self._lock:
+            self._pending[name] = future
+
+        def forget(done):
+            with self._lock:
+                if self._pending.get(name) is done:
+                    del self._pending[name]
+
+        future.add_done_callback(forget)
+        return future
+
+    def _upload(self, name):
+        for attempt in range(1, self.upload_attempts + 1):
+            try:
+                return self._upload_once(name)
+            except Exception:
+                if attempt == self.upload_attempts:
+                    logger.exception(
+                        "Upload of %s failed; it stays staged", name
+                    )
+                    raise
+                logger.warning(
+                    "Upload of %s failed, attempt %d", name, attempt,
+                    exc_info=True,
+                )
+                time.sleep(2 ** attempt)
+
+    def _upload_once(self, name):
+        path = self.staged_path(name)
+        if not os.path.isfile(path):
+            # Another worker resumed and finished this upload already.
+            return
+        full_name = self._normalize_name(name)
+        params = self.get_object_parameters(full_name)
+        content_type = params.pop("content_type", mimetypes.guess_type(name)[0])
+        acl = params.pop("acl", self.default_acl)
+        blob = self.bucket.blob(full_name, chunk_size=self.blob_chunk_size)
+        for prop, value in params.items():
+            setattr(blob, prop, value)
+        # With a chunk size the client uses a resumable session and
+        # retries failed chunks instead of the whole file.
+        blob.upload_from_filename(
+            path,
+            content_type=content_type,
+            predefined_acl=acl,
+            retry=DEFAULT_RETRY,
+        )
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def is_staged(self, name):
+        """Whether ``name`` is still waiting on this disk for its upload."""
+        return os.path.isfile(self.staged_path(name))
+
+    def flush(self, names=None):
+        """Block until pending uploads (of ``names``, or all) finish."""
+        with self._lock:
+            futures = [
+                future
+                for name, future in self._pending.items()
+                if names is None or name in names
+            ]
+        wait(futures)
+
+    def resume_uploads(self):
+        """Queue every staged file that is not uploading already."""
+        with self._lock:
+            pending = set(self._pending)
+        resumed = []
+        location = self._normalize_name("")
+        root = os.path.join(self.staging_root, *location.split("/"))
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith(".part"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                if name not in pending:
+                    self._submit(name)
+                    resumed.append(name)
+        return resumed
+
+    def _open(self, name, mode="rb"):
+        if "r" in mode:
+            try:
+                return File(open(self.staged_path(name), mode), name=name)
+            except FileNotFoundError:
+                pass
+        return super()._open(name, mode)
+
+    def exists(self, name):
+        if name and os.path.isfile(self.staged_path(name)):
+            return True
+        return super().exists(name)
+
+    def size(self, name):
+        path = self.staged_path(name)
+        if os.path.isfile(path):
+            return os.path.getsize(path)
+        return super().size(name)
+
+    def _discard_staged(self, names):
+        self.flush(names)
+        for name in names:
+            try:
+                os.remove(self.staged_path(name))
+            except FileNotFoundError:
+                pass
+
+    def delete(self, name):
+        self.delete_many([name])
+
+    def delete_many(self, names):
+        """Delete files with batched requests, ignoring missing ones."""
+        names = [clean_name(name) for name in names if name]
+        self._discard_staged(names)
+        for offset in range(0, len(names), DELETE_BATCH_SIZE):
+            batch = names[offset:offset + DELETE_BATCH_SIZE]
+            # Missing objects are fine: they were never uploaded or a
+            # previous cleanup got to them first.
+            with self.client.batch(raise_exception=False):
+                for name in batch:
+                    self.bucket.delete_blob(self._normalize_name(name))
+
+
+class GoogleCloudMediaFileStorage(
+    StagedUploadMixin, LocalURLMixin, LazyCredentialsMixin, GoogleCloudStorage
+):
     """Google Cloud Storage class for media files."""
-    
+
     def __init__(self, *args, **kwargs):
         kwargs.update({"location": "media"})
         # Remove default_acl for uniform bucket-level access
         super().__init__(*args, **kwargs)
 
-class GoogleCloudStaticFileStorage(GoogleCloudStorage):
+
+class GoogleCloudStaticFileStorage(
+    LocalURLMixin, LazyCredentialsMixin, GoogleCloudStorage
+):
     """Google Cloud Storage class for static files."""
-    
+
     def __init__(self, *args, **kwargs):
         kwargs.update({"location": "static"})
         # No default_acl for uniform bucket-level access
         super().__init__(*args, **kwargs)
+
+
+class LocalBucketMediaStorage(GoogleCloudMediaFileStorage):
+    """Media storage against a local directory standing in for a bucket.
+
+    Runs the same staged upload and batched delete code as production
+    without network access or credentials.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("bucket_name", "local-bucket")
+        kwargs.setdefault("querystring_auth", False)
+        super().__init__(*args, **kwargs)
+        self._client = LocalClient(setting("GS_LOCAL_BUCKET_ROOT"))
@@ -0,0 +1,50 @@
+from .images import (
+    build_derivatives,
+    delete_derivatives,
+    delete_files,
+    derivative_names,
+    wait_for_upload,
+)
+from .jobs import register
+from .mail import MailDispatcher, build_message
+from .models import RoomImage
+from .similarity import refresh_similarities
+
+
+@register("send_email", batch=True)
+def send_emails(payloads):
+    """Send queued emails in batches over reused connections."""
+    report = MailDispatcher().send([build_message(p) for p in payloads])
+    return report.errors
+
+
+@register("build_image_derivatives")
+def build_image_derivatives(image_id, image_name, force=False):
+    """Render the resized copies of an uploaded room image."""
+    image = RoomImage.objects.filter(pk=image_id, image=image_name).first()
+    if image is None or not (force or image.needs_derivatives):
+        # Deleted, replaced by a newer upload, or already processed.
+        return
+    # The upload may still be running on the web dyno that saved it.
+    wait_for_upload([image_name])
+    stale = image.derivatives
+    image.derivatives = build_derivatives(image_name)
+    # Only point the row at copies that reached the bucket; otherwise
+    # the job is retried and renders them again.
+    wait_for_upload(derivative_names(image.derivatives))
+    image.save(update_fields=["derivatives"])
+    delete_derivatives(stale, keep=image.derivatives)
+
+
+@register("delete_media", batch=True)
+def delete_media(payloads):
+    """Delete the files of removed images in one batched call."""
+    delete_files(name for payload in payloads for name in payload["names"])
+    return [None] * len(payloads)
+
+
+@register("refresh_room_similarity", batch=True)
+def refresh_room_similarity(payloads):
+    """Update similar-room lists affected by changed rooms."""
+    refresh_similarities({payload["room_id"] for payload in payloads})
+    return [None] * len(payloads)
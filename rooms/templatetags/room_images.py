@@ -0,0 +1,52 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.forms.utils import flatatt
+from django.utils.html import format_html
+
+register = template.Library()
+
+# Layout widths of a room card: full width on phones, then two and
+# three cards per row.
+CARD_SIZES = "(max-width: 576px) 100vw, (max-width: 992px) 50vw, 33vw"
+
+# Preferred width of the plain ``src`` for browsers without srcset.
+FALLBACK_WIDTH = 1024
+
+
+def _widths(image, ext):
+    return sorted(
+        (int(width), name)
+        for width, name in image.derivatives.get(ext, {}).items()
+    )
+
+
+def _srcset(widths):
+    return ", ".join(
+        f"{default_storage.url(name)} {width}w" for width, name in widths
+    )
+
+
+@register.simple_tag
+def responsive_image(image, sizes=CARD_SIZES, **attrs):
+    """Render a room image with WebP and JPEG ``srcset`` candidates.
+
+    Extra keyword arguments become ``<img>`` attributes. Images whose
+    derivatives are not built yet fall back to the original file.
+    """
+    attrs.setdefault("loading", "lazy")
+    jpeg = _widths(image, "jpg")
+    if not jpeg:
+        return format_html('<img src="{}"{}>', image.image_url or "", flatatt(attrs))
+
+    fallback = [name for width, name in jpeg if width <= FALLBACK_WIDTH]
+    src = default_storage.url(fallback[-1] if fallback else jpeg[0][1])
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}"{}></picture>',
+        _srcset(_widths(image, "webp")),
+        sizes,
+        src,
+        _srcset(jpeg),
+        sizes,
+        flatatt(attrs),
+    )
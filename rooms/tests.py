@@ -1,11 +1,58 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import IntegrityError, connection
+from django.http import HttpResponse
+from django.core.cache import cache
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.urls import reverse
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from decimal import Decimal
 from datetime import timedelta
-from rooms.models import Room, Booking
+from io import BytesIO, StringIO, TextIOWrapper
+from unittest.mock import patch
+import gzip
+import json
+import os
+import numpy as np
+import subprocess
+import sys
+import tempfile
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template import Context, Template
+from rooms.availability import is_room_available
+from rooms.benchmarks import compare, profile
+from rooms.cache import page_cache_stats
+from rooms.checks import check_shared_cache
+from rooms.pagination import EstimatedCountPaginator, KeysetPaginator
+from rooms.search import filter_rooms, room_facets
+from rooms.similarity import rebuild_similarities, refresh_similarities
+from rooms.images import wait_for_upload
+from rooms.importer import sweep
+from rooms.jobs import enqueue, run_jobs
+from rooms.mail import MailDispatcher
+from rooms.middleware import ServerTimingMiddleware
+from rooms.occupancy import expand_stays, occupancy_report, rebuild_occupancy
+from rooms.services import create_booking
+from rooms.models import (
+    Room, Booking, DailyOccupancy, Job, RoomImage, RoomNight, RoomSimilarity
+)
 from rooms.forms import BookingForm
+from rooms.management.commands.startup_profile import parse_importtime
+from rooms.local_bucket import LocalBlob
+from rooms.storage import (
+    GoogleCloudMediaFileStorage, LocalBucketMediaStorage, load_credentials
+)
+from google.auth.credentials import AnonymousCredentials
+from prometheus_client import REGISTRY
+from storages.backends.gcloud import GoogleCloudStorage
 
 
 class ViewTests(TestCase):
@@ -158,3 +205,1628 @@ class BookingManagementTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertRedirects(response, reverse("user_bookings"))
         self.assertFalse(Booking.objects.filter(id=booking_id).exists())
+
+
+class RoomNightIndexTests(TestCase):
+    """Test cases for the room-night occupancy index."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.room = Room.objects.create(
+            name="Test Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.check_in = timezone.now().date() + timedelta(days=5)
+        self.booking = Booking.objects.create(
+            room=self.room,
+            guest_name="Test Guest",
+            email="test@example.com",
+            check_in_date=self.check_in,
+            check_out_date=self.check_in + timedelta(days=3),
+            total_price=Decimal("300.00"),
+            status="CONFIRMED",
+        )
+
+    def test_booking_save_indexes_nights(self):
+        """Test that saving a booking records one row per night."""
+        nights = RoomNight.objects.filter(booking=self.booking)
+        self.assertEqual(
+            sorted(nights.values_list("night", flat=True)),
+            self.booking.nights,
+        )
+
+        self.booking.check_out_date = self.check_in + timedelta(days=1)
+        self.booking.save()
+        self.assertEqual(nights.count(), 1)
+
+        self.booking.status = "CANCELLED"
+        self.booking.save()
+        self.assertFalse(nights.exists())
+
+    def test_availability_uses_index(self):
+        """Test availability lookups against the index."""
+        self.assertFalse(
+            is_room_available(
+                self.room, self.check_in + timedelta(days=2),
+                self.check_in + timedelta(days=4)
+            )
+        )
+        self.assertTrue(
+            is_room_available(
+                self.room, self.check_in + timedelta(days=3),
+                self.check_in + timedelta(days=4)
+            )
+        )
+        self.assertTrue(
+            is_room_available(
+                self.room, self.check_in, self.check_in + timedelta(days=1),
+                exclude_booking_id=self.booking.id
+            )
+        )
+        self.assertFalse(
+            Room.objects.available_between(
+                self.check_in, self.check_in + timedelta(days=1)
+            ).exists()
+        )
+
+    def test_rebuild_and_verify_command(self):
+        """Test the management command that rebuilds the index."""
+        RoomNight.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("rebuild_room_nights", "--verify", stdout=StringIO())
+
+        call_command("rebuild_room_nights", stdout=StringIO())
+        self.assertEqual(RoomNight.objects.count(), 3)
+        call_command("rebuild_room_nights", "--verify", stdout=StringIO())
+
+    def test_availability_matrix_view(self):
+        """Test the bulk availability grid endpoint."""
+        Room.objects.create(
+            name="Other Room", price=Decimal("80.00"), room_type="DLX"
+        )
+        url = reverse("availability_matrix")
+        params = {"start": self.check_in - timedelta(days=1), "days": 10}
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params)
+        data = response.json()
+        self.assertEqual(data["days"], 10)
+        self.assertEqual(len(data["rooms"]), 2)
+        # Nights 1-3 of the window are booked: 0b01110000.
+        self.assertEqual(data["rooms"][0]["occupied"], "cAA=")
+
+        response = self.client.get(
+            url, {**params, "encoding": "runs", "room_type": "STD"}
+        )
+        self.assertEqual(response.json()["rooms"][0]["occupied"], [[1, 3]])
+
+        response = self.client.get(url, {**params, "days": 400})
+        self.assertEqual(response.status_code, 400)
+
+    def test_database_rejects_overlap_without_precheck(self):
+        """Test that a racing booking is refused by the database."""
+        with patch.object(Booking, "clean"):
+            with self.assertRaises(ValidationError):
+                Booking.objects.create(
+                    room=self.room,
+                    guest_name="Racing Guest",
+                    email="race@example.com",
+                    check_in_date=self.check_in + timedelta(days=2),
+                    check_out_date=self.check_in + timedelta(days=4),
+                    total_price=Decimal("200.00"),
+                    status="CONFIRMED",
+                )
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(RoomNight.objects.count(), 3)
+
+    def test_other_integrity_errors_are_not_overlaps(self):
+        """Test that only overlap violations become a booking conflict."""
+        booking = Booking(
+            room=self.room, guest_name=None, email="null@example.com",
+            check_in_date=self.check_in + timedelta(days=10),
+            check_out_date=self.check_in + timedelta(days=11),
+            total_price=Decimal("100.00"), status="CONFIRMED",
+        )
+        with self.assertRaises(IntegrityError):
+            booking.save(validate=False)
+        self.assertIsNone(booking.pk)
+
+
+class BookingServiceTests(TestCase):
+    """Test cases pinning the query count of each booking flow."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com", password="testpass123"
+        )
+        self.room = Room.objects.create(
+            name="Test Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.check_in = timezone.now().date() + timedelta(days=5)
+        self.client.force_login(self.user)
+
+    def booking_data(self, nights=2):
+        """Return POST data for a stay starting at ``self.check_in``."""
+        return {
+            "guest_name": "Test Guest",
+            "email": "test@example.com",
+            "phone_number": "+1234567890",
+            "check_in_date": self.check_in,
+            "check_out_date": self.check_in + timedelta(days=nights),
+        }
+
+    def test_book_room_query_count(self):
+        """Test that booking runs no availability pre-check query."""
+        url = reverse("book_room", args=[self.room.id])
+        # session, user, room, booking insert, nights insert, occupancy
+        # insert and update and the queued email, plus the savepoints of
+        # both transactions
+        with self.assertNumQueries(12):
+            response = self.client.post(url, self.booking_data())
+        self.assertEqual(response.status_code, 302)
+        booking = Booking.objects.get()
+        self.assertEqual(booking.total_price, Decimal("200.00"))
+        self.assertEqual(booking.status, "CONFIRMED")
+
+    def test_book_room_conflict_is_form_error(self):
+        """Test that an overlapping booking is reported on the form."""
+        url = reverse("book_room", args=[self.room.id])
+        self.client.post(url, self.booking_data())
+        response = self.client.post(url, self.booking_data(nights=3))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "Room is already booked for these dates",
+            response.context["form"].non_field_errors(),
+        )
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_edit_booking_query_count(self):
+        """Test that editing checks overlap exactly once."""
+        self.client.post(
+            reverse("book_room", args=[self.room.id]), self.booking_data()
+        )
+        booking = Booking.objects.get()
+        data = {
+            "check_in_date": self.check_in,
+            "check_out_date": self.check_in + timedelta(days=4),
+            "status": "CONFIRMED",
+        }
+        # session, user, booking, one overlap check, update, nights
+        # delete and insert, occupancy insert and update for the added
+        # nights, plus the savepoints of both transactions
+        with self.assertNumQueries(13):
+            self.client.post(
+                reverse("edit_booking", args=[booking.id]), data
+            )
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_price, Decimal("400.00"))
+        self.assertEqual(booking.room_nights.count(), 4)
+
+
+class FacetedSearchTests(TestCase):
+    """Test cases for room search facets."""
+
+    def setUp(self):
+        """Set up rooms of different types, prices and sizes."""
+        specs = [
+            ("STD", "80.00", 2, 250),
+            ("STD", "95.00", 2, 300),
+            ("DLX", "160.00", 3, 420),
+            ("SUI", "320.00", 4, 800),
+        ]
+        self.rooms = [
+            Room.objects.create(
+                name=f"Room {i}", price=Decimal(price), room_type=room_type,
+                max_occupancy=occupancy, size=size, available=True
+            )
+            for i, (room_type, price, occupancy, size) in enumerate(specs)
+        ]
+        user = get_user_model().objects.create_user(
+            username="guest", email="guest@example.com", password="pass1234"
+        )
+        today = timezone.now().date()
+        Booking.objects.create(
+            room=self.rooms[3], user=user, guest_name="Guest",
+            email="guest@example.com", check_in_date=today,
+            check_out_date=today + timedelta(days=2),
+            total_price=Decimal("640.00"), status="CONFIRMED"
+        )
+        self.stay = {
+            "check_in": str(today),
+            "check_out": str(today + timedelta(days=1)),
+        }
+
+    def test_facets_come_from_one_query(self):
+        """Test that all facets are counted with a single query."""
+        rooms, _ = filter_rooms({"max_price": "200"})
+        with self.assertNumQueries(1):
+            facets = room_facets(rooms)
+        self.assertEqual(facets["total"], 3)
+        self.assertEqual(
+            [(f["value"], f["count"]) for f in facets["room_type"]],
+            [("STD", 2), ("DLX", 1), ("SUI", 0)],
+        )
+        self.assertEqual(
+            facets["price"],
+            [
+                {"min": 50, "max": 100, "count": 2},
+                {"min": 150, "max": 200, "count": 1},
+            ],
+        )
+        self.assertEqual(
+            facets["max_occupancy"],
+            [{"value": 2, "count": 2}, {"value": 3, "count": 1}],
+        )
+        self.assertEqual([f["min"] for f in facets["size"]], [200, 300, 400])
+
+    def test_json_endpoint_excludes_booked_rooms(self):
+        """Test that the JSON search counts only rooms free for the stay."""
+        response = self.client.get(reverse("search_rooms_json"), self.stay)
+        data = response.json()
+        self.assertEqual(data["count"], 3)
+        self.assertEqual(
+            [room["id"] for room in data["rooms"]],
+            [room.id for room in self.rooms[:3]],
+        )
+        suite = data["facets"]["room_type"][2]
+        self.assertEqual((suite["value"], suite["count"]), ("SUI", 0))
+
+    def test_impossible_dates_are_ignored(self):
+        """Test that a date like February 30th drops the stay filter."""
+        response = self.client.get(
+            reverse("search_rooms_json"),
+            {"check_in": "2030-02-30", "check_out": "2030-03-02"},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 4)
+
+    def test_search_page_shows_type_counts(self):
+        """Test that the search page renders with per-type counts."""
+        response = self.client.get(
+            reverse("search_rooms"), {"room_type": "STD"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Standard (2)")
+        self.assertNotContains(response, "Room 2")
+
+
+class RoomSimilarityTests(TestCase):
+    """Test cases for precomputed similar rooms."""
+
+    def setUp(self):
+        """Set up two clusters of similar rooms."""
+        specs = [
+            ("STD", "100.00", 250),
+            ("STD", "110.00", 260),
+            ("STD", "95.00", 240),
+            ("SUI", "400.00", 800),
+            ("SUI", "420.00", 820),
+            ("SUI", "380.00", 780),
+        ]
+        self.rooms = [
+            Room.objects.create(
+                name=f"Room {i}", price=Decimal(price), room_type=room_type,
+                size=size, available=True
+            )
+            for i, (room_type, price, size) in enumerate(specs)
+        ]
+        Job.objects.all().delete()
+        rebuild_similarities(k=2)
+
+    def neighbours(self, room):
+        return list(
+            RoomSimilarity.objects.filter(room=room).values_list(
+                "similar_room", flat=True
+            )
+        )
+
+    def test_rebuild_ranks_closest_rooms_first(self):
+        """Test that neighbours are ordered by feature distance."""
+        self.assertEqual(
+            self.neighbours(self.rooms[0]),
+            [self.rooms[2].pk, self.rooms[1].pk],
+        )
+        self.assertEqual(self.neighbours(self.rooms[3])[0], self.rooms[4].pk)
+
+    def test_refresh_only_recomputes_affected_rooms(self):
+        """Test that a room change updates just the lists it touches."""
+        room = self.rooms[2]
+        room.price = Decimal("104.00")
+        room.save()
+        recomputed = refresh_similarities([room.pk], k=2)
+        self.assertEqual(recomputed, 3)
+        incremental = {r.pk: self.neighbours(r) for r in self.rooms}
+        rebuild_similarities(k=2)
+        self.assertEqual(
+            incremental, {r.pk: self.neighbours(r) for r in self.rooms}
+        )
+        self.assertEqual(self.neighbours(self.rooms[0])[0], room.pk)
+
+    def test_room_detail_shows_precomputed_rooms(self):
+        """Test that the detail page lists the stored neighbours."""
+        run_jobs()
+        response = self.client.get(
+            reverse("room_detail", args=[self.rooms[3].pk])
+        )
+        self.assertEqual(
+            [room.pk for room in response.context["similar_rooms"]],
+            self.neighbours(self.rooms[3])[:3],
+        )
+
+
+class KeysetPaginationTests(TestCase):
+    """Test cases for cursor pagination of listings."""
+
+    def setUp(self):
+        """Set up rooms sharing a few prices, so ties need the id."""
+        for i in range(25):
+            Room.objects.create(
+                name=f"Room {i}", price=Decimal(100 + (i % 5) * 10),
+                room_type="STD", available=True
+            )
+        self.ordered = list(
+            Room.objects.order_by("price", "id").values_list("id", flat=True)
+        )
+
+    def test_walks_forward_and_back(self):
+        """Test that cursors visit every room once, in both directions."""
+        paginator = KeysetPaginator(Room.objects.all(), ["price", "id"], 10)
+        seen, page, pages = [], paginator.page(), []
+        while True:
+            pages.append(page)
+            seen.extend(room.id for room in page)
+            if not page.has_next:
+                break
+            page = paginator.page(page.next_cursor)
+        self.assertEqual(seen, self.ordered)
+        self.assertEqual(len(pages), 3)
+
+        back = paginator.page(pages[2].previous_cursor)
+        self.assertEqual([r.id for r in back], [r.id for r in pages[1]])
+        self.assertTrue(back.has_next)
+
+    def test_deep_page_is_one_query(self):
+        """Test that any page costs a single query."""
+        paginator = KeysetPaginator(Room.objects.all(), ["price", "id"], 5)
+        cursor = paginator.page().next_cursor
+        for _ in range(3):
+            cursor = paginator.page(cursor).next_cursor
+        with self.assertNumQueries(1):
+            page = paginator.page(cursor)
+        self.assertEqual([r.id for r in page], self.ordered[20:25])
+
+    def test_json_cursor_pages(self):
+        """Test that the JSON search returns cursors and rejects forged ones."""
+        url = reverse("search_rooms_json")
+        first = self.client.get(url, {"limit": 20}).json()
+        second = self.client.get(
+            url, {"limit": 20, "cursor": first["next"]}
+        ).json()
+        self.assertEqual(
+            [r["id"] for r in first["rooms"] + second["rooms"]], self.ordered
+        )
+        self.assertIsNone(second["next"])
+        response = self.client.get(url, {"cursor": first["next"] + "x"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_bookings_pages_past_stays(self):
+        """Test that long booking histories are paged newest first."""
+        user = get_user_model().objects.create_user(
+            username="regular", email="regular@example.com",
+            password="pass1234"
+        )
+        room = Room.objects.first()
+        today = timezone.now().date()
+        Booking.objects.bulk_create(
+            Booking(
+                room=room, user=user, guest_name="Regular",
+                email="regular@example.com",
+                check_in_date=today - timedelta(days=2 * i + 2),
+                check_out_date=today - timedelta(days=2 * i + 1),
+                total_price=Decimal("100.00"), status="CONFIRMED"
+            )
+            for i in range(30)
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse("user_bookings"))
+        page = response.context["past_bookings"]
+        self.assertEqual(response.context["past_count"], 30)
+        self.assertEqual(len(page), 24)
+        self.assertEqual(page.items[0].check_in_date, today - timedelta(days=2))
+
+        response = self.client.get(page.next_url)
+        self.assertEqual(len(response.context["past_bookings"]), 6)
+
+
+class BookingAdminTests(TestCase):
+    """Test cases for the Booking admin changelist on large tables."""
+
+    def setUp(self):
+        """Set up a few rooms with bookings and log in as staff."""
+        self.rooms = [
+            Room.objects.create(
+                name=f"Room {i}", price=Decimal("100.00"),
+                room_type="STD", available=True
+            )
+            for i in range(3)
+        ]
+        today = timezone.now().date()
+        Booking.objects.bulk_create(
+            Booking(
+                room=self.rooms[i % 3], guest_name=f"Guest {i}",
+                email=f"guest{i}@example.com",
+                check_in_date=today + timedelta(days=i),
+                check_out_date=today + timedelta(days=i + 1),
+                total_price=Decimal("100.00"), status="CONFIRMED"
+            )
+            for i in range(12)
+        )
+        admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass1234"
+        )
+        self.client.force_login(admin)
+        self.url = reverse("admin:rooms_booking_changelist")
+
+    def test_count_is_capped(self):
+        """Test that filtered counts stop at the cap."""
+        paginator = EstimatedCountPaginator(Booking.objects.all(), 5)
+        paginator.count_cap = 10
+        self.assertEqual(paginator.count, 10)
+        paginator = EstimatedCountPaginator(
+            Booking.objects.filter(room=self.rooms[0]), 5
+        )
+        self.assertEqual(paginator.count, 4)
+
+    def test_room_filter_loads_only_the_selected_room(self):
+        """Test that the room filter renders one option, not every room."""
+        response = self.client.get(
+            self.url, {"room__id__exact": self.rooms[1].pk}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["cl"].result_count, 4)
+        self.assertContains(response, "autocomplete-filter")
+        self.assertContains(response, "<option value=\"%d\" selected>"
+                            % self.rooms[1].pk)
+        self.assertNotContains(response, f"room__id__exact={self.rooms[2].pk}")
+
+    def test_search_matches_prefixes(self):
+        """Test that guest search matches from the start of the name."""
+        response = self.client.get(self.url, {"q": '"Guest 1"'})
+        names = {b.guest_name for b in response.context["cl"].result_list}
+        self.assertEqual(names, {"Guest 1", "Guest 10", "Guest 11"})
+        response = self.client.get(self.url, {"q": "uest"})
+        self.assertEqual(response.context["cl"].result_count, 0)
+
+
+class RoomImagePrefetchTests(TestCase):
+    """Test cases for loading room images without N+1 queries."""
+
+    def setUp(self):
+        """Set up rooms with a few images each."""
+        for i in range(5):
+            room = Room.objects.create(
+                name=f"Room {i}", price=Decimal("100.00"),
+                room_type="STD", available=True
+            )
+            for j in range(2):
+                RoomImage.objects.create(
+                    room=room, image=f"room_images/room-{i}-{j}.jpg"
+                )
+
+    def test_room_list_prefetches_images(self):
+        """Test that the room list loads every image in one query."""
+        # facet counts, rooms, then their images
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse("room_list"))
+        self.assertContains(response, "room-4-0.jpg")
+
+    def test_primary_image_uses_prefetch(self):
+        """Test that primary_image reads the prefetched images."""
+        rooms = list(Room.objects.with_images())
+        with self.assertNumQueries(0):
+            names = [room.primary_image.image.name for room in rooms]
+        self.assertEqual(names[0], "room_images/room-0-0.jpg")
+
+
+class RoomImageOrderTests(TestCase):
+    """Test cases for gap-based room image ordering."""
+
+    def setUp(self):
+        """Set up a room with three images."""
+        self.room = Room.objects.create(
+            name="Gallery Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.images = [
+            RoomImage.objects.create(
+                room=self.room, image=f"room_images/gallery-{i}.jpg"
+            )
+            for i in range(3)
+        ]
+
+    def test_save_leaves_siblings_untouched(self):
+        """Test that adding an image writes only its own row."""
+        # max(order), insert, touch room, queue derivatives job
+        with self.assertNumQueries(4):
+            RoomImage.objects.create(
+                room=self.room, image="room_images/gallery-3.jpg"
+            )
+        orders = list(self.room.images.values_list("order", flat=True))
+        self.assertEqual(orders, [1024, 2048, 3072, 4096])
+
+    def test_set_as_primary_moves_one_row(self):
+        """Test that set_as_primary moves the image to the front."""
+        last = self.images[-1]
+        last.set_as_primary()
+        self.assertEqual(self.room.images.first(), last)
+        self.assertEqual(
+            list(self.room.images.values_list("order", flat=True)),
+            [512, 1024, 2048],
+        )
+
+    def test_reorder_uses_one_bulk_update(self):
+        """Test that reorder writes the new order in a single update."""
+        first, second, third = self.images
+        # load images, bulk update, touch room
+        with self.assertNumQueries(3):
+            RoomImage.reorder(self.room, [third.pk, first.pk, second.pk])
+        self.assertEqual(list(self.room.images.all()), [third, first, second])
+
+    def test_admin_reorder_endpoint(self):
+        """Test that staff can reorder images from the room admin."""
+        admin = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass1234"
+        )
+        self.client.force_login(admin)
+        ids = [image.pk for image in reversed(self.images)]
+        response = self.client.post(
+            reverse("admin:rooms_room_reorder_images", args=[self.room.pk]),
+            data={"ids": ids},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(self.room.images.values_list("id", flat=True)), ids
+        )
+
+
+class ImageDerivativeTests(TestCase):
+    """Test cases for resized WebP and JPEG copies of room images."""
+
+    def setUp(self):
+        """Set up a room and a throwaway media root."""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.room = Room.objects.create(
+            name="Photo Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+
+    def upload(self, width=1200, height=800):
+        buffer = BytesIO()
+        Image.new("RGB", (width, height), "navy").save(buffer, "JPEG")
+        image = RoomImage(room=self.room)
+        image.image.save("photo.jpg", ContentFile(buffer.getvalue()))
+        return image
+
+    def test_upload_queues_derivatives_job(self):
+        """Test that saving an image defers resizing to the job queue."""
+        image = self.upload()
+        job = Job.objects.get(name="build_image_derivatives")
+        self.assertEqual(job.payload["image_id"], image.pk)
+        self.assertEqual(image.derivatives, {})
+
+    def test_job_builds_webp_and_jpeg_sizes(self):
+        """Test that the job stores every size below the original."""
+        image = self.upload()
+        run_jobs()
+        image.refresh_from_db()
+        self.assertEqual(image.derivatives["source"], image.image.name)
+        widths = ["1024", "1200", "320", "640"]
+        self.assertEqual(sorted(image.derivatives["webp"]), widths)
+        self.assertEqual(sorted(image.derivatives["jpg"]), widths)
+        name = image.derivatives["webp"]["320"]
+        with default_storage.open(name) as stored:
+            self.assertEqual(Image.open(stored).size, (320, 213))
+        self.assertFalse(Job.objects.filter(status="PENDING").exists())
+
+    def test_responsive_image_tag(self):
+        """Test that the tag emits srcsets once derivatives exist."""
+        template = Template(
+            '{% load room_images %}{% responsive_image image alt="Room" %}'
+        )
+        image = self.upload()
+        html = template.render(Context({"image": image}))
+        self.assertNotIn("srcset", html)
+        self.assertIn("photo", html)
+
+        run_jobs()
+        image.refresh_from_db()
+        html = template.render(Context({"image": image}))
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn("-320w.jpg 320w", html)
+        self.assertIn('alt="Room"', html)
+
+
+class MediaURLTests(TestCase):
+    """Test cases for building GCS media URLs without the client."""
+
+    def storage(self, storage_class=GoogleCloudMediaFileStorage, **kwargs):
+        kwargs.setdefault("querystring_auth", False)
+        return storage_class(
+            bucket_name="hotel-media",
+            credentials=AnonymousCredentials(),
+            project_id="hotel",
+            **kwargs,
+        )
+
+    def test_public_urls_match_stock_backend(self):
+        """Test that local URLs equal the backend's, with no client."""
+        local = self.storage()
+        stock = self.storage(GoogleCloudStorage, location="media")
+        for name in ("room_images/a.jpg", "room_images/b c+ü~%.webp"):
+            self.assertEqual(local.url(name), stock.url(name))
+        self.assertIsNone(local._client)
+
+    def test_signed_urls_are_cached(self):
+        """Test that a signed URL is only generated once per window."""
+        storage = self.storage(querystring_auth=True)
+        with patch.object(
+            GoogleCloudStorage, "url", return_value="https://signed"
+        ) as sign:
+            for _ in range(3):
+                url = storage.url("room_images/a.jpg")
+        self.assertEqual(url, "https://signed")
+        sign.assert_called_once()
+        storage.clear_url_cache()
+        with patch.object(
+            GoogleCloudStorage, "url", return_value="https://signed"
+        ) as sign:
+            storage.url("room_images/a.jpg")
+        sign.assert_called_once()
+
+
+class ServerTimingTests(TestCase):
+    """Test cases for the per-request timing middleware."""
+
+    def setUp(self):
+        """Set up a room to list."""
+        Room.objects.create(
+            name="Timed Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+
+    def test_header_reports_queries_and_templates(self):
+        """Test that the header carries db, template and total timings."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("room_list"))
+        header = response["Server-Timing"]
+        self.assertIn(f'desc="{len(queries)} queries"', header)
+        for metric in ("db;dur=", "tpl;dur=", "storage;dur=", "total;dur="):
+            self.assertIn(metric, header)
+
+    def test_storage_calls_are_counted_once(self):
+        """Test that nested storage calls count as one call."""
+        def view(request):
+            default_storage.exists("missing.jpg")
+            default_storage.url("room_images/a.jpg")
+            return HttpResponse("ok")
+
+        middleware = ServerTimingMiddleware(view)
+        response = middleware(RequestFactory().get("/"))
+        self.assertIn('storage;dur=', response["Server-Timing"])
+        self.assertIn('desc="2 calls"', response["Server-Timing"])
+
+    @override_settings(SERVER_TIMING_SLOW_QUERIES=1)
+    def test_slow_requests_log_their_sql(self):
+        """Test that requests over a threshold are logged with SQL."""
+        with self.assertLogs("rooms.middleware", "WARNING") as logs:
+            self.client.get(reverse("room_list"))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertTrue(record["slow"])
+        self.assertEqual(record["view"], "room_list")
+        self.assertEqual(len(record["sql"]), record["db_queries"])
+        self.assertIn("rooms_room", record["sql"][0]["sql"])
+
+
+class MetricsTests(TestCase):
+    """Test cases for the Prometheus metrics endpoint."""
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_requests_are_recorded_per_url_name(self):
+        """Test that latency and query histograms are labelled by view."""
+        before = self.sample(
+            "hotel_request_duration_seconds_count",
+            view="room_list", method="GET",
+        )
+        self.client.get(reverse("room_list"))
+        staff = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass1234"
+        )
+        self.client.force_login(staff)
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            self.sample(
+                "hotel_request_duration_seconds_count",
+                view="room_list", method="GET",
+            ),
+            before + 1,
+        )
+        self.assertContains(
+            response, 'hotel_request_queries_count{view="room_list"}'
+        )
+
+    def test_booking_outcomes_are_counted(self):
+        """Test that confirmed and conflicting bookings are counted."""
+        user = get_user_model().objects.create_user(
+            username="guest", email="guest@example.com", password="pass1234"
+        )
+        room = Room.objects.create(
+            name="Metered Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        check_in = timezone.now().date() + timedelta(days=3)
+        labels = {"operation": "create"}
+        success = self.sample("hotel_bookings_total", outcome="success", **labels)
+        conflict = self.sample(
+            "hotel_bookings_total", outcome="conflict", **labels
+        )
+        for _ in range(2):
+            booking = Booking(
+                guest_name="Guest", email="guest@example.com",
+                check_in_date=check_in,
+                check_out_date=check_in + timedelta(days=2),
+            )
+            try:
+                with self.captureOnCommitCallbacks(execute=True):
+                    create_booking(booking, room, user)
+            except ValidationError:
+                pass
+        self.assertEqual(
+            self.sample("hotel_bookings_total", outcome="success", **labels),
+            success + 1,
+        )
+        self.assertEqual(
+            self.sample("hotel_bookings_total", outcome="conflict", **labels),
+            conflict + 1,
+        )
+
+    def test_staff_only_without_token(self):
+        """Test that without a token only staff may read the metrics."""
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        with self.settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+    @override_settings(METRICS_TOKEN="scrape-me")
+    def test_token_is_required_when_set(self):
+        """Test that a configured token protects the endpoint."""
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        response = self.client.get(
+            "/metrics", HTTP_AUTHORIZATION="Bearer scrape-me"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "hotel_email_send_seconds")
+
+
+class BenchmarkTests(TestCase):
+    """Test cases for the benchmark helpers behind manage.py bench."""
+
+    def result(self, p95, queries, peak):
+        return {
+            "latency": {"p95_ms": p95}, "queries": queries, "peak_kib": peak
+        }
+
+    def test_profile_counts_queries_per_request(self):
+        """Test that queries are counted across the request signals."""
+        Room.objects.create(
+            name="Bench Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        result = profile(
+            lambda: self.client.get(reverse("room_list")), repeat=2, warmup=0
+        )
+        self.assertEqual(result["queries"], 3)
+        self.assertEqual(result["latency"]["samples"], 2)
+        self.assertGreater(result["peak_kib"], 0)
+
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        """Test that slower, hungrier or chattier scenarios are reported."""
+        baseline = {
+            "home": self.result(10.0, 2, 100.0),
+            "room_list": self.result(10.0, 3, 100.0),
+        }
+        results = {
+            "home": self.result(11.5, 2, 110.0),
+            "room_list": self.result(13.0, 4, 100.0),
+            "new_page": self.result(50.0, 9, 500.0),
+        }
+        regressions = compare(results, baseline, tolerance=0.2)
+        self.assertEqual(
+            regressions,
+            [
+                "room_list: p95 10.0 -> 13.0 (+30%)",
+                "room_list: queries 3 -> 4",
+            ],
+        )
+
+
+class ImportBookingsTests(TestCase):
+    """Test cases for the streaming booking import."""
+
+    def setUp(self):
+        """Set up two rooms, one with an existing booking."""
+        self.room = Room.objects.create(
+            name="Sea View", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.other = Room.objects.create(
+            name="Garden", price=Decimal("80.00"),
+            room_type="STD", available=True
+        )
+        self.day = timezone.now().date() + timedelta(days=30)
+        Booking.objects.create(
+            room=self.other, guest_name="Existing", email="e@example.com",
+            check_in_date=self.day, check_out_date=self.day + timedelta(days=3),
+            total_price=Decimal("240.00"), status="CONFIRMED"
+        )
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "w") as handle:
+            handle.write(text)
+        return path
+
+    def stay(self, start, nights):
+        check_in = self.day + timedelta(days=start)
+        return check_in, check_in + timedelta(days=nights)
+
+    def test_sweep_finds_overlaps(self):
+        """Test that the sweep keeps the earliest stays and fixed ones."""
+        intervals = [(1, 4, "a"), (3, 5, "b"), (4, 6, "c"), (10, 12, "d")]
+        self.assertEqual(sweep(intervals), {"b"})
+        self.assertEqual(sweep(intervals, fixed=[(11, 13)]), {"b", "d"})
+
+    def test_csv_import_rejects_conflicts_and_bad_rows(self):
+        """Test that valid rows are bulk inserted and the rest rejected."""
+        rows = [
+            ("Sea View", "", *self.stay(0, 2), "CONFIRMED"),
+            ("Sea View", "", *self.stay(1, 2), "CONFIRMED"),  # overlap
+            ("Sea View", "", *self.stay(1, 2), "CANCELLED"),
+            ("", self.room.pk, *self.stay(2, 3), "CONFIRMED"),
+            ("Garden", "", *self.stay(2, 2), "CONFIRMED"),  # existing
+            ("Garden", "", *self.stay(5, 2), "CONFIRMED"),
+            ("Nowhere", "", *self.stay(0, 1), "CONFIRMED"),
+            ("Garden", "", self.day, self.day, "CONFIRMED"),
+        ]
+        text = "room,room_id,guest_name,email,check_in_date,check_out_date," \
+            "status\n" + "".join(
+                f"{room},{room_id},Guest,g@example.com,{start},{end},"
+                f"{status}\n"
+                for room, room_id, start, end, status in rows
+            )
+        path = self.write("bookings.csv", text)
+        rejects = os.path.join(self.dir.name, "rejects.jsonl")
+        out = StringIO()
+        with self.assertNumQueries(19):
+            call_command(
+                "import_bookings", path, rejects=rejects,
+                batch_size=2, chunk_size=3, stdout=out
+            )
+        self.assertIn("Imported 4 of 8 bookings", out.getvalue())
+        self.assertEqual(
+            Booking.objects.filter(guest_name="Guest").count(), 4
+        )
+        self.assertEqual(RoomNight.objects.count(), 3 + 2 + 3 + 2)
+        self.assertEqual(
+            sum(DailyOccupancy.objects.values_list("nights_sold", flat=True)),
+            RoomNight.objects.count(),
+        )
+        with open(rejects) as handle:
+            reasons = {
+                entry["line"]: entry["reason"]
+                for entry in map(json.loads, handle)
+            }
+        self.assertEqual(
+            reasons,
+            {
+                3: "overlaps another booking",
+                6: "overlaps another booking",
+                8: "unknown room",
+                9: "check-out not after check-in",
+            },
+        )
+
+    def test_jsonl_dry_run_writes_nothing(self):
+        """Test that a dry run reports without inserting."""
+        check_in, check_out = self.stay(0, 2)
+        path = self.write(
+            "bookings.jsonl",
+            json.dumps({
+                "room_id": self.room.pk, "guest_name": "Guest",
+                "email": "g@example.com", "check_in_date": str(check_in),
+                "check_out_date": str(check_out),
+            }) + "\nnot json\n",
+        )
+        out = StringIO()
+        call_command("import_bookings", path, dry_run=True, stdout=out)
+        self.assertIn("Would import 1 of 2 bookings", out.getvalue())
+        self.assertIn("1 invalid rows", out.getvalue())
+        self.assertFalse(Booking.objects.filter(guest_name="Guest").exists())
+
+
+class ExportBookingsTests(TestCase):
+    """Test cases for the streaming booking export."""
+
+    def setUp(self):
+        """Set up bookings on consecutive days and log in as staff."""
+        room = Room.objects.create(
+            name="Sea View", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.day = timezone.now().date() + timedelta(days=30)
+        Booking.objects.bulk_create(
+            Booking(
+                room=room, guest_name=f"Guest {i}",
+                email=f"guest{i}@example.com",
+                check_in_date=self.day + timedelta(days=i),
+                check_out_date=self.day + timedelta(days=i + 1),
+                total_price=Decimal("100.00"),
+                status="CANCELLED" if i == 2 else "CONFIRMED"
+            )
+            for i in range(5)
+        )
+        staff = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass1234"
+        )
+        self.client.force_login(staff)
+        self.url = reverse("export_bookings")
+
+    def test_csv_export_streams_filtered_rows(self):
+        """Test that the CSV is streamed with only the matching rows."""
+        response = self.client.get(self.url, {
+            "from": str(self.day + timedelta(days=1)),
+            "to": str(self.day + timedelta(days=4)),
+            "status": "confirmed",
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("id,room_id,room_name,"))
+        self.assertEqual(
+            [line.split(",")[7] for line in lines[1:]], ["Guest 1", "Guest 3"]
+        )
+
+    def test_gzip_jsonl_export(self):
+        """Test that gzipped JSON lines decompress to every booking."""
+        response = self.client.get(self.url, {"format": "jsonl", "gzip": "1"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn(".jsonl.gz", response["Content-Disposition"])
+        content = gzip.decompress(b"".join(response.streaming_content))
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[0]["room_name"], "Sea View")
+        self.assertEqual(rows[0]["total_price"], "100.00")
+
+    def test_invalid_filters_and_anonymous_access(self):
+        """Test that bad filters are rejected and staff is required."""
+        for params in ({"from": "soon"}, {"status": "LOST"}, {"format": "xml"}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_command_writes_file(self):
+        """Test that the command streams the export to a file."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "bookings.csv.gz")
+            call_command(
+                "export_bookings", output=path, gzip=True, status="CANCELLED",
+                chunk_size=2, stderr=StringIO()
+            )
+            with gzip.open(path, "rt") as handle:
+                lines = handle.read().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("Guest 2", lines[1])
+
+    def test_command_writes_to_stdout(self):
+        """Test that without --output the export goes to self.stdout."""
+        out = StringIO()
+        call_command("export_bookings", format="jsonl", stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
+        out = TextIOWrapper(BytesIO())
+        with patch("sys.stdout", out):
+            call_command("export_bookings", gzip=True)
+        lines = gzip.decompress(out.buffer.getvalue()).splitlines()
+        self.assertEqual(len(lines), 6)
+        with self.assertRaises(CommandError):
+            call_command("export_bookings", gzip=True, stdout=StringIO())
+
+
+class DailyOccupancyTests(TestCase):
+    """Test cases for the daily occupancy summary and its reports."""
+
+    def setUp(self):
+        """Set up two standard rooms and a deluxe one."""
+        self.std = [
+            Room.objects.create(
+                name=f"Standard {i}", price=Decimal("100.00"),
+                room_type="STD", available=True
+            )
+            for i in range(2)
+        ]
+        self.dlx = Room.objects.create(
+            name="Deluxe", price=Decimal("200.00"),
+            room_type="DLX", available=True
+        )
+        self.day = timezone.now().date() + timedelta(days=30)
+
+    def book(self, room, start, nights, total, status="CONFIRMED"):
+        booking = Booking(
+            room=room, guest_name="Guest", email="g@example.com",
+            check_in_date=self.day + timedelta(days=start),
+            check_out_date=self.day + timedelta(days=start + nights),
+            total_price=Decimal(total), status=status
+        )
+        booking.save()
+        return booking
+
+    def summary(self):
+        return {
+            (row.room_type, row.date): (row.nights_sold, row.revenue)
+            for row in DailyOccupancy.objects.all()
+            if row.nights_sold or row.revenue
+        }
+
+    def assert_matches_rebuild(self):
+        incremental = self.summary()
+        rebuild_occupancy()
+        self.assertEqual(incremental, self.summary())
+
+    def test_summary_follows_booking_changes(self):
+        """Test that saves and deletes keep the summary exact."""
+        booking = self.book(self.std[0], 0, 3, "100.00")
+        self.book(self.std[1], 1, 2, "150.00")
+        self.assertEqual(
+            self.summary()[("STD", self.day)], (1, Decimal("33.34"))
+        )
+        self.assertEqual(
+            self.summary()[("STD", self.day + timedelta(days=1))],
+            (2, Decimal("108.33")),
+        )
+        self.assert_matches_rebuild()
+
+        booking = Booking.objects.get(pk=booking.pk)
+        booking.room = self.dlx
+        booking.check_out_date += timedelta(days=1)
+        booking.total_price = Decimal("800.00")
+        booking.save()
+        self.assert_matches_rebuild()
+        booking.status = "CANCELLED"
+        booking.save()
+        self.assertNotIn(("DLX", self.day), self.summary())
+        Booking.objects.get(room=self.std[1]).delete()
+        self.assertEqual(self.summary(), {})
+
+    def test_expand_stays(self):
+        """Test that stays expand into nights with the revenue split."""
+        types, days, cents = expand_stays(
+            np.array([0, 1]), np.array([10, 20]), np.array([13, 21]),
+            np.array([10000, 5000]),
+        )
+        self.assertEqual(types.tolist(), [0, 0, 0, 1])
+        self.assertEqual(days.tolist(), [10, 11, 12, 20])
+        self.assertEqual(cents.tolist(), [3334, 3333, 3333, 5000])
+
+    def test_report_by_month_and_room_type(self):
+        """Test occupancy, ADR and RevPAR over a partial range."""
+        self.book(self.std[0], 0, 2, "200.00")
+        self.book(self.std[1], 0, 1, "90.00")
+        self.book(self.dlx, 5, 4, "800.00")
+        self.book(self.dlx, 20, 1, "200.00", status="CANCELLED")
+        end = self.day + timedelta(days=10)
+        total, = occupancy_report(self.day, end, period="total")
+        self.assertEqual(total["room_nights"], 30)
+        self.assertEqual(total["nights_sold"], 7)
+        self.assertEqual(total["revenue"], Decimal("1090.00"))
+        self.assertEqual(total["occupancy"], 0.2333)
+        self.assertEqual(total["adr"], Decimal("155.71"))
+        self.assertEqual(total["revpar"], Decimal("36.33"))
+
+        days = occupancy_report(self.day, end, by_room_type=True)
+        self.assertEqual(len(days), 3 * 10)
+        first = next(row for row in days if row["room_type"] == "STD")
+        self.assertEqual(first["period"], self.day)
+        self.assertEqual(first["occupancy"], 1.0)
+        self.assertEqual(first["adr"], Decimal("95.00"))
+        months = occupancy_report(self.day, end, period="month")
+        self.assertEqual(sum(row["room_nights"] for row in months), 30)
+        self.assertEqual(sum(row["nights_sold"] for row in months), 7)
+
+    def test_report_view_and_backfill_command(self):
+        """Test the staff report endpoint and the backfill command."""
+        self.book(self.std[0], 0, 3, "300.00")
+        DailyOccupancy.objects.all().delete()
+        out = StringIO()
+        call_command("backfill_occupancy", stdout=out)
+        self.assertIn("Rebuilt 3 daily occupancy rows", out.getvalue())
+        self.assertEqual(
+            rebuild_occupancy(
+                self.day + timedelta(days=2), self.day + timedelta(days=1)
+            ),
+            (0, 0),
+        )
+        self.assertEqual(DailyOccupancy.objects.count(), 3)
+        with self.assertRaises(CommandError):
+            call_command(
+                "backfill_occupancy", "--from", str(self.day),
+                "--to", str(self.day), stdout=StringIO()
+            )
+
+        staff = get_user_model().objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass1234"
+        )
+        self.client.force_login(staff)
+        url = reverse("occupancy_report")
+        response = self.client.get(url, {
+            "from": str(self.day),
+            "to": str(self.day + timedelta(days=2)),
+            "period": "total", "by": "room_type",
+        })
+        self.assertEqual(response.status_code, 200)
+        rows = {row["room_type"]: row for row in response.json()["rows"]}
+        self.assertEqual(rows["STD"]["occupancy"], 0.5)
+        self.assertEqual(rows["STD"]["revpar"], "50.00")
+        self.assertEqual(
+            self.client.get(url, {"from": str(self.day)}).status_code, 400
+        )
+
+
+class StartupTests(TestCase):
+    """Test cases for keeping settings and startup cheap."""
+
+    def test_setup_does_not_import_google_auth(self):
+        """Test that django.setup() leaves the Google auth modules alone."""
+        result = subprocess.run(
+            [
+                sys.executable, "-c",
+                "import sys, django; django.setup(); "
+                "print('google.oauth2' in sys.modules)",
+            ],
+            capture_output=True, text=True,
+            env=dict(
+                os.environ, SECRET_KEY="x",
+                DJANGO_SETTINGS_MODULE="daniels-hotell.settings",
+                GOOGLE_CREDENTIALS="{}", GS_BUCKET_NAME="hotel-media",
+            ),
+            cwd=settings.BASE_DIR,
+        )
+        self.assertEqual(result.stdout.strip(), "False", result.stderr)
+        self.assertEqual(result.stderr, "")
+
+    @override_settings(GS_CREDENTIALS_ENV="GOOGLE_CREDENTIALS")
+    def test_credentials_load_on_first_client(self):
+        """Test that bad credentials only fail once the client is built."""
+        load_credentials.cache_clear()
+        self.addCleanup(load_credentials.cache_clear)
+        with patch.dict(os.environ, {"GOOGLE_CREDENTIALS": "not json"}):
+            storage = GoogleCloudMediaFileStorage(
+                bucket_name="hotel-media", querystring_auth=False
+            )
+            self.assertTrue(storage.url("a.jpg").endswith("/media/a.jpg"))
+            with self.assertRaises(ImproperlyConfigured):
+                storage.client
+
+    def test_parse_importtime(self):
+        """Test that -X importtime lines are parsed with their depth."""
+        rows = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   rooms.cache\n"
+            "import time:       300 |        420 | rooms\n"
+        )
+        self.assertEqual(
+            [(r["module"], r["cumulative_us"], r["depth"]) for r in rows],
+            [("rooms.cache", 120, 1), ("rooms", 420, 0)],
+        )
+
+
+class StagedUploadTests(TestCase):
+    """Test cases for staged uploads and batched deletes to the bucket."""
+
+    def setUp(self):
+        """Set up a media storage backed by a local fake bucket."""
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        self.staging = os.path.join(root.name, "staging")
+        settings_override = override_settings(
+            GS_STAGING_ROOT=self.staging,
+            GS_LOCAL_BUCKET_ROOT=os.path.join(root.name, "buckets"),
+            GS_BLOB_CHUNK_SIZE=4,
+            GS_UPLOAD_ATTEMPTS=2,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = LocalBucketMediaStorage()
+        self.bucket = self.storage.bucket
+
+    def test_save_uploads_in_background_chunks(self):
+        """Test that a saved file is staged, then uploaded in chunks."""
+        name = self.storage.save("room_images/a.jpg", ContentFile(b"0123456789"))
+        with self.storage.open(name) as staged:
+            self.assertEqual(staged.read(), b"0123456789")
+        self.storage.flush()
+        self.assertFalse(os.path.exists(self.storage.staged_path(name)))
+        self.assertTrue(self.bucket.blob("media/room_images/a.jpg").exists())
+        self.assertEqual(self.bucket.chunks_uploaded, 3)
+
+    def test_resume_uploads_left_by_a_crash(self):
+        """Test that files staged by a dead process are uploaded again."""
+        path = self.storage.staged_path("room_images/b.jpg")
+        os.makedirs(os.path.dirname(path))
+        with open(path, "wb") as staged:
+            staged.write(b"data")
+        self.assertEqual(self.storage.resume_uploads(), ["room_images/b.jpg"])
+        self.storage.flush()
+        self.assertTrue(self.storage.exists("room_images/b.jpg"))
+        self.assertFalse(os.path.exists(path))
+
+    def test_failed_upload_is_retried(self):
+        """Test that an upload failing once is tried again."""
+        upload = LocalBlob.upload_from_filename
+        calls = []
+
+        def flaky(blob, *args, **kwargs):
+            calls.append(blob.name)
+            if len(calls) == 1:
+                raise OSError("connection reset")
+            return upload(blob, *args, **kwargs)
+
+        with patch.object(LocalBlob, "upload_from_filename", flaky), \
+                patch("rooms.storage.time.sleep"), \
+                self.assertLogs("rooms.storage", "WARNING"):
+            name = self.storage.save("room_images/c.jpg", ContentFile(b"x"))
+            self.storage.flush()
+        self.assertEqual(len(calls), 2)
+        self.assertFalse(self.storage.is_staged(name))
+        self.assertTrue(self.bucket.blob("media/room_images/c.jpg").exists())
+
+    def test_wait_for_upload(self):
+        """Test that jobs wait for files to reach the bucket."""
+        # Saved by another process that has not uploaded it yet
+        with self.assertRaises(FileNotFoundError):
+            wait_for_upload(["room_images/d.jpg"], self.storage)
+
+        with patch.object(
+            LocalBlob, "upload_from_filename", side_effect=OSError("down")
+        ), patch("rooms.storage.time.sleep"), \
+                self.assertLogs("rooms.storage", "ERROR"):
+            name = self.storage.save("room_images/d.jpg", ContentFile(b"x"))
+            with self.assertRaises(FileNotFoundError):
+                wait_for_upload([name], self.storage)
+        self.assertTrue(self.storage.is_staged(name))
+
+        self.storage.resume_uploads()
+        wait_for_upload([name], self.storage)
+        self.assertTrue(self.bucket.blob("media/room_images/d.jpg").exists())
+
+    def test_delete_many_uses_one_batch(self):
+        """Test that deletes share one batch and ignore missing files."""
+        names = [
+            self.storage.save(f"room_images/{i}.jpg", ContentFile(b"x"))
+            for i in range(3)
+        ]
+        self.storage.flush()
+        self.storage.delete_many(names + ["room_images/missing.jpg"])
+        self.assertEqual(self.storage.client.batches, 1)
+        self.assertFalse(any(self.storage.exists(name) for name in names))
+
+
+class ImageCleanupTests(TestCase):
+    """Test cases for removing image files after rows are deleted."""
+
+    def setUp(self):
+        """Set up a room with two stored images."""
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.room = Room.objects.create(
+            name="Doomed Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.names = []
+        for i in range(2):
+            image = RoomImage(room=self.room)
+            image.image.save(f"doomed-{i}.jpg", ContentFile(b"jpeg"))
+            self.names.append(image.image.name)
+        Job.objects.all().delete()
+
+    def test_room_delete_removes_image_files(self):
+        """Test that cascaded image deletes clean up their files."""
+        self.room.delete()
+        self.assertEqual(Job.objects.filter(name="delete_media").count(), 2)
+        self.assertTrue(all(default_storage.exists(n) for n in self.names))
+        run_jobs()
+        self.assertFalse(any(default_storage.exists(n) for n in self.names))
+
+
+@override_settings(
+    CACHES={
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    },
+    PAGE_CACHE_ENABLED=True,
+)
+class PageCacheTests(TestCase):
+    """Test cases for the anonymous page cache."""
+
+    def setUp(self):
+        """Set up test data."""
+        cache.clear()
+        self.room = Room.objects.create(
+            name="Test Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+
+    def test_anonymous_page_is_cached_until_room_changes(self):
+        """Test hits, misses and signal-based invalidation."""
+        before = page_cache_stats(["room_list"])["room_list"]
+        url = reverse("room_list")
+        response = self.client.get(url, {"room_type": "STD", "max_price": ""})
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, {"room_type": "STD"})
+        self.assertEqual(response["X-Page-Cache"], "HIT")
+        self.assertContains(response, "Test Room")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.room.name = "Renamed Room"
+            self.room.save()
+        response = self.client.get(url, {"room_type": "STD"})
+        self.assertEqual(response["X-Page-Cache"], "MISS")
+        self.assertContains(response, "Renamed Room")
+
+        stats = page_cache_stats(["room_list"])["room_list"]
+        self.assertEqual(
+            (stats["hits"] - before["hits"], stats["misses"] - before["misses"]),
+            (1, 2),
+        )
+
+    def test_hit_does_not_write_to_cache(self):
+        """Test that serving a cached page only reads from the cache."""
+        url = reverse("room_list")
+        self.client.get(url)
+        with patch.object(cache, "set") as set_, \
+                patch.object(cache, "add") as add, \
+                patch.object(cache, "incr") as incr:
+            response = self.client.get(url)
+        self.assertEqual(response["X-Page-Cache"], "HIT")
+        self.assertFalse(set_.called or add.called or incr.called)
+
+    def test_authenticated_users_bypass_cache(self):
+        """Test that logged-in visitors always get a fresh page."""
+        user = get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com", password="testpass123"
+        )
+        self.client.force_login(user)
+        response = self.client.get(reverse("room_list"))
+        self.assertNotIn("X-Page-Cache", response)
+
+    @override_settings(PAGE_CACHE_ENABLED=False)
+    def test_disabled_page_cache_is_bypassed(self):
+        """Test that no page is cached while the page cache is off."""
+        response = self.client.get(reverse("room_list"))
+        self.assertNotIn("X-Page-Cache", response)
+
+    def test_local_cache_with_several_workers_warns(self):
+        """Test the system check against per-worker local caches."""
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "3"}):
+            warnings = check_shared_cache(None)
+        self.assertEqual([w.id for w in warnings], ["rooms.W001"])
+        with patch.dict(os.environ, {"WEB_CONCURRENCY": "1"}):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class RoomJsonConditionalGetTests(TestCase):
+    """Test cases for ETag/Last-Modified on the room JSON endpoints."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.room = Room.objects.create(
+            name="Test Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        self.url = reverse("room_details", args=[self.room.id])
+
+    def test_unchanged_room_returns_304(self):
+        """Test revalidation with the ETag of an unchanged room."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Test Room")
+        self.assertIn("no-cache", response["Cache-Control"])
+        self.assertIn("Last-Modified", response)
+
+        # Only the room version is read.
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                self.url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_image_change_gives_new_etag(self):
+        """Test that adding an image invalidates the ETag."""
+        etag = self.client.get(self.url)["ETag"]
+        RoomImage.objects.create(room=self.room, image="room_images/a.jpg")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(len(response.json()["images"]), 1)
+
+    def test_missing_room_is_404(self):
+        """Test that unknown rooms still return 404."""
+        response = self.client.get(reverse("room_details_json", args=[999]))
+        self.assertEqual(response.status_code, 404)
+
+
+class JobQueueTests(TestCase):
+    """Test cases for the database-backed job queue."""
+
+    def setUp(self):
+        """Set up test data."""
+        self.user = get_user_model().objects.create_user(
+            username="testuser",
+            email="test@example.com", password="testpass123"
+        )
+        self.room = Room.objects.create(
+            name="Test Room", price=Decimal("100.00"),
+            room_type="STD", available=True
+        )
+        # Start from an empty queue, without the room's own jobs
+        Job.objects.all().delete()
+        self.client.force_login(self.user)
+
+    def test_booking_email_is_sent_by_worker(self):
+        """Test that booking queues its email instead of sending it."""
+        check_in = timezone.now().date() + timedelta(days=5)
+        self.client.post(
+            reverse("book_room", args=[self.room.id]),
+            {
+                "guest_name": "Test Guest",
+                "email": "guest@example.com",
+                "phone_number": "+1234567890",
+                "check_in_date": check_in,
+                "check_out_date": check_in + timedelta(days=2),
+            },
+        )
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get()
+        self.assertEqual(job.name, "send_email")
+
+        call_command(
+            "run_jobs", "--once", "--workers", "1", stdout=StringIO()
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.status, "DONE")
+        self.assertEqual(mail.outbox[0].to, ["guest@example.com"])
+
+    @override_settings(METRICS_PUSHGATEWAY="pushgateway:9091")
+    def test_worker_pushes_metrics(self):
+        """Test that the job worker pushes the metrics its jobs record."""
+        enqueue(
+            "send_email",
+            subject="Hi", message="Hello", recipient_list=["a@example.com"]
+        )
+        with patch("rooms.metrics.push_to_gateway") as push:
+            call_command(
+                "run_jobs", "--once", "--workers", "1", stdout=StringIO()
+            )
+        self.assertTrue(push.called)
+        gateway = push.call_args.args[0]
+        registry = push.call_args.kwargs["registry"]
+        self.assertEqual(gateway, "pushgateway:9091")
+        self.assertIsNotNone(registry.get_sample_value(
+            "hotel_email_send_seconds_count", {"outcome": "sent"}
+        ))
+
+        with patch(
+            "rooms.metrics.push_to_gateway", side_effect=OSError("down")
+        ):
+            err = StringIO()
+            call_command(
+                "run_jobs", "--once", stdout=StringIO(), stderr=err
+            )
+        self.assertIn("Could not push metrics", err.getvalue())
+
+    def test_failing_job_retries_then_dead_letters(self):
+        """Test backoff between attempts and dead-lettering."""
+        job = enqueue(
+            "send_email", max_attempts=2,
+            subject="Hi", message="Hello", recipient_list=["a@example.com"]
+        )
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            side_effect=OSError("down"),
+        ):
+            self.assertEqual(run_jobs(), {"RETRY": 1})
+            job.refresh_from_db()
+            self.assertEqual(job.status, "PENDING")
+            self.assertGreater(job.run_after, timezone.now())
+            self.assertEqual(run_jobs(), {})
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(run_jobs(), {"DEAD": 1})
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertIn("OSError: down", job.last_error)
+
+
+class MailDispatcherTests(TestCase):
+    """Test cases for batched email delivery."""
+
+    def messages(self, count):
+        """Return ``count`` distinct test messages."""
+        return [
+            EmailMessage(f"Subject {i}", "Body", None, [f"g{i}@example.com"])
+            for i in range(count)
+        ]
+
+    def test_batches_share_connections(self):
+        """Test that each batch is sent over one connection."""
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.open"
+        ) as opened:
+            report = MailDispatcher(batch_size=2).send(self.messages(5))
+        self.assertEqual(opened.call_count, 3)
+        self.assertEqual((report.sent, report.failed), (5, 0))
+        self.assertEqual(report.connections, 3)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertGreater(report.messages_per_second, 0)
+
+    def test_failures_are_reported_per_message(self):
+        """Test that one bad message does not fail its whole batch."""
+        original = mail.backends.locmem.EmailBackend.send_messages
+
+        def flaky(backend, messages):
+            if messages[0].to == ["g1@example.com"]:
+                raise OSError("rejected")
+            return original(backend, messages)
+
+        with patch(
+            "django.core.mail.backends.locmem.EmailBackend.send_messages",
+            flaky,
+        ):
+            report = MailDispatcher().send(self.messages(3))
+        self.assertEqual((report.sent, report.failed), (2, 1))
+        self.assertIsNone(report.errors[0])
+        self.assertIsInstance(report.errors[1], OSError)
+
+    def test_send_queued_mail_command(self):
+        """Test draining queued emails through the command."""
+        for i in range(3):
+            enqueue(
+                "send_email", subject="Hi", message="Hello",
+                recipient_list=[f"g{i}@example.com"]
+            )
+        out = StringIO()
+        call_command(
+            "send_queued_mail", "--backend", "locmem", "--rate-limit", "1000",
+            stdout=out
+        )
+        self.assertIn("Sent 3 emails, 0 failed", out.getvalue())
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(Job.objects.exclude(status="DONE").exists())
@@ -1,35 +1,49 @@
 import logging
 import os
 from django.conf import settings
-from django.core.files.storage import default_storage
 
 logger = logging.getLogger("storage_diagnostics")
 
 
 def log_storage_diagnostics():
-    """Log detailed diagnostics about storage and environment"""
+    """Log diagnostics about storage and environment.
+
+    Only settings are inspected: the storage is not instantiated and
+    credentials are not loaded, so this adds nothing to startup.
+    """
     logger.debug("Starting Storage Diagnostics")
 
     # Google Cloud Storage settings
-    logger.debug(f"Is Development: {settings.IS_DEVELOPMENT}")
-    logger.debug(f"Bucket Name: {settings.GS_BUCKET_NAME}")
-
-    # Storage backend
-    logger.debug(f"Default Storage: {default_storage.__class__.__name__}")
+    logger.debug("Is Development: %s", settings.IS_DEVELOPMENT)
+    logger.debug("Bucket Name: %s", settings.GS_BUCKET_NAME)
+    logger.debug("Heroku dyno: %s", "DYNO" in os.environ)
+
+    # Storage backends
+    logger.debug(
+        "Default Storage: %s",
+        getattr(settings, "DEFAULT_FILE_STORAGE", "FileSystemStorage"),
+    )
+    logger.debug(
+        "Static Storage: %s",
+        getattr(settings, "STATICFILES_STORAGE", "StaticFilesStorage"),
+    )
+    logger.debug("MEDIA_URL: %s", settings.MEDIA_URL)
+    logger.debug("STATIC_URL: %s", settings.STATIC_URL)
 
     # Environment variables
     env_vars = ["DJANGO_ENV", "GS_BUCKET_NAME", "GS_PROJECT_ID", "DEBUG"]
 
     for var in env_vars:
         value = os.environ.get(var, "NOT SET")
-        logger.debug(f"{var}: {value}")
-
-    # Credentials check
-    try:
-        credentials = getattr(settings, "GS_CREDENTIALS", None)
-        if credentials:
-            logger.debug("Google Cloud Credentials: Loaded successfully")
-        else:
-            logger.warning("No Google Cloud Credentials found")
-    except Exception as e:
-        logger.error(f"Credentials Check Error: {e}")
+        logger.debug("%s: %s", var, value)
+
+    # Credentials check; they are parsed on first storage access
+    if settings.GS_CREDENTIALS_ENV:
+        logger.debug(
+            "Google Cloud Credentials: from %s", settings.GS_CREDENTIALS_ENV
+        )
+    elif settings.GS_BUCKET_NAME:
+        logger.warning(
+            "GS_BUCKET_NAME is set but no Google Cloud Credentials were "
+            "found; using local storage"
+        )
@@ -1,16 +1,41 @@
 from django.contrib import messages
 from django.utils.dateparse import parse_date
-from django.db.models import Q
-from django.http import JsonResponse
-from django.core.mail import send_mail
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    StreamingHttpResponse,
+)
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, quote_etag
 from django.utils import timezone
 from django.conf import settings
 from django.core.files.storage import default_storage
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from datetime import datetime, timedelta
+import json
 from django.urls import reverse
+from prometheus_client import CONTENT_TYPE_LATEST
 from .models import Room, Booking
+from .availability import availability_matrix
+from .cache import cache_anonymous_page, page_cache_stats
+from .exports import ExportError, export_bookings, parse_filters
+from .jobs import enqueue
+from .metrics import render_metrics
+from .occupancy import ReportError, occupancy_report, parse_report_params
+from .pagination import (
+    PER_PAGE,
+    InvalidCursor,
+    KeysetPaginator,
+    paginate_request,
+)
+from .search import filter_rooms, room_facets
+from .services import create_booking, update_booking
 from .forms import (
     BookingForm,
     BookingEditForm,
@@ -21,6 +46,11 @@ from django.db import transaction
 from django.shortcuts import render, redirect, get_object_or_404
 
 
+# Stable sort keys of room listings, for keyset pagination
+ROOM_ORDER = ("price", "id")
+MAX_PER_PAGE = 100
+
+
 def register(request):
     """Handle user registration."""
     if request.user.is_authenticated:
@@ -54,6 +84,7 @@ def register(request):
     return render(request, "register.html", {"form": form})
 
 
+@cache_anonymous_page("room", "roomimage")
 def home(request):
     """Render home page with featured rooms."""
     # Get today and tomorrow dates for search form
@@ -83,41 +114,33 @@ def home(request):
     return render(request, "home.html", context)
 
 
+@cache_anonymous_page("room", "roomimage", "booking")
 def room_list(request):
     """Display list of available rooms with filtering options."""
-    # Get all available rooms
-    rooms = Room.objects.filter(available=True)
+    return render_room_search(request)
 
-    # Use Room.ROOM_TYPES from your model
-    room_types = Room.ROOM_TYPES
+
+def render_room_search(request):
+    """Render the filtered room list with facet counts."""
+    rooms, _ = filter_rooms(request.GET)
+    facets = room_facets(rooms)
+
+    # Room types with the number of matching rooms, for the filter form
+    room_types = [
+        (facet["value"], facet["label"], facet["count"])
+        for facet in facets["room_type"]
+    ]
 
     # Get today and tomorrow dates for date inputs
     today = datetime.now().date()
     tomorrow = today + timedelta(days=1)
 
-    # Filter handling
-    room_type = request.GET.get("room_type")
-    max_price = request.GET.get("max_price")
-    check_in = request.GET.get("check_in")
-    check_out = request.GET.get("check_out")
-
-    # Apply filters
-    if room_type:
-        rooms = rooms.filter(room_type=room_type)
-    if max_price:
-        rooms = rooms.filter(price__lte=max_price)
-    if check_in and check_out:
-        check_in_date = parse_date(check_in)
-        check_out_date = parse_date(check_out)
-        if check_in_date and check_out_date:
-            rooms = rooms.exclude(
-                booking__check_in_date__lt=check_out_date,
-                booking__check_out_date__gt=check_in_date,
-            )
-
     context = {
-        "rooms": rooms,
+        "rooms": paginate_request(
+            request, rooms.with_images(), ROOM_ORDER
+        ),
         "room_types": room_types,
+        "facets": facets,
         "today": today,
         "tomorrow": tomorrow,
         "MEDIA_URL": settings.MEDIA_URL,
@@ -126,23 +149,25 @@ def room_list(request):
         "GS_BUCKET_NAME": getattr(
             settings, "GS_BUCKET_NAME", "Not Set"
         ),
-        "selected_room_type": room_type,
-        "selected_max_price": max_price,
-        "selected_check_in": check_in,
-        "selected_check_out": check_out,
+        "selected_room_type": request.GET.get("room_type"),
+        "selected_max_price": request.GET.get("max_price"),
+        "selected_check_in": request.GET.get("check_in"),
+        "selected_check_out": request.GET.get("check_out"),
     }
     return render(request, "select_room.html", context)
 
 
+@cache_anonymous_page("room", "roomimage")
 def room_detail(request, room_id):
     """Display detailed information about a specific room."""
-    room = get_object_or_404(Room, id=room_id)
+    room = get_object_or_404(Room.objects.with_images(), id=room_id)
 
-    # Get similar rooms (same type or price range)
-    similar_rooms = Room.objects.filter(
-        Q(room_type=room.room_type)
-        | Q(price__range=(room.price * 0.8, room.price * 1.2))
-    ).exclude(id=room.id)[:3]
+    # Precomputed nearest rooms by type, price, size and occupancy
+    similar_rooms = (
+        Room.objects.filter(similar_to__room=room, available=True)
+        .order_by("similar_to__rank")
+        .with_images()[:3]
+    )
 
     # Get today and tomorrow dates for booking form
     today = datetime.now().date()
@@ -193,27 +218,11 @@ def book_room(request, room_id):
         if form.is_valid():
             try:
                 with transaction.atomic():
-                    booking = form.save(commit=False)
-                    booking.room = room
-                    booking.user = request.user
-                    days = (
-                        booking.check_out_date - booking.check_in_date
-                    ).days
-                    booking.total_price = room.price * days
-                    booking.status = "CONFIRMED"
-
-                    if not is_room_available(
-                        room,
-                        booking.check_in_date,
-                        booking.check_out_date,
-                        None
-                    ):
-                        raise ValidationError(
-                            "Room not available for selected dates"
-                        )
-
-                    booking.full_clean()  # This will validate the model
-                    booking.save()
+                    # Overlap is enforced by the database on insert, so
+                    # the service needs no availability pre-check.
+                    booking = create_booking(
+                        form.save(commit=False), room, request.user
+                    )
                     send_booking_confirmation_email(booking)
                     messages.success(request, "Booking confirmed!")
                     return redirect(
@@ -270,7 +279,12 @@ def book_room(request, room_id):
 
 def booking_confirmation(request, booking_id):
     """Show booking confirmation page."""
-    booking = get_object_or_404(Booking, id=booking_id)
+    booking = get_object_or_404(
+        Booking.objects.select_related("room").prefetch_related(
+            "room__images"
+        ),
+        id=booking_id,
+    )
 
     # Get today's date for countdown calculation
     today = datetime.now().date()
@@ -296,9 +310,12 @@ def check_availability(request):
         tomorrow = today + timedelta(days=1)
 
         if check_in and check_out:
-            available_rooms = Room.objects.filter(available=True).exclude(
-                booking__check_in_date__lt=check_out,
-                booking__check_out_date__gt=check_in,
+            available_rooms = paginate_request(
+                request,
+                Room.objects.filter(available=True)
+                .available_between(check_in, check_out)
+                .with_images(),
+                ROOM_ORDER,
             )
             context = {
                 "rooms": available_rooms,
@@ -315,9 +332,52 @@ def check_availability(request):
     return redirect("room_list")
 
 
-def room_details(request, room_id):
-    """Get detailed information about a specific room."""
-    room = get_object_or_404(Room, id=room_id)
+MAX_MATRIX_DAYS = 366
+
+
+def room_availability_matrix(request):
+    """Return the occupancy grid of every room over a date window."""
+    try:
+        start = (
+            parse_date(request.GET.get("start", ""))
+            or datetime.now().date()
+        )
+        if request.GET.get("end"):
+            end = parse_date(request.GET["end"])
+        else:
+            end = start + timedelta(days=int(request.GET.get("days", 30)))
+    except (ValueError, OverflowError):
+        end = None
+
+    if end is None or end <= start:
+        return JsonResponse(
+            {"error": "Provide a valid start date before the end date."},
+            status=400,
+        )
+    if (end - start).days > MAX_MATRIX_DAYS:
+        return JsonResponse(
+            {"error": f"Date window is limited to {MAX_MATRIX_DAYS} days."},
+            status=400,
+        )
+
+    encoding = request.GET.get("encoding", "bitmap")
+    if encoding not in ("bitmap", "runs"):
+        return JsonResponse(
+            {"error": "Encoding must be 'bitmap' or 'runs'."}, status=400
+        )
+
+    data = availability_matrix(
+        start, end, room_type=request.GET.get("room_type"), encoding=encoding
+    )
+    return JsonResponse(data)
+
+
+ROOM_JSON_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def serialize_room(room_id):
+    """Serialize a room and its image URLs to JSON bytes."""
+    room = get_object_or_404(Room.objects.with_images(), id=room_id)
 
     # Your Room model has get_room_type_display
     # method because room_type uses choices
@@ -331,64 +391,183 @@ def room_details(request, room_id):
         "max_occupancy": room.max_occupancy,
         "size": room.size,
     }
-    return JsonResponse(data)
+    return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+
+def room_json_response(request, room_id, endpoint):
+    """Serve room JSON with ETag/Last-Modified validation.
+
+    Only the room's version is read up front; an unchanged room gets a
+    304 without touching its images or storage, and the serialized
+    payload is cached per version.
+    """
+    updated_at = (
+        Room.objects.filter(id=room_id)
+        .values_list("updated_at", flat=True)
+        .first()
+    )
+    if updated_at is None:
+        raise Http404("No Room matches the given query.")
+
+    version = int(updated_at.timestamp() * 1_000_000)
+    etag = quote_etag(f"room-{room_id}-{version}")
+    last_modified = int(updated_at.timestamp())
+
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        payload = cache.get_or_set(
+            f"room-json:{room_id}:{version}",
+            lambda: serialize_room(room_id),
+            ROOM_JSON_CACHE_TIMEOUT,
+        )
+        response = HttpResponse(payload, content_type="application/json")
+
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(
+        response, **settings.ROOM_JSON_CACHE_CONTROL.get(endpoint, {})
+    )
+    return response
+
+
+def room_details(request, room_id):
+    """Get detailed information about a specific room."""
+    return room_json_response(request, room_id, "room_details")
 
 
 def room_details_json(request, room_id):
     """Return room details in JSON format."""
-    return room_details(request, room_id)
+    return room_json_response(request, room_id, "room_details_json")
 
 
+@cache_anonymous_page("room", "roomimage", "booking")
 def search_rooms(request):
     """Search for rooms based on various criteria."""
-    check_in = request.GET.get("check_in")
-    check_out = request.GET.get("check_out")
-    room_type = request.GET.get("room_type")
-    max_price = request.GET.get("max_price")
+    return render_room_search(request)
+
+
+@cache_anonymous_page("room", "roomimage", "booking")
+def search_rooms_json(request):
+    """Return a page of matching rooms with facet counts as JSON."""
+    try:
+        per_page = min(int(request.GET.get("limit", PER_PAGE)), MAX_PER_PAGE)
+    except ValueError:
+        per_page = 0
+    if per_page < 1:
+        return JsonResponse(
+            {"error": f"Limit must be between 1 and {MAX_PER_PAGE}."},
+            status=400,
+        )
+
+    rooms, filters = filter_rooms(request.GET)
+    paginator = KeysetPaginator(
+        rooms.values(
+            "id", "name", "room_type", "price", "max_occupancy", "size"
+        ),
+        ROOM_ORDER,
+        per_page=per_page,
+    )
+    try:
+        page = paginator.page(request.GET.get("cursor"))
+    except InvalidCursor:
+        return JsonResponse({"error": "Invalid cursor."}, status=400)
+
+    facets = room_facets(rooms)
+    results = list(page)
+    for room in results:
+        room["url"] = reverse("room_detail", args=[room["id"]])
+    return JsonResponse(
+        {
+            "filters": filters,
+            "count": facets["total"],
+            "rooms": results,
+            "next": page.next_cursor,
+            "previous": page.previous_cursor,
+            "facets": facets,
+        },
+        encoder=DjangoJSONEncoder,
+    )
 
-    # Use Room.ROOM_TYPES from your model
-    room_types = Room.ROOM_TYPES
 
-    # Get today and tomorrow dates for form
-    today = datetime.now().date()
-    tomorrow = today + timedelta(days=1)
+CACHED_PAGES = (
+    "home",
+    "room_list",
+    "room_detail",
+    "search_rooms",
+    "search_rooms_json",
+)
 
-    rooms = Room.objects.filter(available=True)
 
-    if check_in and check_out:
-        check_in_date = parse_date(check_in)
-        check_out_date = parse_date(check_out)
-        if check_in_date and check_out_date:
-            rooms = rooms.exclude(
-                booking__check_in_date__lt=check_out_date,
-                booking__check_out_date__gt=check_in_date,
-            )
+@staff_member_required
+def page_cache_status(request):
+    """Return hit and miss counters of the anonymous page cache."""
+    return JsonResponse(page_cache_stats(CACHED_PAGES))
 
-    if room_type:
-        rooms = rooms.filter(room_type=room_type)
 
-    if max_price:
-        rooms = rooms.filter(price__lte=max_price)
+@staff_member_required
+def export_bookings_view(request):
+    """Stream bookings as CSV or JSON lines, optionally gzipped.
 
-    context = {
-        "rooms": rooms,
-        "room_types": room_types,
-        "today": today,
-        "tomorrow": tomorrow,
-        "selected_check_in": check_in,
-        "selected_check_out": check_out,
-        "selected_room_type": room_type,
-        "selected_max_price": max_price,
-        "MEDIA_URL": settings.MEDIA_URL,
-        "STATIC_URL": settings.STATIC_URL,
-        "storage_backend": default_storage.__class__.__name__,
-        "GS_BUCKET_NAME": getattr(
-            settings,
-            "GS_BUCKET_NAME",
-            "Not Set"
-        ),
-    }
-    return render(request, "search_results.html", context)
+    Takes ``format`` (csv, jsonl), ``from``/``to`` check-in dates,
+    ``status`` and ``gzip=1``. Rows are streamed as they are read, so
+    memory stays flat however many bookings match.
+    """
+    fmt = request.GET.get("format", "csv")
+    compress = request.GET.get("gzip") == "1"
+    try:
+        content = export_bookings(
+            parse_filters(request.GET), fmt=fmt, compress=compress
+        )
+    except ExportError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    filename = f"bookings-{timezone.now():%Y%m%d}.{fmt}"
+    if compress:
+        filename += ".gz"
+        content_type = "application/gzip"
+    elif fmt == "csv":
+        content_type = "text/csv; charset=utf-8"
+    else:
+        content_type = "application/x-ndjson; charset=utf-8"
+    response = StreamingHttpResponse(content, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def occupancy_report_view(request):
+    """Return occupancy, ADR and RevPAR from the daily summary.
+
+    Takes ``from`` and ``to`` (exclusive) nights, ``period`` (day,
+    month, total) and ``by=room_type``.
+    """
+    try:
+        params = parse_report_params(request.GET)
+    except ReportError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse({**params, "rows": occupancy_report(**params)})
+
+
+def metrics(request):
+    """Expose Prometheus metrics, summed over every worker.
+
+    With ``METRICS_TOKEN`` set, scrapers must send it as a bearer token.
+    Without one, only staff may read them unless ``DEBUG`` is on.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        ):
+            return HttpResponse(status=401)
+    elif not settings.DEBUG and not request.user.is_staff:
+        return HttpResponse(status=403)
+    return HttpResponse(
+        render_metrics(page_cache_stats(CACHED_PAGES)),
+        content_type=CONTENT_TYPE_LATEST,
+    )
 
 
 def login_view(request):
@@ -423,17 +602,33 @@ def user_bookings(request):
     # Today's date for determining upcoming vs past bookings
     today = datetime.now().date()
 
-    upcoming_bookings = Booking.objects.filter(
+    bookings = Booking.objects.select_related("room").prefetch_related(
+        "room__images"
+    )
+
+    upcoming_bookings = bookings.filter(
         user=request.user, check_in_date__gte=today
-    ).order_by("check_in_date")
+    )
 
-    past_bookings = Booking.objects.filter(
+    past_bookings = bookings.filter(
         user=request.user, check_in_date__lt=today
-    ).order_by("-check_in_date")
+    )
 
     context = {
-        "upcoming_bookings": upcoming_bookings,
-        "past_bookings": past_bookings,
+        "upcoming_bookings": paginate_request(
+            request,
+            upcoming_bookings,
+            ("check_in_date", "id"),
+            param="upcoming",
+        ),
+        "past_bookings": paginate_request(
+            request,
+            past_bookings,
+            ("-check_in_date", "-id"),
+            param="past",
+        ),
+        "upcoming_count": upcoming_bookings.count(),
+        "past_count": past_bookings.count(),
         "today": today,
     }
     return render(request, "user_bookings.html", context)
@@ -442,7 +637,11 @@ def user_bookings(request):
 @login_required
 def edit_booking(request, booking_id):
     """Handle editing of existing bookings."""
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+    booking = get_object_or_404(
+        Booking.objects.select_related("room"),
+        id=booking_id,
+        user=request.user,
+    )
 
     # Today's date for validation
     today = datetime.now().date()
@@ -456,29 +655,14 @@ def edit_booking(request, booking_id):
         if form.is_valid():
             try:
                 with transaction.atomic():
-                    if not is_room_available(
-                        booking.room,
-                        form.cleaned_data["check_in_date"],
-                        form.cleaned_data["check_out_date"],
-                        booking.id,
-                    ):
-                        raise ValidationError(
-                            "Room not available for selected dates"
-                        )
-
-                    booking = form.save(commit=False)
-                    days = (
-                        booking.check_out_date - booking.check_in_date
-                    ).days
-                    booking.total_price = booking.room.price * days
-                    booking.save()
+                    booking = update_booking(form.save(commit=False))
 
                     messages.success(
                         request, "Your booking has been successfully updated."
                     )
                     return redirect("user_bookings")
             except ValidationError as e:
-                messages.error(request, str(e))
+                messages.error(request, " ".join(e.messages))
             except Exception:
                 messages.error(
                     request, "An error occurred while updating your booking."
@@ -529,9 +713,11 @@ def cancel_booking(request, booking_id):
                     "Must be cancelled more than 24 hours before check-in."
                 )
             else:
-                # Send cancellation email before deleting
-                send_cancellation_email(booking)
-                booking.delete()
+                # The email is queued with the deletion, so it is only
+                # sent once the cancellation has committed.
+                with transaction.atomic():
+                    send_cancellation_email(booking)
+                    booking.delete()
                 messages.success(
                     request, "Your booking has been successfully cancelled."
                 )
@@ -546,22 +732,8 @@ def cancel_booking(request, booking_id):
     return redirect("user_bookings")
 
 
-def is_room_available(
-    room, check_in_date, check_out_date, exclude_booking_id=None
-):
-    """Check if a room is available for given dates."""
-    overlapping = Booking.objects.filter(
-        room=room,
-        check_in_date__lt=check_out_date,
-        check_out_date__gt=check_in_date
-    )
-    if exclude_booking_id:
-        overlapping = overlapping.exclude(id=exclude_booking_id)
-    return not overlapping.exists()
-
-
 def send_booking_confirmation_email(booking):
-    """Send confirmation email for new bookings."""
+    """Queue the confirmation email for a new booking."""
     subject = "Booking Confirmation - Daniel's Hotel"
     message = f"""
     Dear {booking.guest_name},
@@ -590,17 +762,16 @@ def send_booking_confirmation_email(booking):
     The Daniel's Hotel Team
     """
 
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [booking.email],
-        fail_silently=False,
+    enqueue(
+        "send_email",
+        subject=subject,
+        message=message,
+        recipient_list=[booking.email],
     )
 
 
 def send_cancellation_email(booking):
-    """Send confirmation email for cancelled bookings."""
+    """Queue the confirmation email for a cancelled booking."""
     subject = "Booking Cancellation Confirmation - Daniel's Hotel"
     message = f"""
     Dear {booking.guest_name},
@@ -622,10 +793,9 @@ def send_cancellation_email(booking):
     The Daniel's Hotel Team
     """
 
-    send_mail(
-        subject,
-        message,
-        settings.DEFAULT_FROM_EMAIL,
-        [booking.email],
-        fail_silently=False,
+    enqueue(
+        "send_email",
+        subject=subject,
+        message=message,
+        recipient_list=[booking.email],
     )
@@ -0,0 +1,17 @@
+/**
+ * Apply an autocomplete changelist filter as soon as a value is picked.
+ *
+ * The select carries the changelist URL without its own parameter in
+ * data-filter-url; the chosen id is appended to it.
+ */
+window.addEventListener('load', function() {
+    const $ = django.jQuery;
+
+    $('.autocomplete-filter').on('change', function() {
+        const url = new URL(this.dataset.filterUrl, window.location.href);
+        if (this.value) {
+            url.searchParams.set(this.name, this.value);
+        }
+        window.location.href = url.toString();
+    });
+});
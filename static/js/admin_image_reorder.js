@@ -0,0 +1,80 @@
+/**
+ * Drag-and-drop ordering for the room image inline in the admin.
+ *
+ * Dropping a row posts the new order of saved images to the room's
+ * reorder-images endpoint, which stores it with a single bulk update,
+ * and writes the returned positions back into the order inputs.
+ */
+document.addEventListener('DOMContentLoaded', function() {
+    const group = document.getElementById('images-group');
+    if (!group) {
+        return;
+    }
+    const tbody = group.querySelector('tbody');
+    const reorderUrl = new URL('../reorder-images/', window.location.href);
+    let dragged = null;
+
+    function savedRows() {
+        return Array.from(tbody.querySelectorAll('tr.has_original'));
+    }
+
+    function imageId(row) {
+        return row.querySelector('input[name$="-id"]').value;
+    }
+
+    function saveOrder() {
+        const csrfToken = document.querySelector('[name=csrfmiddlewaretoken]').value;
+        fetch(reorderUrl, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrfToken
+            },
+            body: JSON.stringify({ids: savedRows().map(imageId)})
+        })
+            .then(function(response) {
+                if (!response.ok) {
+                    throw new Error('Reorder failed: ' + response.status);
+                }
+                return response.json();
+            })
+            .then(function(data) {
+                savedRows().forEach(function(row) {
+                    const input = row.querySelector('input[name$="-order"]');
+                    if (input && data.order[imageId(row)] !== undefined) {
+                        input.value = data.order[imageId(row)];
+                    }
+                });
+            })
+            .catch(function(error) {
+                console.error(error);
+            });
+    }
+
+    savedRows().forEach(function(row) {
+        row.draggable = true;
+        row.style.cursor = 'move';
+
+        row.addEventListener('dragstart', function(event) {
+            dragged = row;
+            event.dataTransfer.effectAllowed = 'move';
+        });
+
+        row.addEventListener('dragover', function(event) {
+            if (!dragged || dragged === row) {
+                return;
+            }
+            event.preventDefault();
+            const box = row.getBoundingClientRect();
+            const after = event.clientY > box.top + box.height / 2;
+            tbody.insertBefore(dragged, after ? row.nextSibling : row);
+        });
+
+        row.addEventListener('dragend', function() {
+            if (dragged) {
+                dragged = null;
+                saveOrder();
+            }
+        });
+    });
+});